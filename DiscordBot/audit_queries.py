@@ -0,0 +1,102 @@
+"""
+SQL audit of the utils/db functions.
+Seeds a throwaway SQLite database (the same synthetic data as bench_db.py),
+calls each function a few times under the slow-query/N+1 detector and writes
+the per-function report with query plans for the flagged statements.
+
+Save a report as the budget, then fail later runs that issue more statements
+or repeat one statement more often:
+
+    python audit_queries.py --output audit.json
+    python audit_queries.py --budget audit.json
+"""
+import os
+import sys
+import json
+import random
+import argparse
+import tempfile
+from pathlib import Path
+
+# Add the parent directory to sys.path to import modules
+sys.path.append(str(Path(__file__).parent))
+
+def audit(args, temp_dir):
+    """Seed a database in temp_dir, audit the selected functions and print the report. Returns the exit status."""
+    # models.base binds the engine on import, so point it at the throwaway database first
+    os.environ["DB_TYPE"] = "sqlite"
+    os.environ["SQLITE_DB_PATH"] = os.path.join(temp_dir, "audit.db")
+    os.environ["CATALOG_SNAPSHOT_PATH"] = os.path.join(temp_dir, "catalog.snapshot")
+
+    from sqlalchemy.orm import close_all_sessions
+    from models.base import engine
+    from utils import db as bot_db
+    from utils.query_audit import query_audit, check_budget, budget_from_report
+    from bench_db import seed, build_cases
+
+    bot_db.OLD_DB_PATH = os.path.join(temp_dir, "missing_users.json")
+    if args.slow_ms is not None:
+        query_audit.slow_ms = args.slow_ms
+    if args.repeat_threshold is not None:
+        query_audit.repeat_threshold = args.repeat_threshold
+
+    rng = random.Random(args.seed)
+    user_ids, card_count = seed(engine, args.users, args.cards_per_user, args.characters, args.wishlist_per_user, rng)
+    cases = build_cases(user_ids, card_count, args.characters, rng)
+    selected = [name for name in cases if not args.functions or name in args.functions or name.split(":")[0] in args.functions]
+
+    query_audit.install(engine)
+    for name in selected:
+        for _ in range(args.calls):
+            with query_audit.expect(name):
+                cases[name]()
+            close_all_sessions()
+    report = query_audit.snapshot()
+
+    print(f"  {'function':<28} {'calls':>6} {'max stmts':>10} {'worst repeat':>13} {'slow':>5}")
+    for label, entry in report.items():
+        worst = max((query["max_per_invocation"] for query in entry["queries"].values()), default=0)
+        print(f"  {label:<28} {entry['invocations']:>6} {entry['max_statements']:>10} {worst:>13} {len(entry['slow']):>5}")
+        for normalized, count in entry["repeated"].items():
+            print(f"      {count}x {normalized[:120]}")
+            for row in entry["plans"].get(normalized) or []:
+                print(f"          {row}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+    if args.budget:
+        with open(args.budget) as f:
+            budget = json.load(f)
+        # A saved report works as a budget: nothing may get worse than it was
+        if any("queries" in value for value in budget.values()):
+            budget = budget_from_report(budget)
+        violations = check_budget(report, budget)
+        for violation in violations:
+            print(f"FAIL: {violation}")
+        if violations:
+            return 1
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Report repeated and slow SQL per utils/db function.")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--cards-per-user", type=int, default=50)
+    parser.add_argument("--characters", type=int, default=500)
+    parser.add_argument("--wishlist-per-user", type=int, default=5)
+    parser.add_argument("--calls", type=int, default=5, help="Calls per function")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--functions", nargs="+", help="Only audit these functions")
+    parser.add_argument("--slow-ms", type=float, help="Slow statement threshold in milliseconds")
+    parser.add_argument("--repeat-threshold", type=int, help="Identical statements per call that count as N+1")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--budget", help="Report or budget file to check against")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="audit_queries_") as temp_dir:
+        return audit(args, temp_dir)
+
+if __name__ == "__main__":
+    sys.exit(main())
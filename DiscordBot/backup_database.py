@@ -0,0 +1,83 @@
+"""
+SQLite backup tool.
+Takes online snapshots with the sqlite3 backup API, lists and verifies them
+with PRAGMA integrity_check, and restores one over the database. Stop the bot
+before restoring.
+
+Usage:
+    python backup_database.py create [--keep N]
+    python backup_database.py list
+    python backup_database.py verify [backup]
+    python backup_database.py restore <backup>
+"""
+import os
+import sys
+import argparse
+from pathlib import Path
+
+# Add the parent directory to sys.path to import modules
+sys.path.append(str(Path(__file__).parent))
+
+from models.base import SQLITE_DB_PATH
+from utils.backup import (
+    create_backup, list_backups, prune_backups, resolve_backup, restore_backup, verify_backup,
+    BACKUP_DIR, BACKUP_RETENTION
+)
+
+def main():
+    parser = argparse.ArgumentParser(description="Back up, verify and restore the SQLite database.")
+    parser.add_argument("--database", default=SQLITE_DB_PATH, help="Path to the SQLite database")
+    parser.add_argument("--backup-dir", default=BACKUP_DIR, help="Directory holding the backups")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    create = commands.add_parser("create", help="Take a snapshot now")
+    create.add_argument("--keep", type=int, default=BACKUP_RETENTION, help="Backups to keep after pruning")
+    commands.add_parser("list", help="List snapshots, newest first")
+    verify = commands.add_parser("verify", help="Integrity-check a snapshot (the newest by default)")
+    verify.add_argument("backup", nargs="?")
+    restore = commands.add_parser("restore", help="Restore a snapshot over the database")
+    restore.add_argument("backup")
+    args = parser.parse_args()
+
+    if args.command == "create":
+        try:
+            summary = create_backup(args.database, args.backup_dir)
+        except (TimeoutError, RuntimeError) as e:
+            print(f"Backup failed: {e}")
+            return 1
+        removed = prune_backups(args.keep, args.backup_dir)
+        print(f"Backed up to {summary['path']} ({summary['size']} bytes, {summary['steps']} steps, {summary['seconds']}s)")
+        print(f"Removed {len(removed)} old backups.")
+        return 0
+
+    if args.command == "list":
+        for path in list_backups(args.backup_dir):
+            print(f"{os.path.getsize(path):>12}  {path}")
+        return 0
+
+    if args.command == "verify":
+        backups = list_backups(args.backup_dir)
+        path = resolve_backup(args.backup, args.backup_dir) if args.backup else (backups[0] if backups else None)
+        if not path:
+            print("Backup not found.")
+            return 1
+        ok, message = verify_backup(path)
+        print(f"{path}: {message}")
+        return 0 if ok else 1
+
+    path = resolve_backup(args.backup, args.backup_dir)
+    if not path:
+        print(f"Backup not found: {args.backup}")
+        return 1
+    choice = input(f"Restore {path} over {args.database}? The bot must be stopped. (y/n): ")
+    if choice.lower() != "y":
+        print("Restore cancelled.")
+        return 1
+    safety = restore_backup(path, args.database, args.backup_dir)
+    if safety:
+        print(f"Previous database saved to {safety['path']}")
+    print(f"Restored {path} to {args.database}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
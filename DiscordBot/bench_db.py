@@ -0,0 +1,319 @@
+"""
+Synthetic load benchmark for the utils/db hot paths.
+Seeds a throwaway database with a configurable number of users, cards per user
+and characters, then times each utils/db function and reports p50/p95/p99
+latency, queries per call, peak Python memory and connections still checked
+out after the call returns. Each backend runs in its own interpreter because
+models.base binds the engine at import time.
+
+Results are written as JSON so two commits can be compared:
+
+    python bench_db.py --users 2000 --cards-per-user 500 --output before.json
+    python bench_db.py --users 2000 --cards-per-user 500 --compare before.json
+
+PostgreSQL is only benchmarked when --postgresql-url is given. Its tables are
+dropped and recreated, so never point it at a real database.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import datetime
+import tempfile
+import subprocess
+import tracemalloc
+from pathlib import Path
+
+BOT_DIR = Path(__file__).parent
+
+RARITIES = ["N", "R", "SR", "SSR", "UR", "LR", "ER"]
+RARITY_WEIGHTS = [40, 30, 15, 8, 4, 2, 1]
+
+# Slow functions get fewer iterations
+HEAVY_FUNCTIONS = {"get_all_characters", "update_user:cards"}
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, max(0, int(round(fraction * len(samples) + 0.5)) - 1))
+    return samples[index]
+
+def seed(engine, users, cards_per_user, characters, wishlist_per_user, rng):
+    """Fill an empty database with synthetic rows using bulk inserts."""
+    from sqlalchemy import insert
+    from models.user import User, user_wishlists
+    from models.series import Series
+    from models.character import Character, CharacterImage
+    from models.card import Card
+
+    now = datetime.datetime.utcnow()
+    series_count = max(1, characters // 20)
+    user_ids = [str(700000000000000000 + i) for i in range(users)]
+
+    with engine.begin() as connection:
+        connection.execute(insert(Series), [
+            {"id": i + 1, "name": f"Series {i + 1}"} for i in range(series_count)
+        ])
+        connection.execute(insert(Character), [
+            {"id": i + 1, "name": f"Character {i + 1}", "series_id": i % series_count + 1, "wishlist_count": 0}
+            for i in range(characters)
+        ])
+        connection.execute(insert(CharacterImage), [
+            {"character_id": i + 1, "url": f"https://example.com/{i + 1}.png", "is_primary": True}
+            for i in range(characters)
+        ])
+        connection.execute(insert(User), [
+            {"id": user_id, "username": f"user{index}", "join_date": now, "total_cards": cards_per_user, "total_claims": cards_per_user}
+            for index, user_id in enumerate(user_ids)
+        ])
+
+        card_id = 0
+        for user_id in user_ids:
+            rows = []
+            for order in range(1, cards_per_user + 1):
+                card_id += 1
+                character_id = rng.randint(1, characters)
+                rows.append({
+                    "id": card_id,
+                    "global_id": f"b{card_id:09d}",
+                    "character_id": character_id,
+                    "owner_id": user_id,
+                    "rarity": rng.choices(RARITIES, RARITY_WEIGHTS)[0],
+                    "claimed_artwork": f"https://example.com/{character_id}.png",
+                    "claim_method": "spawn",
+                    "order": order,
+                    "affection": rng.randint(0, 500),
+                    "claimed_at": now,
+                    "tags": []
+                })
+            if rows:
+                connection.execute(insert(Card), rows)
+
+        wishlists = [
+            {"user_id": user_id, "character_id": character_id, "added_at": now}
+            for user_id in user_ids
+            for character_id in rng.sample(range(1, characters + 1), min(wishlist_per_user, characters))
+        ]
+        if wishlists:
+            connection.execute(insert(user_wishlists), wishlists)
+
+    return user_ids, card_id
+
+def build_cases(user_ids, card_count, characters, rng):
+    """Map benchmark names to zero-argument callables that pick fresh random inputs."""
+    from utils import db as bot_db
+
+    def some_user():
+        return rng.choice(user_ids)
+
+    def rewrite_cards():
+        # Writes the user's own cards back unchanged, like the legacy collection editors
+        user_id = some_user()
+        bot_db.update_user(user_id, "cards", bot_db.get_user(user_id)["cards"])
+
+    return {
+        "get_user": lambda: bot_db.get_user(some_user()),
+        "update_user:profile_color": lambda: bot_db.update_user(some_user(), "profile_color", rng.choice(["pink", "blue", "gold"])),
+        "update_user:cards": rewrite_cards,
+        "add_card": lambda: bot_db.add_card(some_user(), rng.randint(1, characters), rng.choice(RARITIES), "https://example.com/new.png"),
+        "get_card": lambda: bot_db.get_card(f"b{rng.randint(1, card_count):09d}") if card_count else None,
+        "get_all_characters": bot_db.get_all_characters,
+        "find_character": lambda: bot_db.find_character(f"character {rng.randint(1, characters)}"),
+        "get_wishlist": lambda: bot_db.get_wishlist(some_user()),
+        "get_character_owner_stats": lambda: bot_db.get_character_owner_stats(rng.randint(1, characters))
+    }
+
+def run_worker(args):
+    """Seed the database configured in the environment and print one JSON result line."""
+    from sqlalchemy import event
+    from sqlalchemy.orm import close_all_sessions
+    from models.base import Base, engine, DB_TYPE
+    if DB_TYPE == "postgresql":
+        Base.metadata.drop_all(engine)
+
+    from utils import db as bot_db
+    if not args.with_json:
+        # Measure the database path; get_user otherwise reads users.json first
+        bot_db.OLD_DB_PATH = os.path.join(tempfile.gettempdir(), "bench_db_missing_users.json")
+
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    user_ids, card_count = seed(engine, args.users, args.cards_per_user, args.characters, args.wishlist_per_user, rng)
+    seed_seconds = time.perf_counter() - started
+
+    queries = 0
+    def count_query(*_):
+        nonlocal queries
+        queries += 1
+    event.listen(engine, "before_cursor_execute", count_query)
+
+    cases = build_cases(user_ids, card_count, args.characters, rng)
+    selected = [name for name in cases if not args.functions or name in args.functions or name.split(":")[0] in args.functions]
+
+    results = {}
+    for name in selected:
+        function = cases[name]
+        iterations = args.heavy_iterations if name in HEAVY_FUNCTIONS else args.iterations
+
+        for _ in range(args.warmup):
+            function()
+            close_all_sessions()
+
+        # Memory is measured on its own pass since tracemalloc slows every allocation
+        tracemalloc.start()
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        close_all_sessions()
+
+        samples = []
+        queries = 0
+        leaked = 0
+        for _ in range(iterations):
+            call_started = time.perf_counter()
+            function()
+            samples.append((time.perf_counter() - call_started) * 1000)
+            # get_db() sessions keep their connection until they are garbage collected
+            leaked = max(leaked, engine.pool.checkedout())
+            close_all_sessions()
+        samples.sort()
+
+        results[name] = {
+            "iterations": iterations,
+            "p50_ms": round(percentile(samples, 0.50), 3),
+            "p95_ms": round(percentile(samples, 0.95), 3),
+            "p99_ms": round(percentile(samples, 0.99), 3),
+            "mean_ms": round(sum(samples) / len(samples), 3),
+            "queries_per_call": round(queries / iterations, 2),
+            "peak_kb": round(peak / 1024, 1),
+            "connections_left_open": leaked
+        }
+
+    event.remove(engine, "before_cursor_execute", count_query)
+    print(json.dumps({"backend": DB_TYPE, "seed_seconds": round(seed_seconds, 2), "results": results}))
+
+def run_backend(backend, args, postgresql_url=None):
+    """Run the worker for one backend in a fresh interpreter and return its result."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        env = dict(os.environ)
+        env["DB_TYPE"] = backend
+        env["SQLITE_DB_PATH"] = os.path.join(temp_dir, "bench.db")
+        env["CATALOG_SNAPSHOT_PATH"] = os.path.join(temp_dir, "catalog.snapshot")
+        if postgresql_url:
+            env["POSTGRESQL_URL"] = postgresql_url
+
+        command = [sys.executable, str(Path(__file__).resolve()), "--worker"] + args.passthrough
+        result = subprocess.run(command, cwd=BOT_DIR, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        print(result.stderr[-4000:])
+        raise RuntimeError(f"{backend} benchmark failed with exit code {result.returncode}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BOT_DIR, capture_output=True, text=True
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+def compare(report, baseline, max_regression):
+    """Print p95 changes against a previous report and return the regressions."""
+    regressions = []
+    for backend, current in report["backends"].items():
+        previous = baseline.get("backends", {}).get(backend)
+        if not previous:
+            continue
+        print(f"\n{backend} vs {baseline.get('commit') or 'baseline'} (p95):")
+        for name, stats in current["results"].items():
+            old = previous["results"].get(name)
+            if not old or not old["p95_ms"]:
+                continue
+            change = (stats["p95_ms"] - old["p95_ms"]) / old["p95_ms"] * 100
+            print(f"  {name:<28} {old['p95_ms']:>9.2f} -> {stats['p95_ms']:>9.2f} ms  {change:+6.1f}%")
+            if change > max_regression:
+                regressions.append(f"{backend} {name} p95 regressed {change:.0f}%")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the utils/db functions on synthetic data.")
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--cards-per-user", type=int, default=100)
+    parser.add_argument("--characters", type=int, default=2000)
+    parser.add_argument("--wishlist-per-user", type=int, default=5)
+    parser.add_argument("--iterations", type=int, default=200, help="Timed calls per function")
+    parser.add_argument("--heavy-iterations", type=int, default=20, help="Timed calls for get_all_characters and card rewrites")
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--functions", nargs="+", help="Only benchmark these functions")
+    parser.add_argument("--with-json", action="store_true", help="Let get_user read utils/users.json first, as in production")
+    parser.add_argument("--postgresql-url", help="Also benchmark this (disposable) PostgreSQL database")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--compare", help="Previous JSON report to compare p95 latencies against")
+    parser.add_argument("--max-regression", type=float, default=25.0, help="Allowed p95 slowdown in percent with --compare")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return 0
+
+    args.passthrough = [
+        "--users", str(args.users), "--cards-per-user", str(args.cards_per_user),
+        "--characters", str(args.characters), "--wishlist-per-user", str(args.wishlist_per_user),
+        "--iterations", str(args.iterations), "--heavy-iterations", str(args.heavy_iterations),
+        "--warmup", str(args.warmup), "--seed", str(args.seed)
+    ]
+    if args.functions:
+        args.passthrough += ["--functions"] + args.functions
+    if args.with_json:
+        args.passthrough.append("--with-json")
+
+    backends = {"sqlite": run_backend("sqlite", args)}
+    if args.postgresql_url:
+        backends["postgresql"] = run_backend("postgresql", args, args.postgresql_url)
+
+    report = {
+        "commit": git_commit(),
+        "created_at": datetime.datetime.utcnow().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "parameters": {
+            "users": args.users, "cards_per_user": args.cards_per_user, "characters": args.characters,
+            "wishlist_per_user": args.wishlist_per_user, "iterations": args.iterations,
+            "heavy_iterations": args.heavy_iterations, "seed": args.seed
+        },
+        "backends": backends
+    }
+
+    for backend, result in backends.items():
+        print(f"\n{backend} (seeded in {result['seed_seconds']}s)")
+        print(f"  {'function':<28} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'queries':>8} {'peak KB':>9} {'open conns':>10}")
+        for name, stats in result["results"].items():
+            print(
+                f"  {name:<28} {stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f} "
+                f"{stats['queries_per_call']:>8.1f} {stats['peak_kb']:>9.1f} {stats['connections_left_open']:>10}"
+            )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get("parameters") != report["parameters"]:
+            print("\nWarning: baseline was run with different parameters.")
+        regressions = compare(report, baseline, args.max_regression)
+        for regression in regressions:
+            print(f"FAIL: {regression}")
+        if regressions:
+            return 1
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
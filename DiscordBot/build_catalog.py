@@ -0,0 +1,43 @@
+"""
+Build script for the precompiled character catalog snapshot.
+Run this after editing assets/characters or assets/series.json so the bot can
+load the whole catalog with a single read at startup.
+"""
+import sys
+import argparse
+from pathlib import Path
+
+# Add the parent directory to sys.path to import modules
+sys.path.append(str(Path(__file__).parent))
+
+def main():
+    from utils.catalog import build_snapshot, CHARACTERS_DIR, SERIES_FILE, SNAPSHOT_PATH
+    from utils.catalog_snapshot import read_snapshot, SnapshotError
+
+    parser = argparse.ArgumentParser(description="Compile the character assets into a catalog snapshot.")
+    parser.add_argument("--characters", default=CHARACTERS_DIR, help="Character asset directory")
+    parser.add_argument("--series", default=SERIES_FILE, help="Series metadata file")
+    parser.add_argument("--output", default=SNAPSHOT_PATH, help="Snapshot file to write")
+    args = parser.parse_args()
+
+    try:
+        summary = build_snapshot(args.characters, args.series, args.output)
+    except SnapshotError as e:
+        # The bot falls back to the JSON files; nothing was installed
+        print(f"Snapshot not written: {e}")
+        return 1
+    print(
+        f"Wrote {summary['path']}: {summary['characters']} characters from {summary['files']} files, "
+        f"{summary['series']} series, {summary['bytes']} bytes ({summary['elapsed_ms']} ms)"
+    )
+
+    # Read it back to make sure the file loads
+    snapshot = read_snapshot(args.output)
+    if len(snapshot.characters) != summary["characters"]:
+        print("Snapshot verification failed: character count mismatch")
+        return 1
+    print("Snapshot verified.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
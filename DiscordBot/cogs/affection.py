@@ -1,34 +1,41 @@
 import discord
 import random
-from discord.ext import commands
-from utils.db import get_user, update_user
+import asyncio
+from discord.ext import commands, tasks
+from utils.affection_buffer import affection_buffer, AFFECTION_FLUSH_SECONDS
+from utils.metrics import instrument_loop
 
 class Affection(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.flush_task.start()
+
+    async def cog_unload(self):
+        self.flush_task.cancel()
+        # Write whatever is still queued before the bot goes away
+        try:
+            flushed = await asyncio.get_running_loop().run_in_executor(None, affection_buffer.flush)
+            if flushed:
+                print(f"Flushed affection for {flushed} cards.")
+        except Exception as e:
+            print(f"Error flushing affection: {e}")
+
+    @tasks.loop(seconds=AFFECTION_FLUSH_SECONDS)
+    @instrument_loop()
+    async def flush_task(self):
+        """Write the coalesced affection increments to the database."""
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, affection_buffer.flush)
+        except Exception as e:
+            # The increments stay queued for the next iteration
+            print(f"Error flushing affection: {e}")
 
     def _apply_affection(self, user_id: int, card_id: str, increase: int) -> tuple:
         """
         Increase the affection score of a card by the given amount.
         Returns a tuple (card_name, new_affection) or (None, None) if card not found.
         """
-        user_data = get_user(user_id)
-        if "cards" not in user_data or not user_data["cards"]:
-            return None, None
-
-        card_found = None
-        for card in user_data["cards"]:
-            if card["global_id"] == card_id:
-                card_found = card
-                break
-
-        if not card_found:
-            return None, None
-
-        # Increase affection (you can add randomness or fixed value)
-        card_found["affection"] += increase
-        update_user(user_id, "cards", user_data["cards"])
-        return card_found["name"], card_found["affection"]
+        return affection_buffer.add(user_id, card_id, increase)
 
     @commands.command(name="flirt")
     @commands.cooldown(1, 30, commands.BucketType.user)
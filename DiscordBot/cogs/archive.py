@@ -1,26 +1,7 @@
 import discord
 from discord.ext import commands
-import os
-import json
 import random
-
-def load_characters():
-    characters = {}
-    base_dir = "assets/characters/"
-    import os
-    for root, dirs, files in os.walk(base_dir):
-        for file in files:
-            if file.endswith(".json"):
-                file_path = os.path.join(root, file)
-                try:
-                    with open(file_path, "r") as f:
-                        data = json.load(f)
-                        characters.update(data)
-                except Exception as e:
-                    print(f"Error reading {file_path}: {e}")
-    return characters
-
-ALL_CHARACTERS = load_characters()
+from utils.catalog import character_catalog
 
 class Archive(commands.Cog):
     def __init__(self, bot):
@@ -28,18 +9,7 @@ class Archive(commands.Cog):
 
     @commands.command(name="card")
     async def view_archive_card(self, ctx, identifier: str):
-        card_found = None
-        try:
-            global_id = int(identifier)
-            for card in ALL_CHARACTERS.values():
-                if card.get("id") == global_id:
-                    card_found = card
-                    break
-        except ValueError:
-            for key, card in ALL_CHARACTERS.items():
-                if key.lower() == identifier.lower():
-                    card_found = card
-                    break
+        card_found = character_catalog.current.find(identifier)
         if not card_found:
             return await ctx.send("Read properly, blind man! That card doesn't exist.")
         image_url = card_found.get("primary_image", {}).get("url") or card_found.get("image", "https://via.placeholder.com/300")
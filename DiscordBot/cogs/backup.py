@@ -0,0 +1,97 @@
+import os
+import asyncio
+import discord
+from discord.ext import commands, tasks
+from models.base import DB_TYPE
+from utils.backup import (
+    create_backup, list_backups, prune_backups, resolve_backup, verify_backup,
+    BACKUP_INTERVAL_HOURS, BACKUP_RETENTION
+)
+from utils.permissions import is_developer
+from utils.metrics import instrument_loop
+
+class Backup(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.lock = asyncio.Lock()
+        if DB_TYPE == "sqlite":
+            self.backup_task.start()
+
+    def cog_unload(self):
+        self.backup_task.cancel()
+
+    async def run_backup(self):
+        """Take a snapshot and apply retention off the event loop."""
+        async with self.lock:
+            loop = asyncio.get_running_loop()
+            summary = await loop.run_in_executor(None, create_backup)
+            summary["pruned"] = await loop.run_in_executor(None, prune_backups)
+            return summary
+
+    @tasks.loop(hours=BACKUP_INTERVAL_HOURS)
+    @instrument_loop()
+    async def backup_task(self):
+        """Scheduled snapshot of the SQLite database."""
+        try:
+            summary = await self.run_backup()
+            print(
+                f"Database backed up to {summary['path']} ({summary['size'] / 1024:.0f} KB, "
+                f"{summary['steps']} steps, {summary['seconds']}s); {len(summary['pruned'])} old backups removed."
+            )
+        except Exception as e:
+            print(f"Error backing up database: {e}")
+
+    @backup_task.before_loop
+    async def before_backup_task(self):
+        await self.bot.wait_until_ready()
+
+    @commands.command(name="backup")
+    @is_developer()
+    async def backup_command(self, ctx):
+        """Take a database snapshot now."""
+        if DB_TYPE != "sqlite":
+            await ctx.send("❌ Backups are only available for the SQLite database.")
+            return
+        try:
+            summary = await self.run_backup()
+        except Exception as e:
+            await ctx.send(f"❌ Backup failed: {e}")
+            return
+
+        embed = discord.Embed(title="💾 Database Backed Up", color=discord.Color.green())
+        embed.add_field(name="File", value=os.path.basename(summary["path"]), inline=False)
+        embed.add_field(name="Size", value=f"{summary['size'] / 1024:.0f} KB")
+        embed.add_field(name="Time", value=f"{summary['seconds']}s ({summary['steps']} steps)")
+        embed.add_field(name="Old Backups Removed", value=len(summary["pruned"]))
+        await ctx.send(embed=embed)
+
+    @commands.command(name="backups")
+    @is_developer()
+    async def backups_command(self, ctx):
+        """List the stored database snapshots."""
+        backups = list_backups()
+        if not backups:
+            await ctx.send("No backups found.")
+            return
+
+        lines = [f"`{os.path.basename(path)}` — {os.path.getsize(path) / 1024:.0f} KB" for path in backups[:15]]
+        embed = discord.Embed(title="💾 Database Backups", description="\n".join(lines), color=discord.Color.blue())
+        embed.set_footer(text=f"{len(backups)} stored • keeping {BACKUP_RETENTION} • every {BACKUP_INTERVAL_HOURS:g}h")
+        await ctx.send(embed=embed)
+
+    @commands.command(name="verifybackup")
+    @is_developer()
+    async def verify_command(self, ctx, name: str = None):
+        """Run an integrity check on a snapshot (the newest by default)."""
+        backups = list_backups()
+        path = resolve_backup(name) if name else (backups[0] if backups else None)
+        if not path:
+            await ctx.send("❌ Backup not found.")
+            return
+
+        ok, message = await asyncio.get_running_loop().run_in_executor(None, verify_backup, path)
+        status = "✅ passed" if ok else f"❌ failed: {message}"
+        await ctx.send(f"Integrity check for `{os.path.basename(path)}` {status}")
+
+async def setup(bot):
+    await bot.add_cog(Backup(bot))
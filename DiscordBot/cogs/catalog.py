@@ -0,0 +1,60 @@
+import asyncio
+import discord
+from discord.ext import commands, tasks
+from utils.catalog import character_catalog
+from utils.permissions import is_developer
+from utils.metrics import instrument_loop
+
+# How often the watcher stats the asset tree for changes
+POLL_SECONDS = 30
+
+class Catalog(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.watch_task.start()
+
+    def cog_unload(self):
+        self.watch_task.cancel()
+
+    async def reload_catalog(self):
+        """Reload changed asset files off the event loop."""
+        return await asyncio.get_running_loop().run_in_executor(None, character_catalog.reload)
+
+    @tasks.loop(seconds=POLL_SECONDS)
+    @instrument_loop()
+    async def watch_task(self):
+        """Poll asset file mtimes and hot-reload the catalog when something changed."""
+        # on_ready builds the first snapshot
+        if not character_catalog.loaded:
+            return
+        summary = await self.reload_catalog()
+        if summary:
+            print(
+                f"Catalog reloaded (v{summary['version']}): {summary['reloaded_files']} files changed, "
+                f"{summary['removed_files']} removed."
+            )
+
+    @watch_task.before_loop
+    async def before_watch_task(self):
+        await self.bot.wait_until_ready()
+
+    @commands.command(name="reloadcatalog", aliases=["catalogreload"])
+    @is_developer()
+    async def reload_command(self, ctx):
+        """Reload changed character files without restarting the bot."""
+        summary = await self.reload_catalog()
+        if not summary:
+            await ctx.send("📚 Catalog is already up to date.")
+            return
+
+        embed = discord.Embed(title="📚 Catalog Reloaded", color=discord.Color.green())
+        embed.add_field(name="Files Changed", value=summary.get("reloaded_files", summary.get("changed", 0)))
+        embed.add_field(name="Files Removed", value=summary.get("removed_files", summary.get("removed", 0)))
+        embed.add_field(name="Characters Added", value=summary.get("characters_added", 0))
+        embed.add_field(name="Characters Updated", value=summary.get("characters_updated", 0))
+        embed.add_field(name="Images +/-", value=f"+{summary.get('images_added', 0)} / -{summary.get('images_removed', 0)}")
+        embed.set_footer(text=f"Snapshot v{character_catalog.current.version} • {len(character_catalog.current)} characters")
+        await ctx.send(embed=embed)
+
+async def setup(bot):
+    await bot.add_cog(Catalog(bot))
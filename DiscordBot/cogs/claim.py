@@ -1,15 +1,11 @@
 import discord
-import random
-import string
 from discord.ext import commands
 from models.base import get_db
 from models.character import Character
-from models.server import Server
-from utils.db import get_all_characters, add_card, get_user
-
-def generate_global_id():
-    """Generate a unique global ID for a card."""
-    return ''.join(random.choices(string.ascii_lowercase + string.digits, k=7))
+from utils.db import add_card, get_user
+from utils.guild_config import guild_config_cache
+from utils.catalog import character_catalog
+from utils.stat_counters import stat_counters
 
 class Claim(commands.Cog):
     def __init__(self, bot):
@@ -43,18 +39,11 @@ class Claim(commands.Cog):
             return
             
         # Get character info
-        all_characters = get_all_characters()
-        matched_key = None
-        for key in all_characters:
-            if key.strip().lower() == spawned_name:
-                matched_key = key
-                break
-                
-        if not matched_key:
+        matched_key = spawn_cog.currently_spawned[guild_id]
+        character_info = character_catalog.current.get(matched_key)
+        if not character_info:
             await ctx.send("❌ Error: Spawned character not found!")
             return
-            
-        character_info = all_characters[matched_key]
         
         # Get character from database
         db = get_db()
@@ -68,7 +57,7 @@ class Claim(commands.Cog):
         claimed_image = spawn_cog.current_image[guild_id] if guild_id in spawn_cog.current_image else character_info.get("primary_image", {}).get("url", "https://via.placeholder.com/300")
         
         card = add_card(
-            user_id=str(ctx.author.id),
+            user_id=ctx.author.id,
             character_id=character.id,
             rarity=spawn_cog.current_rarity[guild_id],
             claimed_artwork=claimed_image,
@@ -79,11 +68,9 @@ class Claim(commands.Cog):
             await ctx.send("❌ Error: Failed to create card!")
             return
             
-        # Update server statistics
-        server = db.query(Server).filter(Server.id == str(guild_id)).first()
-        if server:
-            server.total_claims += 1
-            db.commit()
+        # Update server statistics (registered servers only)
+        if guild_config_cache.is_registered(guild_id):
+            stat_counters.increment("servers", guild_id, "total_claims")
             
         # Send success message
         await ctx.send(f"🌟 {ctx.author.mention}, you claimed **[{spawn_cog.current_rarity[guild_id]}] {matched_key}**! (Global ID: {card.global_id})")
@@ -1,30 +1,9 @@
 import discord
-import os
-import json
 import random
 import asyncio
 from discord.ext import commands
-from utils.db import get_user, update_user
-
-def load_characters():
-    characters = {}
-    base_dir = "DiscordBot/assets/characters/"
-    print(f"Loading characters from {base_dir}")
-    for root, dirs, files in os.walk(base_dir):
-        for file in files:
-            if file.endswith(".json"):
-                file_path = os.path.join(root, file)
-                try:
-                    with open(file_path, "r") as f:
-                        data = json.load(f)
-                        characters.update(data)
-                        print(f"Loaded: {file_path}")
-                except Exception as e:
-                    print(f"Error reading {file_path}: {e}")
-    print(f"Total characters loaded: {len(characters)}")
-    return characters
-
-ALL_CHARACTERS = load_characters()
+from utils.db import get_user, update_user, get_card_ids_by_rarity
+from models.rarity import rarity_rank
 
 def format_card_line(card, position=None):
     # Optionally add emoji for rarity (customize these as you wish)
@@ -43,24 +22,30 @@ def format_card_line(card, position=None):
     display_number = position if position is not None else card.get('order', '?')
     return f"`{display_number}` {emoji} {fav}{card.get('name', 'Unknown')} • [ID: {card.get('global_id','N/A')}]"
 
-# Updated rarity order: highest to lowest (UR highest)
-RARITY_ORDER = {"N": 1, "R": 2, "SR": 3, "SSR": 4, "UR": 5}
-
-def sort_cards(cards, criteria):
+def sort_by_rarity(cards, owner_id=None):
+    """Highest rarity first. With an owner, the order comes from the (owner_id, rarity_rank) index."""
+    if owner_id is not None:
+        by_id = {card.get("global_id"): card for card in cards}
+        ordered = [by_id.pop(global_id) for global_id in get_card_ids_by_rarity(owner_id) if global_id in by_id]
+        # Cards that aren't in the database yet (legacy JSON) go last
+        rest = sorted(by_id.values(), key=lambda c: rarity_rank(c.get("rarity", "N")), reverse=True)
+        return ordered + rest
+    return sorted(cards, key=lambda c: rarity_rank(c.get("rarity", "N")), reverse=True)
+
+def sort_cards(cards, criteria, owner_id=None):
     # Note: Make sure the criteria string matches the labels in the select
     if criteria == "🔢 Default":
         return sorted(cards, key=lambda c: c.get("order", 0))
     elif criteria == "💖 Wishlist":
         return sorted(cards, key=lambda c: (not c.get("wishlist", False), c.get("order", 0)))
     elif criteria == "🔥 Rarity":
-        # Highest rarity first
-        return sorted(cards, key=lambda c: RARITY_ORDER.get(c.get("rarity", "N"), 0), reverse=True)
+        return sort_by_rarity(cards, owner_id)
     elif criteria == "🔤 Alphabetical":
         return sorted(cards, key=lambda c: c.get("name", "").lower())
     elif criteria == "❤️ Affection":
         return sorted(cards, key=lambda c: c.get("affection", 0), reverse=True)
     elif criteria == "✨ Ascension":
-        return sorted(cards, key=lambda c: c.get("ascension", RARITY_ORDER.get(c.get("rarity", "N"), 0)))
+        return sorted(cards, key=lambda c: c.get("ascension", rarity_rank(c.get("rarity", "N"))))
     elif criteria == "🎉 Event":
         return sorted(cards, key=lambda c: (not c.get("event", False), c.get("order", 0)))
     return cards
@@ -81,7 +66,7 @@ class CollectionSortSelect(discord.ui.Select):
 
     async def callback(self, interaction: discord.Interaction):
         self.parent_view.sort_option = self.values[0]
-        sorted_cards = sort_cards(self.parent_view.original_cards, self.parent_view.sort_option)
+        sorted_cards = sort_cards(self.parent_view.original_cards, self.parent_view.sort_option, self.parent_view.author.id)
         self.parent_view.pages = [sorted_cards[i:i + self.parent_view.items_per_page]
                                   for i in range(0, len(sorted_cards), self.parent_view.items_per_page)]
         self.parent_view.current_page = 0
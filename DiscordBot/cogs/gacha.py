@@ -1,13 +1,94 @@
+import discord
 from discord.ext import commands
-import random
+from config import GACHA_PULL_COUNTS
+from models.rarity import RARITIES, RARITY_RANKS
+from utils.gacha import BANNERS, GachaError, pull, get_pity, grant_tickets
+from utils.permissions import is_developer
+
+DEFAULT_BANNER = "standard"
+
+# Cards listed one by one in a pull result; bigger pulls list only the best ones
+LISTED_CARDS = 10
+
+RARITY_EMOJI = {"N": "⚪", "R": "🟣", "SR": "🟠", "SSR": "🔴", "UR": "🟡", "LR": "🌸", "ER": "💎"}
 
 class Gacha(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-    @commands.command(name="gacha")
-    async def gacha_command(self, ctx):
-        await ctx.send("Gacha command triggered!")
+    @commands.command(name="gacha", aliases=["pull"])
+    @commands.cooldown(1, 3, commands.BucketType.user)
+    async def gacha_command(self, ctx, pulls: int = 1, banner: str = DEFAULT_BANNER):
+        """
+        Spend gacha tickets on a banner.
+        Usage: !gacha [1|10|100] [banner]
+        """
+        if pulls not in GACHA_PULL_COUNTS:
+            await ctx.send(f"❌ You can pull {', '.join(str(count) for count in GACHA_PULL_COUNTS)} at a time.")
+            return
+
+        try:
+            result = pull(ctx.author.id, banner.lower(), pulls)
+        except GachaError as e:
+            await ctx.send(f"❌ {e}")
+            return
+        selected = BANNERS[banner.lower()]
+
+        cards = result["cards"]
+        best = sorted(cards, key=lambda card: RARITY_RANKS[card["rarity"]], reverse=True)
+        top = best[0]
+        embed = discord.Embed(
+            title=f"🎰 {selected.name} • {pulls}x Pull",
+            color=discord.Color.gold() if RARITY_RANKS[top["rarity"]] >= selected.pity_rank else discord.Color.blurple()
+        )
+
+        shown = cards if len(cards) <= LISTED_CARDS else best[:LISTED_CARDS]
+        lines = [
+            f"{RARITY_EMOJI.get(card['rarity'], '')} **[{card['rarity']}] {card['name']}** • `{card['global_id']}`"
+            for card in shown
+        ]
+        if len(cards) > LISTED_CARDS:
+            counts = {}
+            for card in cards:
+                counts[card["rarity"]] = counts.get(card["rarity"], 0) + 1
+            summary = " • ".join(f"{code} ×{counts[code]}" for code in reversed(RARITIES) if code in counts)
+            lines.append(f"\n**All pulls:** {summary}")
+        embed.description = "\n".join(lines)
+        embed.set_thumbnail(url=top["claimed_artwork"])
+        embed.set_footer(text=f"Pity: {result['pity']}/{selected.pity_pulls} • Tickets left: {result['tickets']}")
+        await ctx.send(embed=embed)
+
+    @commands.command(name="banner", aliases=["rates"])
+    async def banner_command(self, ctx, banner: str = DEFAULT_BANNER):
+        """Show a banner's rates and your pity progress."""
+        selected = BANNERS.get(banner.lower())
+        if not selected:
+            await ctx.send(f"❌ Unknown banner. Available: {', '.join(BANNERS)}")
+            return
+
+        effective = selected.effective_rates()
+        lines = [
+            f"{RARITY_EMOJI.get(code, '')} **{code}** • {rate * 100:g}% ({effective[code] * 100:.2f}% with pity)"
+            for code, rate in reversed(list(selected.rates.items()))
+        ]
+        embed = discord.Embed(title=f"🎰 {selected.name}", description="\n".join(lines), color=discord.Color.blurple())
+
+        pity, tickets = get_pity(ctx.author.id, selected.key)
+        if selected.pity_pulls:
+            embed.add_field(
+                name="Pity",
+                value=f"{selected.pity_rarity} or better guaranteed within {selected.pity_pulls} pulls. You're at {pity}/{selected.pity_pulls}.",
+                inline=False
+            )
+        embed.set_footer(text=f"{selected.cost} ticket{'s' if selected.cost != 1 else ''} per pull • You have {tickets}")
+        await ctx.send(embed=embed)
+
+    @commands.command(name="granttickets")
+    @is_developer()
+    async def grant_tickets_command(self, ctx, member: discord.Member, amount: int):
+        """Give a user gacha tickets (developer only)."""
+        tickets = grant_tickets(member.id, amount)
+        await ctx.send(f"🎟️ {member.mention} now has {tickets} gacha tickets.")
 
 async def setup(bot):
     await bot.add_cog(Gacha(bot))
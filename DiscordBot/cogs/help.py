@@ -3,11 +3,10 @@ import random
 import io
 import colorsys
 from discord.ext import commands
-from PIL import Image, ImageDraw, ImageFont
 from utils.db import get_user, update_user
+from models.rarity import rarity_rank
+from utils.metrics import image_seconds, timer
 
-# Define rarity mapping (lowest to highest)
-RARITY_ORDER = {"N": 1, "R": 2, "SR": 3, "SSR": 4, "UR": 5, "LR": 6, "ER": 7}
 
 def get_profile_rank(card_count: int) -> tuple:
     """
@@ -30,6 +29,8 @@ def generate_rainbow_text_image(text: str, font_path="arial.ttf", font_size=48)
     Generate an image of the given text with each letter in a different rainbow color.
     Returns a discord.File object containing the PNG image.
     """
+    # Imported on first use so loading the cog doesn't pull in PIL
+    from PIL import Image, ImageDraw, ImageFont
     try:
         font = ImageFont.truetype(font_path, font_size)
     except Exception:
@@ -81,7 +82,7 @@ class Profile(commands.Cog):
         # Determine the showcase card: use user's favourite if set; otherwise, pick highest rarity.
         favourite_card = user_data.get("favourite_card")
         if not favourite_card and cards:
-            favourite_card = max(cards, key=lambda c: RARITY_ORDER.get(c.get("rarity", "N"), 0))
+            favourite_card = max(cards, key=lambda c: rarity_rank(c.get("rarity", "N")))
         favourite_image = (
             favourite_card.get("claimed_artwork")
             if favourite_card and favourite_card.get("claimed_artwork")
@@ -108,7 +109,8 @@ class Profile(commands.Cog):
             rank_text = rank
 
         # Generate the rainbow rank text image.
-        rank_file = generate_rainbow_text_image(rank_text)
+        with timer(image_seconds, stage="rank_text"):
+            rank_file = generate_rainbow_text_image(rank_text)
 
         # Build the profile embed.
         embed = discord.Embed(
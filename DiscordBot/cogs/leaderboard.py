@@ -1,12 +1,72 @@
-from discord.ext import commands
+import discord
+import asyncio
+from discord.ext import commands, tasks
+from models.leaderboard import METRIC_CARDS, METRIC_RARITY, METRIC_AFFECTION
+from utils.leaderboard import get_top, get_rank, recompute_ranks, rebuild_scores, is_empty
+from utils.metrics import instrument_loop
+
+# Command argument -> (metric, title, unit)
+METRIC_ALIASES = {
+    "cards": (METRIC_CARDS, "📦 Most Cards", "cards"),
+    "rarity": (METRIC_RARITY, "💎 Rarest Collections", "pts"),
+    "affection": (METRIC_AFFECTION, "💖 Most Affection", "affection")
+}
 
 class Leaderboard(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.rank_task.start()
+
+    def cog_unload(self):
+        self.rank_task.cancel()
+
+    @tasks.loop(minutes=15)
+    @instrument_loop()
+    async def rank_task(self):
+        """Periodically recompute stored ranks from the score tables."""
+        loop = asyncio.get_running_loop()
+        # Bootstrap scores from existing cards the first time around
+        if await loop.run_in_executor(None, is_empty):
+            rebuilt = await loop.run_in_executor(None, rebuild_scores)
+            print(f"Rebuilt leaderboard scores for {rebuilt} users.")
+        ranked = await loop.run_in_executor(None, recompute_ranks)
+        print(f"Recomputed {ranked} leaderboard ranks.")
+
+    @rank_task.before_loop
+    async def before_rank_task(self):
+        await self.bot.wait_until_ready()
+
+    @commands.command(name="leaderboard", aliases=["lb"])
+    async def leaderboard(self, ctx, metric: str = "rarity"):
+        """Show the top players for a metric (cards, rarity or affection)."""
+        metric_key = metric.strip().lower()
+        if metric_key not in METRIC_ALIASES:
+            await ctx.send(f"Invalid leaderboard. Use one of: {', '.join(METRIC_ALIASES)}")
+            return
+
+        metric_name, title, unit = METRIC_ALIASES[metric_key]
+        top = get_top(metric_name, limit=10)
+
+        medals = {1: "🥇", 2: "🥈", 3: "🥉"}
+        lines = []
+        for position, (user_id, username, score) in enumerate(top, 1):
+            prefix = medals.get(position, f"`{position}`")
+            name = username or f"<@{user_id}>"
+            lines.append(f"{prefix} **{name}** • {score} {unit}")
+
+        embed = discord.Embed(
+            title=f"🏆 Leaderboard • {title}",
+            description="\n".join(lines) if lines else "Nobody is on this leaderboard yet!",
+            color=discord.Color.gold()
+        )
+
+        rank, score = get_rank(ctx.author.id, metric_name)
+        if rank:
+            embed.set_footer(text=f"Your rank: #{rank} • {score} {unit}")
+        else:
+            embed.set_footer(text="You are unranked. Claim some cards first!")
 
-    @commands.command(name="leaderboard")
-    async def leaderboard(self, ctx):
-        await ctx.send("Leaderboard placeholder.")
+        await ctx.send(embed=embed)
 
 async def setup(bot):
     await bot.add_cog(Leaderboard(bot))
@@ -1,94 +1,61 @@
-import os
-import json
 import math
 import random
-import requests
 import asyncio
 import functools
 from io import BytesIO
-from PIL import Image, ImageOps
-from discord.ext import commands
+from discord.ext import commands, tasks
 from concurrent.futures import ThreadPoolExecutor
 import discord
-# Set to 8 threads for optimal performance
-executor = ThreadPoolExecutor(max_workers=8)
+from utils.metrics import image_seconds, timer, timed, instrument_loop
 
-def load_characters():
-    characters = {}
-    base_dir = "DiscordBot/assets/characters/"
-    for root, dirs, files in os.walk(base_dir):
-        for file in files:
-            if file.endswith(".json"):
-                file_path = os.path.join(root, file)
-                try:
-                    with open(file_path, "r", encoding="utf-8") as f:
-                        data = json.load(f)
-                        # Allow both dicts (with "id" and "name") and nested dicts
-                        if isinstance(data, dict) and "id" in data and "name" in data:
-                            key = data["name"].strip().lower()
-                            characters[key] = data
-                        else:
-                            for key, value in data.items():
-                                characters[key.strip().lower()] = value
-                except Exception as e:
-                    print(f"Error reading {file_path}: {e}")
-    return characters
+# PIL and requests are imported inside the image helpers so loading this cog stays cheap
+_executor = None
 
-def initialize_wishlist_counts():
-    """Initialize wishlist counts for all characters"""
-    from utils.db import load_db 
-    user_data = load_db()
-    wishlist_counts = {}
-    for user_id, data in user_data.items():
-        wishlist = data.get("wishlist", [])
-        for character in wishlist:
-            char_key = character.strip().lower()
-            wishlist_counts[char_key] = wishlist_counts.get(char_key, 0) + 1
-    for char_key, count in wishlist_counts.items():
-        if char_key in ALL_CHARACTERS:
-            ALL_CHARACTERS[char_key]["wishlists"] = count
-    for char_data in ALL_CHARACTERS.values():
-        if "wishlists" not in char_data or char_data["wishlists"] == "N/A":
-            char_data["wishlists"] = 0
-    print(f"Initialized wishlist counts for {len(wishlist_counts)} characters")
-
-# Load characters and initialize wishlist counts
-ALL_CHARACTERS = load_characters()
-try:
-    initialize_wishlist_counts()
-except Exception as e:
-    print(f"Error initializing wishlist counts: {e}")
+def get_executor():
+    """Get the image worker pool, creating it on first use."""
+    global _executor
+    if _executor is None:
+        # Set to 8 threads for optimal performance
+        _executor = ThreadPoolExecutor(max_workers=8)
+    return _executor
 
 # Asynchronous image fetching with thread pool
 async def fetch_image(url, session=None):
     """Fetch an image from a URL and return it as a PIL Image in RGBA mode"""
+    from PIL import Image
+    executor = get_executor()
     try:
-        if session:
-            async with session.get(url, timeout=15) as response:
-                if response.status != 200:
+        with timer(image_seconds, stage="fetch"):
+            if session:
+                async with session.get(url, timeout=15) as response:
+                    if response.status != 200:
+                        return None
+                    image_data = await response.read()
+            else:
+                import requests
+                loop = asyncio.get_running_loop()
+                response = await loop.run_in_executor(
+                    executor,
+                    functools.partial(requests.get, url, timeout=10)
+                )
+                if response.status_code != 200:
                     return None
-                image_data = await response.read()
-        else:
-            loop = asyncio.get_running_loop()
-            response = await loop.run_in_executor(
+                image_data = response.content
+        with timer(image_seconds, stage="decode"):
+            # Open image using PIL in a thread so as not to block the loop
+            image = await asyncio.get_running_loop().run_in_executor(
                 executor,
-                functools.partial(requests.get, url, timeout=10)
+                functools.partial(Image.open, BytesIO(image_data))
             )
-            if response.status_code != 200:
-                return None
-            image_data = response.content
-        # Open image using PIL in a thread so as not to block the loop
-        image = await asyncio.get_running_loop().run_in_executor(
-            executor,
-            functools.partial(Image.open, BytesIO(image_data))
-        )
-        return image.convert("RGBA")
+            return image.convert("RGBA")
     except Exception as e:
         print(f"Error loading image {url}: {e}")
         return None
 
+@timed(image_seconds, stage="collage")
 async def create_collage(image_urls, grid_cols=4, spacing=5, target_width=2400):
     """Create a high-resolution collage for given image URLs"""
+    from PIL import Image
     image_tasks = [fetch_image(url) for url in image_urls if url]
     loaded_images = await asyncio.gather(*image_tasks)
     images = [img for img in loaded_images if img]
@@ -125,8 +92,10 @@ async def create_collage(image_urls, grid_cols=4, spacing=5, target_width=2400):
     buffer.seek(0)
     return buffer.getvalue()
 
+@timed(image_seconds, stage="render")
 async def create_collage_with_images(images, grid_cols=4, rows=2, spacing=5, target_width=2400):
     """Create a collage directly from PIL images"""
+    from PIL import Image
     if not images:
         blank = Image.new("RGBA", (1200, 800), (0, 0, 0, 0))
         buffer = BytesIO()
@@ -161,6 +130,7 @@ async def create_collage_with_images(images, grid_cols=4, rows=2, spacing=5, tar
 
 async def create_collage_pages(image_urls, images_per_page=8, grid_cols=4):
     """Create pages of collages from image URLs"""
+    from PIL import Image
     image_tasks = [fetch_image(url) for url in image_urls if url]
     loaded_images = await asyncio.gather(*image_tasks)
     all_images = [img for img in loaded_images if img]
@@ -351,7 +321,10 @@ class LookupFullSizeView(discord.ui.View):
 from models.base import get_db
 from models.series import Series
 from models.character import Character, CharacterImage
-from utils.db import add_character
+from utils.db import add_character, get_character, find_character, get_character_owner_stats
+from utils.stats import refresh_series_statistics
+from utils.affection_rank import affection_ranking
+from utils.catalog import character_catalog
 
 # Sample Genshin Impact character data
 GENSHIN_CHARACTERS = [
@@ -442,34 +415,53 @@ def add_genshin_impact_series():
     print(f"Added Genshin Impact series with {len(GENSHIN_CHARACTERS)} characters.")
     return series
 
+def get_character_stats(character_name):
+    """Get live wishlist and biggest simp stats for a character from the database."""
+    character = get_character(name=character_name)
+    if not character:
+        return {"wishlists": 0, "biggest_simp": "N/A"}
+        
+    owner_id, affection = affection_ranking.biggest_simp(character.id)
+    biggest_simp = f"<@{owner_id}> (💖 {affection})" if owner_id else "N/A"
+    
+    return {"wishlists": character.wishlist_count or 0, "biggest_simp": biggest_simp}
+
 class Lookup(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         # Add Genshin Impact series when the cog is loaded
         self.bot.loop.create_task(self.add_genshin_impact())
+        self.series_stats_task.start()
+        
+    def cog_unload(self):
+        self.series_stats_task.cancel()
+        
+    @tasks.loop(hours=1)
+    @instrument_loop()
+    async def series_stats_task(self):
+        """Refresh denormalized series statistics in bulk."""
+        refreshed = await asyncio.get_running_loop().run_in_executor(get_executor(), refresh_series_statistics)
+        print(f"Refreshed statistics for {refreshed} series.")
+        
+    @series_stats_task.before_loop
+    async def before_series_stats_task(self):
+        await self.bot.wait_until_ready()
     
     async def add_genshin_impact(self):
         """Add Genshin Impact series in a non-blocking way."""
         await self.bot.wait_until_ready()
         # Run in executor to avoid blocking the event loop
-        await asyncio.get_event_loop().run_in_executor(executor, add_genshin_impact_series)
+        await asyncio.get_event_loop().run_in_executor(get_executor(), add_genshin_impact_series)
 
     @commands.command(name="lookup")
     async def lookup(self, ctx, *, identifier: str):
         initial_message = await ctx.reply("🔍 Searching for character...", mention_author=False)
-        key = identifier.strip().lower()
-        char_data = None
-        if key.isdigit():
-            num_key = int(key)
-            for data in ALL_CHARACTERS.values():
-                if data.get("id") == num_key:
-                    char_data = data
-                    break
-        else:
-            char_data = ALL_CHARACTERS.get(key)
+        char_data = character_catalog.current.find(identifier)
         if not char_data:
             await initial_message.edit(content="❌ Character not found, please check the spelling!")
             return
+        # Copy so per-lookup stats never leak into the shared catalog
+        char_data = dict(char_data, **get_character_stats(char_data.get("name")))
         await initial_message.edit(content=f"✅ Found **{char_data.get('name', 'Unknown')}**!\n⏳ Loading images (1/3)...")
         image_urls = []
         full_images = []
@@ -495,10 +487,7 @@ class Lookup(commands.Cog):
             description=f"Series: {char_data.get('series', 'Unknown')}",
             color=0x7289DA
         )
-        wishlist_count = char_data.get('wishlists', 0)
-        if isinstance(wishlist_count, str) and wishlist_count == 'N/A':
-            wishlist_count = 0
-        embed.add_field(name="Wishlists", value=str(wishlist_count), inline=True)
+        embed.add_field(name="Wishlists", value=str(char_data.get('wishlists', 0)), inline=True)
         embed.add_field(name="Biggest Simp", value=char_data.get('biggest_simp', 'N/A'), inline=True)
         embed.add_field(name="Events", value=char_data.get('events', 'N/A'), inline=True)
         if primary_url:
@@ -521,12 +510,15 @@ class Lookup(commands.Cog):
             await initial_message.edit(content="❌ Series not found, please check the spelling!")
             return
         
-        # Get characters in series
-        characters = series.characters
+        # Only the first few characters are shown, so don't load the rest
+        characters = db.query(Character).filter(Character.series_id == series.id).order_by(Character.id).limit(10).all()
         
         if not characters:
             await initial_message.edit(content=f"✅ Found series **{series.name}**, but it has no characters yet.")
             return
+            
+        # Totals come from the periodic statistics refresh
+        total_characters = series.total_characters or len(characters)
         
         # Create embed with series information
         embed = discord.Embed(
@@ -545,9 +537,11 @@ class Lookup(commands.Cog):
         
         # Add character list
         character_list = "\n".join([f"• {character.name}" for character in characters[:10]])
-        if len(characters) > 10:
-            character_list += f"\n... and {len(characters) - 10} more"
-        embed.add_field(name=f"Characters ({len(characters)})", value=character_list, inline=False)
+        if total_characters > 10:
+            character_list += f"\n... and {total_characters - 10} more"
+        embed.add_field(name=f"Characters ({total_characters})", value=character_list, inline=False)
+        if series.popularity_rank:
+            embed.add_field(name="Popularity", value=f"#{series.popularity_rank}", inline=True)
         
         # Add series image if available
         if series.image_url:
@@ -593,5 +587,31 @@ class Lookup(commands.Cog):
                 
                 await ctx.send(embed=collage_embed, file=file)
 
+    @commands.command(name="owners")
+    async def owners(self, ctx, *, character_name: str):
+        """Show who owns a character."""
+        character = find_character(character_name)
+        if not character:
+            await ctx.send("❌ Character not found, please check the spelling!")
+            return
+            
+        owner_count, top_owners = get_character_owner_stats(character.id)
+        
+        if not owner_count:
+            description = "Nobody owns this character yet!"
+        else:
+            description = "\n".join(
+                f"`{position}` <@{owner_id}> • {copies} card{'s' if copies != 1 else ''}"
+                for position, (owner_id, copies) in enumerate(top_owners, 1)
+            )
+            
+        embed = discord.Embed(
+            title=f"Owners of {character.name}",
+            description=description,
+            color=0x7289DA
+        )
+        embed.set_footer(text=f"{owner_count} owner{'s' if owner_count != 1 else ''}")
+        await ctx.send(embed=embed)
+
 async def setup(bot):
     await bot.add_cog(Lookup(bot))
\ No newline at end of file
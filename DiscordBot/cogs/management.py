@@ -1,6 +1,7 @@
 import discord
 from discord.ext import commands
-from utils.db import get_user, update_user
+from utils.db import get_user, find_character, add_to_wishlist, remove_from_wishlist, get_wishlist, set_user_setting
+from utils.wishlist_index import wishlist_index, NOTIFY_MODES, NOTIFY_SETTING
 
 EMOJI = {
     "currency": "<:gold:1345000286128832606>",
@@ -16,9 +17,8 @@ class Management(commands.Cog):
 
     @commands.group(name="wishlist", invoke_without_command=True)
     async def wishlist(self, ctx):
-        user_data = get_user(ctx.author.id)
-        wishlist = user_data.get("wishlist", [])
-        if not wishlist:
+        view = WishlistView(ctx.author)
+        if not view.total:
             embed = discord.Embed(
                 title=f"{ctx.author.display_name}'s Wishlist",
                 description="Your wishlist is empty! Add characters with `!wishlist add <character_name>`",
@@ -27,69 +27,50 @@ class Management(commands.Cog):
             await ctx.send(embed=embed)
         else:
             # Create paginated wishlist view
-            view = WishlistView(wishlist, ctx.author)
             embed = view.get_embed()
             await ctx.send(embed=embed, view=view)
 
     @wishlist.command(name="add")
     async def wishlist_add(self, ctx, *, waifu: str):
-        user_data = get_user(ctx.author.id)
-        wishlist = user_data.get("wishlist", [])
-        if waifu in wishlist:
+        character = find_character(waifu)
+        if not character:
+            await ctx.send("❌ Character not found, please check the spelling!")
+            return
+            
+        if not add_to_wishlist(ctx.author.id, character.id):
             await ctx.send("That waifu is already in your wishlist!")
         else:
-            wishlist.append(waifu)
-            update_user(ctx.author.id, "wishlist", wishlist)
-            
-            # Update character wishlist count in ALL_CHARACTERS if available
-            try:
-                from cogs.lookup import ALL_CHARACTERS
-                waifu_key = waifu.strip().lower()
-                if waifu_key in ALL_CHARACTERS:
-                    char_data = ALL_CHARACTERS[waifu_key]
-                    wishlist_count = char_data.get('wishlists', 0)
-                    if isinstance(wishlist_count, str) and wishlist_count == 'N/A':
-                        wishlist_count = 0
-                    char_data['wishlists'] = wishlist_count + 1
-            except (ImportError, AttributeError):
-                pass  # Silently fail if lookup module not available
-                
             embed = discord.Embed(
                 title="Wishlist Updated",
-                description=f"Added **{waifu}** to your wishlist!",
+                description=f"Added **{character.name}** to your wishlist!",
                 color=discord.Color.green()
             )
             await ctx.send(embed=embed)
 
     @wishlist.command(name="remove")
     async def wishlist_remove(self, ctx, *, waifu: str):
-        user_data = get_user(ctx.author.id)
-        wishlist = user_data.get("wishlist", [])
-        if waifu not in wishlist:
+        character = find_character(waifu)
+        if not character or not remove_from_wishlist(ctx.author.id, character.id):
             await ctx.send("That waifu is not in your wishlist!")
         else:
-            wishlist.remove(waifu)
-            update_user(ctx.author.id, "wishlist", wishlist)
-            
-            # Update character wishlist count in ALL_CHARACTERS if available
-            try:
-                from cogs.lookup import ALL_CHARACTERS
-                waifu_key = waifu.strip().lower()
-                if waifu_key in ALL_CHARACTERS:
-                    char_data = ALL_CHARACTERS[waifu_key]
-                    wishlist_count = char_data.get('wishlists', 0)
-                    if isinstance(wishlist_count, str) and wishlist_count == 'N/A':
-                        wishlist_count = 1
-                    char_data['wishlists'] = max(0, wishlist_count - 1)
-            except (ImportError, AttributeError):
-                pass  # Silently fail if lookup module not available
-                
             embed = discord.Embed(
                 title="Wishlist Updated",
-                description=f"Removed **{waifu}** from your wishlist!",
+                description=f"Removed **{character.name}** from your wishlist!",
                 color=discord.Color.red()
             )
             await ctx.send(embed=embed)
+
+    @wishlist.command(name="notify")
+    async def wishlist_notify(self, ctx, mode: str):
+        """Choose how you are told about wishlisted spawns: mention, dm or off."""
+        mode = mode.strip().lower()
+        if mode not in NOTIFY_MODES:
+            await ctx.send(f"Invalid mode. Use one of: {', '.join(NOTIFY_MODES)}")
+            return
+            
+        set_user_setting(ctx.author.id, NOTIFY_SETTING, mode)
+        wishlist_index.set_mode(ctx.author.id, mode)
+        await ctx.send(f"✅ Wishlist spawn notifications set to **{mode}**.")
 class WishlistButton(discord.ui.Button):
     def __init__(self, label, parent_view, action: str):
         super().__init__(label=label, style=discord.ButtonStyle.primary)
@@ -105,31 +86,32 @@ class WishlistButton(discord.ui.Button):
             self.parent_view.current_page = 0
         elif self.action == "prev" and self.parent_view.current_page > 0:
             self.parent_view.current_page -= 1
-        elif self.action == "next" and self.parent_view.current_page < len(self.parent_view.pages) - 1:
+        elif self.action == "next" and self.parent_view.current_page < self.parent_view.page_count - 1:
             self.parent_view.current_page += 1
         elif self.action == "last":
-            self.parent_view.current_page = len(self.parent_view.pages) - 1
+            self.parent_view.current_page = self.parent_view.page_count - 1
         
         await self.parent_view.update_message(interaction)
 
 class WishlistView(discord.ui.View):
-    def __init__(self, wishlist, author: discord.Member):
+    def __init__(self, author: discord.Member):
         super().__init__(timeout=120)
         self.author = author
-        self.wishlist = wishlist
         self.items_per_page = 10
-        self.pages = [wishlist[i:i+self.items_per_page] for i in range(0, len(wishlist), self.items_per_page)]
         self.current_page = 0
+        # Only the total is fetched up front; each page is its own LIMIT/OFFSET query
+        self.page_items, self.total = get_wishlist(author.id, 0, self.items_per_page)
+        self.page_count = max(1, -(-self.total // self.items_per_page))
         
         # Add navigation buttons if we have multiple pages
-        if len(self.pages) > 1:
+        if self.page_count > 1:
             self.add_item(WishlistButton("⏮️", self, "first"))
             self.add_item(WishlistButton("◀️", self, "prev"))
             self.add_item(WishlistButton("▶️", self, "next"))
             self.add_item(WishlistButton("⏭️", self, "last"))
     
     def get_embed(self):
-        if not self.pages:
+        if not self.total:
             return discord.Embed(
                 title=f"{self.author.display_name}'s Wishlist",
                 description="Your wishlist is empty!",
@@ -139,7 +121,7 @@ class WishlistView(discord.ui.View):
         # Format the wishlist items with numbers
         formatted_items = []
         start_idx = self.current_page * self.items_per_page
-        for i, item in enumerate(self.pages[self.current_page], 1):
+        for i, item in enumerate(self.page_items, 1):
             formatted_items.append(f"{start_idx + i}. **{item}**")
         
         embed = discord.Embed(
@@ -149,12 +131,13 @@ class WishlistView(discord.ui.View):
         )
         
         # Add pagination info
-        total_items = len(self.wishlist)
-        embed.set_footer(text=f"Page {self.current_page+1}/{len(self.pages)} • {total_items} character{'s' if total_items != 1 else ''}")
+        total_items = self.total
+        embed.set_footer(text=f"Page {self.current_page+1}/{self.page_count} • {total_items} character{'s' if total_items != 1 else ''}")
         
         return embed
     
     async def update_message(self, interaction: discord.Interaction):
+        self.page_items, self.total = get_wishlist(self.author.id, self.current_page * self.items_per_page, self.items_per_page)
         embed = self.get_embed()
         await interaction.response.edit_message(embed=embed, view=self)
     @commands.command(name="inventory")
@@ -0,0 +1,108 @@
+import os
+import discord
+from aiohttp import web
+from discord.ext import commands
+from utils.permissions import is_developer
+from utils.loop_watchdog import loop_watchdog
+from utils.metrics import (
+    registry, command_seconds, command_errors, command_queries, view_seconds,
+    loop_seconds, image_seconds, sql_seconds
+)
+
+# Port for the Prometheus scrape endpoint on localhost; 0 disables it
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+
+def _summary(histogram, label, limit=8):
+    """Lines of 'name  count  p50/p95' for one histogram, busiest label first."""
+    rows = []
+    for labels in histogram.label_sets():
+        count, total = histogram.stats(**labels)
+        rows.append((count, labels, total))
+    rows.sort(key=lambda row: row[0], reverse=True)
+    lines = []
+    for count, labels, total in rows[:limit]:
+        name = " ".join(labels.values()) if label is None else labels[label]
+        lines.append(
+            f"`{name}` ×{count} · p50 {histogram.quantile(0.5, **labels) * 1000:.0f}ms"
+            f" · p95 {histogram.quantile(0.95, **labels) * 1000:.0f}ms"
+        )
+    return "\n".join(lines) or "No data yet."
+
+class Metrics(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.runner = None
+
+    async def cog_load(self):
+        if not METRICS_PORT:
+            return
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle_metrics)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        try:
+            await web.TCPSite(self.runner, METRICS_HOST, METRICS_PORT).start()
+            print(f"Serving metrics on http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+        except OSError as e:
+            print(f"Error starting metrics endpoint: {e}")
+            await self.runner.cleanup()
+            self.runner = None
+
+    async def cog_unload(self):
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
+
+    async def handle_metrics(self, request):
+        return web.Response(body=registry.render().encode(), headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+    @commands.command(name="perf")
+    @is_developer()
+    async def perf(self, ctx):
+        """Summarize command, view, loop, image and SQL timings since startup."""
+        embed = discord.Embed(title="Performance", color=discord.Color.blurple())
+        embed.add_field(name="Commands", value=_summary(command_seconds, "command"), inline=False)
+
+        errors = sorted(command_errors.values.items(), key=lambda item: item[1], reverse=True)[:5]
+        embed.add_field(
+            name="Command errors",
+            value="\n".join(f"`{command}` {error} ×{count}" for (command, error), count in errors) or "None.",
+            inline=False
+        )
+
+        queries = []
+        for labels in command_queries.label_sets():
+            count, total = command_queries.stats(**labels)
+            if count:
+                queries.append((total / count, labels["command"]))
+        queries.sort(reverse=True)
+        embed.add_field(
+            name="SQL statements per command",
+            value="\n".join(f"`{command}` {average:.1f}" for average, command in queries[:5]) or "No data yet.",
+            inline=False
+        )
+
+        embed.add_field(name="Views", value=_summary(view_seconds, None, 5), inline=False)
+        embed.add_field(name="Loops", value=_summary(loop_seconds, "loop", 5), inline=False)
+        embed.add_field(name="Images", value=_summary(image_seconds, "stage", 5), inline=False)
+        embed.add_field(
+            name="Event loop blockers",
+            value="\n".join(
+                f"`{site}` ×{count} · {seconds:.1f}s total · max {longest * 1000:.0f}ms"
+                for site, count, seconds, longest in loop_watchdog.top_blockers()
+            ) or "None.",
+            inline=False
+        )
+
+        statements = 0
+        seconds = 0.0
+        for labels in sql_seconds.label_sets():
+            count, total = sql_seconds.stats(**labels)
+            statements += count
+            seconds += total
+        embed.set_footer(text=f"{statements} SQL statements, {seconds:.2f}s total")
+        await ctx.send(embed=embed)
+
+async def setup(bot):
+    await bot.add_cog(Metrics(bot))
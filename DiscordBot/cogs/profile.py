@@ -3,10 +3,11 @@ import random
 import io
 import os
 from discord.ext import commands
-from PIL import Image, ImageDraw, ImageFont
-from utils.db import get_user, update_user
+from utils.db import get_user, update_user, get_rarest_cards
+from models.rarity import rarity_rank
+from utils.affection_rank import get_simp_rank
+from utils.metrics import image_seconds, timer
 
-RARITY_ORDER = {"N": 1, "R": 2, "SR": 3, "SSR": 4, "UR": 5, "LR": 6, "ER": 7}
 developer_ids = {816735778339291186, 984783866072039435}
 
 class Profile(commands.Cog):
@@ -15,6 +16,9 @@ class Profile(commands.Cog):
 
     @commands.command(name="profile")
     async def profile(self, ctx, member: discord.Member = None):
+        # Imported on first use so loading the cog doesn't pull in PIL
+        from PIL import Image
+
         if member is None:
             member = ctx.author
 
@@ -31,21 +35,26 @@ class Profile(commands.Cog):
         if cards:
             biggest_simp = max(cards, key=lambda c: c.get("affection", 0))
             biggest_simp_name = biggest_simp.get("name", "N/A")
+            # Show where this user stands among all simps of that character
+            if biggest_simp.get("affection", 0) > 0 and biggest_simp.get("character_id"):
+                simp_rank = get_simp_rank(biggest_simp["character_id"], biggest_simp["affection"])
+                biggest_simp_name += f" (#{simp_rank} simp)"
         else:
             biggest_simp_name = "N/A"
 
         favourite_card = user_data.get("favourite_card")
         if not favourite_card and cards:
-            favourite_card = max(cards, key=lambda c: RARITY_ORDER.get(c.get("rarity", "N"), 0))
+            favourite_card = max(cards, key=lambda c: rarity_rank(c.get("rarity", "N")))
         showcase_image = favourite_card.get("claimed_artwork", "https://via.placeholder.com/800x600")
         favourite_name = favourite_card.get("name", "None")
 
         try:
-            if member.avatar:
-                avatar_bytes = io.BytesIO(await member.avatar.read())
-            else:
-                avatar_bytes = io.BytesIO()
-            avatar_img = Image.open(avatar_bytes).convert("RGBA").resize((100, 100))
+            with timer(image_seconds, stage="avatar"):
+                if member.avatar:
+                    avatar_bytes = io.BytesIO(await member.avatar.read())
+                else:
+                    avatar_bytes = io.BytesIO()
+                avatar_img = Image.open(avatar_bytes).convert("RGBA").resize((100, 100))
         except Exception as e:
             print(f"Error processing avatar: {e}")
             avatar_img = Image.new("RGBA", (100, 100), (0, 0, 0, 0))
@@ -90,7 +99,8 @@ class Profile(commands.Cog):
         if not cards:
             return await ctx.send("No cards found!")
         
-        rarest_cards = sorted(cards, key=lambda c: RARITY_ORDER.get(c.get("rarity", "N"), 0), reverse=True)[:5]
+        # Top 5 straight off the (owner_id, rarity_rank) index; JSON-only users are sorted here
+        rarest_cards = get_rarest_cards(member.id) or sorted(cards, key=lambda c: rarity_rank(c.get("rarity", "N")), reverse=True)[:5]
         stats_description = "\n".join([f"{c['name']} ({c['rarity']})" for c in rarest_cards])
         embed = discord.Embed(title=f"{member.display_name}'s Rarest Cards", description=stats_description, color=discord.Color.gold())
         await ctx.send(embed=embed)
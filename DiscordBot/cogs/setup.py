@@ -1,10 +1,10 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-from utils.db import get_user, update_user, get_server, update_server
+from utils.db import get_user, update_user, get_server, update_server, register_server, set_command_permission
 from models.base import get_db
 from models.user import User
-from models.server import Server
+from utils.guild_config import guild_config_cache
 import datetime
 
 class SetupView(discord.ui.View):
@@ -14,34 +14,17 @@ class SetupView(discord.ui.View):
         
     @discord.ui.button(label="Register Server", style=discord.ButtonStyle.primary, emoji="🏠")
     async def register_server(self, interaction: discord.Interaction, button: discord.ui.Button):
-        # Check if server is already registered
-        db = get_db()
-        server = db.query(Server).filter(Server.id == str(interaction.guild.id)).first()
+        # Register server with the command user as admin
+        registered = register_server(
+            interaction.guild.id,
+            interaction.guild.name,
+            admin_id=interaction.user.id,
+            admin_name=interaction.user.name
+        )
         
-        if server:
+        if not registered:
             await interaction.response.send_message(f"✅ Server **{interaction.guild.name}** is already registered!", ephemeral=False)
             return
-            
-        # Register server
-        server = Server(
-            id=str(interaction.guild.id),
-            name=interaction.guild.name,
-            registration_time=datetime.datetime.utcnow()
-        )
-        db.add(server)
-        
-        # Add admin (command user)
-        user = db.query(User).filter(User.id == str(interaction.user.id)).first()
-        if not user:
-            user = User(
-                id=str(interaction.user.id),
-                username=interaction.user.name,
-                join_date=datetime.datetime.utcnow()
-            )
-            db.add(user)
-            
-        server.add_admin(user)
-        db.commit()
         
         # Send confirmation message
         await interaction.response.send_message(f"✅ Server **{interaction.guild.name}** has been registered successfully with admin {interaction.user.mention}!", ephemeral=False)
@@ -50,7 +33,7 @@ class SetupView(discord.ui.View):
     async def register_user(self, interaction: discord.Interaction, button: discord.ui.Button):
         # Check if user is already registered
         db = get_db()
-        user = db.query(User).filter(User.id == str(interaction.user.id)).first()
+        user = db.query(User).filter(User.id == interaction.user.id).first()
         
         if user:
             # If user exists, just send a confirmation message
@@ -59,7 +42,7 @@ class SetupView(discord.ui.View):
             
         # Register user
         user = User(
-            id=str(interaction.user.id),
+            id=interaction.user.id,
             username=interaction.user.name,
             join_date=datetime.datetime.utcnow()
         )
@@ -72,21 +55,19 @@ class SetupView(discord.ui.View):
     @discord.ui.button(label="Set Spawn Channel", style=discord.ButtonStyle.secondary, emoji="🎮")
     async def set_spawn_channel(self, interaction: discord.Interaction, button: discord.ui.Button):
         # Check if server is registered
-        db = get_db()
-        server = db.query(Server).filter(Server.id == str(interaction.guild.id)).first()
+        config = guild_config_cache.get(interaction.guild.id)
         
-        if not server:
+        if not config:
             await interaction.response.send_message("This server is not registered! Please register the server first.", ephemeral=True)
             return
             
-        # Check if user is admin - compare string IDs instead of integer IDs
-        if str(interaction.user.id) not in [str(admin.id) for admin in server.admins]:
+        # Check if user is admin
+        if not config.is_admin(interaction.user.id):
             await interaction.response.send_message("You don't have permission to set the spawn channel!", ephemeral=True)
             return
             
         # Set spawn channel
-        server.spawn_channel_id = str(interaction.channel.id)
-        db.commit()
+        update_server(interaction.guild.id, interaction.guild.name, "spawn_channel_id", interaction.channel.id)
         
         # Send confirmation message
         await interaction.response.send_message(f"✅ Spawn channel has been set to {interaction.channel.mention}!", ephemeral=False)
@@ -94,15 +75,14 @@ class SetupView(discord.ui.View):
     @discord.ui.button(label="Manage Permissions", style=discord.ButtonStyle.danger, emoji="🔒")
     async def manage_permissions(self, interaction: discord.Interaction, button: discord.ui.Button):
         # Check if server is registered
-        db = get_db()
-        server = db.query(Server).filter(Server.id == str(interaction.guild.id)).first()
+        config = guild_config_cache.get(interaction.guild.id)
         
-        if not server:
+        if not config:
             await interaction.response.send_message("This server is not registered! Please register the server first.", ephemeral=True)
             return
             
-        # Check if user is admin - compare string IDs instead of integer IDs
-        if str(interaction.user.id) not in [str(admin.id) for admin in server.admins]:
+        # Check if user is admin
+        if not config.is_admin(interaction.user.id):
             await interaction.response.send_message("You don't have permission to manage permissions!", ephemeral=True)
             return
             
@@ -134,7 +114,7 @@ class Setup(commands.Cog):
         """Register yourself to start collecting cards."""
         # Check if user is already registered
         db = get_db()
-        user = db.query(User).filter(User.id == str(ctx.author.id)).first()
+        user = db.query(User).filter(User.id == ctx.author.id).first()
         
         if user:
             await ctx.send(f"✅ User **{ctx.author.name}** is already registered! Your data is safe.")
@@ -142,7 +122,7 @@ class Setup(commands.Cog):
             
         # Register user
         user = User(
-            id=str(ctx.author.id),
+            id=ctx.author.id,
             username=ctx.author.name,
             join_date=datetime.datetime.utcnow()
         )
@@ -155,34 +135,12 @@ class Setup(commands.Cog):
     @commands.has_permissions(administrator=True)
     async def register_server(self, ctx):
         """Register your server to use Taipu Bot."""
-        # Check if server is already registered
-        db = get_db()
-        server = db.query(Server).filter(Server.id == str(ctx.guild.id)).first()
+        # Register server with the command user as admin
+        registered = register_server(ctx.guild.id, ctx.guild.name, admin_id=ctx.author.id, admin_name=ctx.author.name)
         
-        if server:
+        if not registered:
             await ctx.send(f"✅ Server **{ctx.guild.name}** is already registered!")
             return
-            
-        # Register server
-        server = Server(
-            id=str(ctx.guild.id),
-            name=ctx.guild.name,
-            registration_time=datetime.datetime.utcnow()
-        )
-        db.add(server)
-        
-        # Add admin (command user)
-        user = db.query(User).filter(User.id == str(ctx.author.id)).first()
-        if not user:
-            user = User(
-                id=str(ctx.author.id),
-                username=ctx.author.name,
-                join_date=datetime.datetime.utcnow()
-            )
-            db.add(user)
-            
-        server.add_admin(user)
-        db.commit()
         
         await ctx.send(f"✅ Server **{ctx.guild.name}** has been registered successfully with admin {ctx.author.mention}!")
         
@@ -191,16 +149,12 @@ class Setup(commands.Cog):
     async def set_spawn_channel(self, ctx):
         """Set the channel where cards will spawn."""
         # Check if server is registered
-        db = get_db()
-        server = db.query(Server).filter(Server.id == str(ctx.guild.id)).first()
-        
-        if not server:
+        if not guild_config_cache.is_registered(ctx.guild.id):
             await ctx.send("This server is not registered! Please register the server first.")
             return
             
         # Set spawn channel
-        server.spawn_channel_id = str(ctx.channel.id)
-        db.commit()
+        update_server(ctx.guild.id, ctx.guild.name, "spawn_channel_id", ctx.channel.id)
         
         await ctx.send(f"✅ Spawn channel has been set to {ctx.channel.mention}!")
         
@@ -215,16 +169,12 @@ class Setup(commands.Cog):
     async def perm_allow(self, ctx, command: str, channel: discord.TextChannel):
         """Allow a command in a channel."""
         # Check if server is registered
-        db = get_db()
-        server = db.query(Server).filter(Server.id == str(ctx.guild.id)).first()
-        
-        if not server:
+        if not guild_config_cache.is_registered(ctx.guild.id):
             await ctx.send("This server is not registered! Please register the server first.")
             return
             
         # Set command permission
-        server.set_command_permission(command, "channel", [str(channel.id)], allow=True)
-        db.commit()
+        set_command_permission(ctx.guild.id, command, "channel", [str(channel.id)], allow=True)
         
         await ctx.send(f"Command `{command}` is now allowed in {channel.mention}!")
         
@@ -232,16 +182,12 @@ class Setup(commands.Cog):
     async def perm_deny(self, ctx, command: str, channel: discord.TextChannel):
         """Deny a command in a channel."""
         # Check if server is registered
-        db = get_db()
-        server = db.query(Server).filter(Server.id == str(ctx.guild.id)).first()
-        
-        if not server:
+        if not guild_config_cache.is_registered(ctx.guild.id):
             await ctx.send("This server is not registered! Please register the server first.")
             return
             
         # Set command permission
-        server.set_command_permission(command, "channel", [str(channel.id)], allow=False)
-        db.commit()
+        set_command_permission(ctx.guild.id, command, "channel", [str(channel.id)], allow=False)
         
         await ctx.send(f"Command `{command}` is now denied in {channel.mention}!")
         
@@ -249,16 +195,12 @@ class Setup(commands.Cog):
     async def perm_allow_role(self, ctx, command: str, role: discord.Role):
         """Allow a role to use a command."""
         # Check if server is registered
-        db = get_db()
-        server = db.query(Server).filter(Server.id == str(ctx.guild.id)).first()
-        
-        if not server:
+        if not guild_config_cache.is_registered(ctx.guild.id):
             await ctx.send("This server is not registered! Please register the server first.")
             return
             
         # Set command permission
-        server.set_command_permission(command, "role", [str(role.id)], allow=True)
-        db.commit()
+        set_command_permission(ctx.guild.id, command, "role", [str(role.id)], allow=True)
         
         await ctx.send(f"Command `{command}` is now allowed for role {role.mention}!")
         
@@ -266,16 +208,12 @@ class Setup(commands.Cog):
     async def perm_deny_role(self, ctx, command: str, role: discord.Role):
         """Deny a role from using a command."""
         # Check if server is registered
-        db = get_db()
-        server = db.query(Server).filter(Server.id == str(ctx.guild.id)).first()
-        
-        if not server:
+        if not guild_config_cache.is_registered(ctx.guild.id):
             await ctx.send("This server is not registered! Please register the server first.")
             return
             
         # Set command permission
-        server.set_command_permission(command, "role", [str(role.id)], allow=False)
-        db.commit()
+        set_command_permission(ctx.guild.id, command, "role", [str(role.id)], allow=False)
         
         await ctx.send(f"Command `{command}` is now denied for role {role.mention}!")
         
@@ -283,15 +221,14 @@ class Setup(commands.Cog):
     async def perm_list(self, ctx):
         """List all command permissions."""
         # Check if server is registered
-        db = get_db()
-        server = db.query(Server).filter(Server.id == str(ctx.guild.id)).first()
+        config = guild_config_cache.get(ctx.guild.id)
         
-        if not server:
+        if not config:
             await ctx.send("This server is not registered! Please register the server first.")
             return
             
         # Get command permissions
-        perms = server.command_permissions
+        perms = config.command_permissions
         
         if not perms:
             await ctx.send("No command permissions set for this server.")
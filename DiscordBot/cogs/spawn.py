@@ -4,10 +4,14 @@ import random
 import asyncio
 from discord.ext import commands, tasks
 from models.base import get_db
-from models.server import Server
 from models.character import Character
 from models.card import Card
-from utils.db import get_all_characters, add_card, get_user, update_user
+from utils.db import add_card, get_user, update_user, update_server
+from utils.guild_config import guild_config_cache
+from utils.catalog import character_catalog
+from utils.wishlist_index import wishlist_index
+from utils.metrics import instrument_loop
+from utils.stat_counters import stat_counters, STAT_FLUSH_SECONDS
 
 POSSIBLE_RARITIES = ["N", "R", "SR", "SSR", "UR", "LR", "ER"]
 RARITY_WEIGHTS = [40, 25, 20, 10, 5, 3, 1]
@@ -32,41 +36,97 @@ RARITY_THUMBNAIL_URLS = {
     "ER": "https://i.postimg.cc/159V8NpC/ER-icon.png"
 }
 
+# Mentions per wishlist ping message (keeps each message under the 2000 character limit)
+MENTIONS_PER_MESSAGE = 80
+
 class Spawn(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.default_spawn_channel_id = int(os.getenv("SPAWN_CHANNEL_ID", 0))
-        self.server_spawn_channels = {}  # Guild ID -> Channel ID
         self.currently_spawned = {}  # Guild ID -> Character name
         self.current_rarity = {}  # Guild ID -> Rarity
         self.current_image = {}  # Guild ID -> Image URL
         self.spawn_message = {}  # Guild ID -> Message
         self.load_spawn_channels()
+        self.load_wishlist_index()
         self.spawn_task.start()
+        self.flush_stats_task.start()
+        
+    async def cog_unload(self):
+        self.spawn_task.cancel()
+        self.flush_stats_task.cancel()
+        # Write the spawn/claim counts still queued before the bot goes away
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, stat_counters.flush)
+        except Exception as e:
+            print(f"[ERROR] Failed to flush server statistics: {e}")
         
     def load_spawn_channels(self):
-        """Load spawn channels from the database."""
-        db = get_db()
-        servers = db.query(Server).all()
+        """Load server configuration (including spawn channels) into the guild cache."""
+        if not guild_config_cache.loaded:
+            guild_config_cache.load()
+            
+        print(f"Loaded {len(guild_config_cache.spawn_channels())} spawn channels from database.")
         
-        for server in servers:
-            if server.spawn_channel_id:
-                self.server_spawn_channels[int(server.id)] = int(server.spawn_channel_id)
-                
-        print(f"Loaded {len(self.server_spawn_channels)} spawn channels from database.")
+    @property
+    def server_spawn_channels(self):
+        """Guild ID -> spawn channel ID, served from the guild config cache."""
+        return guild_config_cache.spawn_channels()
+
+    def load_wishlist_index(self):
+        """Load the character -> wishing users index used for spawn pings."""
+        if not wishlist_index.loaded:
+            entries = wishlist_index.load()
+            print(f"Loaded {entries} wishlist entries into the spawn index.")
+
+    async def notify_wishlisters(self, channel, character_id, character_name, rarity_code):
+        """Ping or DM the guild members who wishlisted the spawned character."""
+        mention_ids, dm_ids = wishlist_index.recipients(character_id, channel.guild)
+        
+        # One batched mention message per chunk instead of one per user
+        for i in range(0, len(mention_ids), MENTIONS_PER_MESSAGE):
+            mentions = " ".join(f"<@{user_id}>" for user_id in mention_ids[i:i + MENTIONS_PER_MESSAGE])
+            await channel.send(f"💖 **{character_name}** from your wishlist just spawned! {mentions}")
+            
+        if dm_ids:
+            message = f"💖 **{character_name}** [{rarity_code}] from your wishlist just spawned in {channel.mention}!"
+            results = await asyncio.gather(
+                *(self._send_wishlist_dm(channel.guild, user_id, message) for user_id in dm_ids),
+                return_exceptions=True
+            )
+            failed = sum(1 for result in results if isinstance(result, Exception))
+            if failed:
+                print(f"[WARN] Failed to DM {failed} wishlisters in guild {channel.guild.id}")
+
+    async def _send_wishlist_dm(self, guild, user_id, message):
+        member = guild.get_member(user_id)
+        if member:
+            await member.send(message)
+
+    @tasks.loop(seconds=STAT_FLUSH_SECONDS)
+    @instrument_loop()
+    async def flush_stats_task(self):
+        """Write the coalesced server spawn/claim counts."""
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, stat_counters.flush)
+        except Exception as e:
+            # The counts stay queued for the next iteration
+            print(f"[ERROR] Failed to flush server statistics: {e}")
 
     @tasks.loop(minutes=5)
+    @instrument_loop()
     async def spawn_task(self):
         """Spawn cards in all registered servers."""
         # Use default spawn channel if no servers are registered
-        if not self.server_spawn_channels and self.default_spawn_channel_id:
+        spawn_channels = self.server_spawn_channels
+        if not spawn_channels and self.default_spawn_channel_id:
             channel = self.bot.get_channel(self.default_spawn_channel_id)
             if channel:
                 await self.spawn_in_channel(channel)
             return
             
         # Spawn in all registered servers
-        for guild_id, channel_id in self.server_spawn_channels.items():
+        for guild_id, channel_id in spawn_channels.items():
             guild = self.bot.get_guild(guild_id)
             if not guild:
                 continue
@@ -114,15 +174,14 @@ class Spawn(commands.Cog):
         """Send a spawn message in a channel."""
         guild_id = channel.guild.id
         
-        # Get all characters from database
-        all_characters = get_all_characters()
-        if not all_characters:
+        # Select a random character from the current catalog snapshot
+        catalog = character_catalog.current
+        character_name = catalog.random_name()
+        if not character_name:
             await channel.send("❌ Error: No characters found in database!")
             return
             
-        # Select a random character
-        character_name = random.choice(list(all_characters.keys()))
-        character = all_characters[character_name]
+        character = catalog.characters[character_name]
         
         # Select rarity and image
         rarity_code = forced_rarity if forced_rarity else random.choices(POSSIBLE_RARITIES, weights=RARITY_WEIGHTS, k=1)[0]
@@ -174,12 +233,14 @@ class Spawn(commands.Cog):
             if rarity_code in ("N", "R"):
                 await msg.add_reaction("✅")
                 
-            # Update server statistics
-            db = get_db()
-            server = db.query(Server).filter(Server.id == str(guild_id)).first()
-            if server:
-                server.total_spawns += 1
-                db.commit()
+            # Let wishlisters know (DMs are sent in the background)
+            self.bot.loop.create_task(
+                self.notify_wishlisters(channel, catalog.character_ids.get(character_name), character_name, rarity_code)
+            )
+                
+            # Update server statistics (registered servers only)
+            if guild_config_cache.is_registered(guild_id):
+                stat_counters.increment("servers", guild_id, "total_spawns")
                 
         except Exception as e:
             print(f"[ERROR] Failed to send spawn message: {e}")
@@ -211,14 +272,10 @@ class Spawn(commands.Cog):
             await reaction.message.channel.send("❌ Error: No character is currently spawned!")
             return
             
-        # Get all characters
-        all_characters = get_all_characters()
-        if spawned_name not in all_characters:
+        if character_catalog.current.get(spawned_name) is None:
             await reaction.message.channel.send("❌ Error: Spawned character not found!")
             return
             
-        character_info = all_characters[spawned_name]
-        
         # Add card to user's collection
         db = get_db()
         
@@ -230,7 +287,7 @@ class Spawn(commands.Cog):
             
         # Create card
         card = add_card(
-            user_id=str(user.id),
+            user_id=user.id,
             character_id=character.id,
             rarity=self.current_rarity[guild_id],
             claimed_artwork=self.current_image[guild_id],
@@ -241,11 +298,9 @@ class Spawn(commands.Cog):
             await reaction.message.channel.send("❌ Error: Failed to create card!")
             return
             
-        # Update server statistics
-        server = db.query(Server).filter(Server.id == str(guild_id)).first()
-        if server:
-            server.total_claims += 1
-            db.commit()
+        # Update server statistics (registered servers only)
+        if guild_config_cache.is_registered(guild_id):
+            stat_counters.increment("servers", guild_id, "total_claims")
             
         # Send success message
         await reaction.message.channel.send(
@@ -272,25 +327,8 @@ class Spawn(commands.Cog):
         guild_id = ctx.guild.id
         channel_id = ctx.channel.id
         
-        # Update database
-        db = get_db()
-        server = db.query(Server).filter(Server.id == str(guild_id)).first()
-        
-        if not server:
-            # Create server if it doesn't exist
-            server = Server(
-                id=str(guild_id),
-                name=ctx.guild.name,
-                spawn_channel_id=str(channel_id)
-            )
-            db.add(server)
-        else:
-            server.spawn_channel_id = str(channel_id)
-            
-        db.commit()
-        
-        # Update local cache
-        self.server_spawn_channels[guild_id] = channel_id
+        # Update database (creates the server if needed) and the guild cache
+        update_server(guild_id, ctx.guild.name, "spawn_channel_id", channel_id)
         
         await ctx.send(f"✅ Spawn channel set to {ctx.channel.mention}!")
 
@@ -1,8 +1,44 @@
 # config.py
-GACHA_RATES = {
-    "common": 50,
-    "rare": 23.5,
-    "elite": 12,
-    "legendary": 5,
-    "god": 0.5
+# Gacha banners: rarity rates in percent (summing to 100), tickets per pull and
+# hard pity (a pull at `rarity` or better is guaranteed within `pulls` pulls)
+GACHA_BANNERS = {
+    "standard": {
+        "name": "Standard Banner",
+        "rates": {"N": 50, "R": 23.5, "SR": 12, "SSR": 9, "UR": 5, "LR": 0.5},
+        "cost": 1,
+        "pity": {"pulls": 90, "rarity": "UR"}
+    }
 }
+
+# Pull counts offered by !gacha
+GACHA_PULL_COUNTS = (1, 10, 100)
+
+# Discord user IDs allowed to run developer-only commands
+DEVELOPER_IDS = {816735778339291186, 984783866072039435}
+
+# Cogs loaded before connecting; everything needed to spawn, claim and configure servers
+CORE_EXTENSIONS = [
+    "cogs.setup",
+    "cogs.spawn",
+    "cogs.claim",
+    "cogs.collection",
+    "cogs.catalog"
+]
+
+# Cogs loaded in the background once the bot is ready
+DEFERRED_EXTENSIONS = [
+    "cogs.profile",
+    "cogs.archive",
+    "cogs.trade",
+    "cogs.pve",
+    "cogs.leaderboard",
+    "cogs.pass",
+    "cogs.economy",
+    "cogs.lookup",
+    "cogs.gacha",
+    "cogs.affection",
+    "cogs.management",
+    "cogs.preview",
+    "cogs.backup",
+    "cogs.metrics"
+]
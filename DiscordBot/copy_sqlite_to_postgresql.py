@@ -0,0 +1,54 @@
+"""
+Bulk copy of the SQLite database into PostgreSQL.
+Brings the SQLite schema up to date, streams every table out of it, writes
+it with COPY, resets the serial sequences and verifies each table by row
+count and checksum. Exits with status 1 if any table doesn't match.
+"""
+import sys
+import argparse
+from pathlib import Path
+
+# Add the parent directory to sys.path to import modules
+sys.path.append(str(Path(__file__).parent))
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from models.base import SQLITE_DB_PATH, POSTGRESQL_URL
+from utils.db_copy import copy_database, DEFAULT_BATCH_SIZE
+
+def main():
+    parser = argparse.ArgumentParser(description="Copy the SQLite database into PostgreSQL and verify it.")
+    parser.add_argument("--sqlite", default=SQLITE_DB_PATH, help="Path to the SQLite database")
+    parser.add_argument("--postgresql-url", default=POSTGRESQL_URL, help="Target database URL (defaults to POSTGRESQL_URL)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Rows per streamed batch")
+    parser.add_argument("--truncate", action="store_true", help="Empty the target tables before copying")
+    parser.add_argument("--tables", nargs="+", help="Only copy these tables")
+    args = parser.parse_args()
+
+    if not args.postgresql_url:
+        print("No target database: set POSTGRESQL_URL or pass --postgresql-url")
+        return 1
+    if not Path(args.sqlite).exists():
+        print(f"SQLite database not found at {args.sqlite}")
+        return 1
+
+    try:
+        results = copy_database(
+            f"sqlite:///{args.sqlite}", args.postgresql_url,
+            batch_size=args.batch_size, truncate=args.truncate, tables=args.tables
+        )
+    except (SQLAlchemyError, RuntimeError, ValueError) as e:
+        print(f"Copy failed: {e}")
+        return 1
+
+    failed = [result["table"] for result in results if not result["verified"]]
+    total = sum(result["rows"] for result in results)
+    print(f"\nCopied {total} rows across {len(results)} tables.")
+    if failed:
+        print(f"Verification failed for: {', '.join(failed)}")
+        return 1
+    print("All tables verified.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
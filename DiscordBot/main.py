@@ -7,7 +7,14 @@ from pathlib import Path
 
 # Import database modules
 from models.base import init_db, engine
-from utils.db import initialize_database, migrate_json_to_db, load_characters_from_json
+from utils.db import initialize_database, migrate_json_to_db, OLD_DB_PATH
+from utils.catalog import character_catalog
+from utils.permissions import check_command_permissions, CommandDisabled
+from config import CORE_EXTENSIONS, DEFERRED_EXTENSIONS
+from utils import metrics
+from utils.query_audit import query_audit, SQL_AUDIT, SQL_AUDIT_REPORT
+from utils.loop_watchdog import loop_watchdog
+from utils.id_migration import pending_columns
 
 try:
     # Get absolute path to .env file
@@ -43,6 +50,14 @@ except Exception as e:
 print("Initializing database...")
 if initialize_database():
     print("Database initialized successfully.")
+    pending = pending_columns()
+    if pending and engine.dialect.name == "postgresql":
+        # PostgreSQL won't compare the integer IDs the Snowflake type binds with VARCHAR columns
+        print(f"Discord IDs are still stored as text in {len(pending)} tables; run migrate_discord_ids.py before starting the bot.")
+        raise SystemExit(1)
+    if pending:
+        # SQLite converts the integer binds to the columns' text affinity, so these still work, just with bigger indexes
+        print(f"Discord IDs are still stored as text in {len(pending)} tables; run migrate_discord_ids.py to convert them.")
 else:
     print("Failed to initialize database.")
 
@@ -57,46 +72,60 @@ bot = commands.Bot(command_prefix="t", intents=intents)
 
 bot.remove_command('help')
 
+# Enforce per-server channel/role command permissions from the compiled cache
+bot.add_check(check_command_permissions)
+
+# Per-command latency, view callback and SQL statement metrics (served by cogs.metrics)
+metrics.instrument_bot(bot, engine)
+
+# Diagnostic mode: flag N+1 and slow statements per command (SQL_AUDIT=1)
+if SQL_AUDIT:
+    query_audit.install(engine)
+
+# on_ready fires again after every reconnect; startup work only runs once
+startup_complete = False
+
+@bot.event
+async def on_command_error(ctx, error):
+    metrics.record_command_error(ctx, error)
+    if isinstance(error, CommandDisabled):
+        await ctx.send(f"🔒 {error}", delete_after=5)
+        return
+    # Fall back to the default error reporting
+    await commands.Bot.on_command_error(bot, ctx, error)
+
 @bot.event
 async def on_ready():
     print(f"Logged in as {bot.user}")
     print(f"Bot is in {len(bot.guilds)} guilds")
     
-    # Load characters from JSON files
-    print("Loading characters from JSON files...")
-    characters = load_characters_from_json()
-    print(f"Loaded {len(characters)} characters.")
+    global startup_complete
+    if startup_complete:
+        return
+    startup_complete = True
+    
+    # Everything outside the core cogs is imported now that the bot is usable
+    bot.loop.create_task(load_extensions(DEFERRED_EXTENSIONS))
+    
+    # Sync changed character asset files into the database and build the catalog snapshot
+    print("Syncing character catalog...")
+    summary = await bot.loop.run_in_executor(None, character_catalog.load)
+    print(
+        f"Catalog synced: {summary['changed']}/{summary['files']} files changed, "
+        f"{summary.get('characters_added', 0)} characters added, "
+        f"{summary.get('characters_updated', 0)} updated ({summary['elapsed_ms']} ms)."
+    )
     
-    # Migrate data from JSON to database if needed
-    if os.path.exists("DiscordBot/utils/users.json"):
+    # Migrate data from JSON to database if needed (skipped once a run has completed)
+    if os.path.exists(OLD_DB_PATH):
         print("Migrating data from JSON to database...")
-        if migrate_json_to_db():
+        if await bot.loop.run_in_executor(None, migrate_json_to_db):
             print("Data migration completed successfully.")
         else:
             print("Failed to migrate data.")
 
-# Add the new setup cog to the initial extensions
-initial_extensions = [
-    "cogs.setup",  # New setup cog
-    "cogs.spawn",
-    "cogs.claim",
-    "cogs.collection",
-    "cogs.profile",
-    "cogs.archive",
-    "cogs.trade",
-    "cogs.pve",
-    "cogs.leaderboard",
-    "cogs.pass",
-    "cogs.economy",
-    "cogs.lookup",
-    "cogs.gacha",
-    "cogs.affection",
-    "cogs.management",
-    "cogs.preview"
-]
-
-async def load_extensions():
-    for ext in initial_extensions:
+async def load_extensions(extensions):
+    for ext in extensions:
         try:
             await bot.load_extension(ext)  
             print(f"✅ Loaded extension: {ext}")
@@ -105,7 +134,14 @@ async def load_extensions():
 
 async def main():
     async with bot:
-        await load_extensions()
-        await bot.start(os.getenv("DISCORD_TOKEN"))
+        await load_extensions(CORE_EXTENSIONS)
+        # Logs the code blocking the event loop whenever it stalls (LOOP_LAG_THRESHOLD_MS=0 disables)
+        loop_watchdog.start()
+        try:
+            await bot.start(os.getenv("DISCORD_TOKEN"))
+        finally:
+            await loop_watchdog.stop()
+            if SQL_AUDIT:
+                print(f"SQL audit report written to {query_audit.write_report(SQL_AUDIT_REPORT)}")
 
 asyncio.run(main())
\ No newline at end of file
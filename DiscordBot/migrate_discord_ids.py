@@ -0,0 +1,67 @@
+"""
+Convert Discord ID columns from text to BIGINT.
+Rebuilds (SQLite) or alters (PostgreSQL) every table holding user, server or
+channel IDs, preserving foreign keys, and prints the table and index sizes
+before and after. SQLite databases are backed up first. Stop the bot before
+running it.
+
+Usage:
+    python migrate_discord_ids.py [--yes] [--no-backup]
+"""
+import sys
+import argparse
+from pathlib import Path
+
+# Add the parent directory to sys.path to import modules
+sys.path.append(str(Path(__file__).parent))
+
+from models.base import DB_TYPE, init_db
+from utils.id_migration import pending_columns, migrate_discord_ids, IdMigrationError
+
+def format_size(size):
+    return "-" if size is None else f"{size / 1024:.0f} KB"
+
+def main():
+    parser = argparse.ArgumentParser(description="Store Discord IDs as BIGINT instead of text.")
+    parser.add_argument("--yes", action="store_true", help="Don't ask for confirmation")
+    parser.add_argument("--no-backup", action="store_true", help="Skip the SQLite backup")
+    args = parser.parse_args()
+
+    # On PostgreSQL, new tables with keys to the text ID columns are held back until after the conversion
+    blocked = init_db()
+    pending = pending_columns()
+    if not pending:
+        print("Discord ID columns are already BIGINT.")
+        return 0
+
+    print("Columns to convert:")
+    for table, names in pending.items():
+        print(f"  {table.name}: {', '.join(names)}")
+    if not args.yes:
+        choice = input("Convert them now? The bot must be stopped. (y/n): ")
+        if choice.lower() != "y":
+            print("Migration cancelled.")
+            return 1
+
+    if DB_TYPE == "sqlite" and not args.no_backup:
+        from utils.backup import create_backup
+        summary = create_backup()
+        print(f"Backed up to {summary['path']}")
+
+    try:
+        summary = migrate_discord_ids()
+    except IdMigrationError as e:
+        print(f"Migration failed and was rolled back: {e}")
+        return 1
+
+    print(f"\nConverted {summary['tables']} tables ({summary['rows']} rows) in {summary['seconds']}s")
+    for name, (before, after) in summary["sizes"].items():
+        print(f"  {name:<32} {format_size(before):>10} -> {format_size(after):>10}")
+
+    if blocked:
+        init_db()
+        print(f"Created {len(blocked)} tables that needed BIGINT IDs: {', '.join(blocked)}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,47 @@
+"""
+Migration script to move the legacy users.json into the database.
+Users are streamed from the file and written in batches with a checkpoint, so
+the script can be interrupted and re-run: it resumes after the last committed
+batch, and does nothing once the file has been fully migrated.
+"""
+import sys
+import argparse
+from pathlib import Path
+
+# Add the parent directory to sys.path to import modules
+sys.path.append(str(Path(__file__).parent))
+
+def main():
+    from utils.db import initialize_database
+    from utils.migration import migrate_users_json, USERS_JSON_PATH, DEFAULT_BATCH_SIZE
+
+    parser = argparse.ArgumentParser(description="Migrate users.json into the database.")
+    parser.add_argument("--source", default=USERS_JSON_PATH, help="Path to users.json")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Cards per transaction")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and walk the whole file again")
+    args = parser.parse_args()
+
+    if not initialize_database():
+        return 1
+
+    def report(summary):
+        print(f"  batch {summary['batches']}: {summary['users']} users, {summary['rows']} rows ({summary['rows_per_sec']} rows/sec)")
+
+    summary = migrate_users_json(args.source, batch_size=args.batch_size, restart=args.restart, progress=report)
+    if summary is None:
+        print("Migration failed; re-run to resume from the last checkpoint.")
+        return 1
+    if summary["skipped"]:
+        print("Nothing to do: this file has already been migrated (use --restart to walk it again).")
+        return 0
+
+    if summary["resumed_from"]:
+        print(f"Resumed after {summary['resumed_from']} users.")
+    print(
+        f"Migrated {summary['users']} users, {summary['rows']} rows in {summary['batches']} batches "
+        f"({summary['elapsed_sec']}s, {summary['rows_per_sec']} rows/sec)."
+    )
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,32 +4,27 @@ This script will help you migrate your data from SQLite to PostgreSQL without lo
 """
 import os
 import sys
-import shutil
-import datetime
 from pathlib import Path
 
 # Add the parent directory to sys.path to import modules
 sys.path.append(str(Path(__file__).parent))
 
 def backup_sqlite_db():
-    """Create a backup of the SQLite database."""
+    """Create an online backup of the SQLite database."""
     from models.base import SQLITE_DB_PATH
-    
+    from utils.backup import create_backup
+
     if not os.path.exists(SQLITE_DB_PATH):
         print(f"SQLite database not found at {SQLITE_DB_PATH}")
         return False
-        
-    # Create backup directory if it doesn't exist
-    backup_dir = os.path.join(os.path.dirname(SQLITE_DB_PATH), "backups")
-    os.makedirs(backup_dir, exist_ok=True)
-    
-    # Create backup filename with timestamp
-    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    backup_path = os.path.join(backup_dir, f"taipu_{timestamp}.db")
-    
-    # Copy the database file
-    shutil.copy2(SQLITE_DB_PATH, backup_path)
-    print(f"SQLite database backed up to {backup_path}")
+
+    try:
+        summary = create_backup(SQLITE_DB_PATH)
+    except Exception as e:
+        print(f"Error backing up SQLite database: {e}")
+        return False
+
+    print(f"SQLite database backed up to {summary['path']}")
     return True
 
 def modify_env_file(use_postgresql=True):
@@ -69,17 +64,23 @@ def modify_env_file(use_postgresql=True):
     return True
 
 def migrate_data():
-    """Migrate data from JSON to the database."""
-    from utils.db import migrate_json_to_db
-    
-    print("Migrating data from JSON to the database...")
-    success = migrate_json_to_db()
-    
+    """Copy every table from the SQLite database into PostgreSQL and verify it."""
+    from models.base import SQLITE_DB_PATH, POSTGRESQL_URL
+    from utils.db_copy import copy_database
+
+    print("Copying data from SQLite to PostgreSQL...")
+    try:
+        results = copy_database(f"sqlite:///{SQLITE_DB_PATH}", POSTGRESQL_URL)
+    except Exception as e:
+        print(f"Error copying data: {e}")
+        return False
+
+    success = all(result["verified"] for result in results)
     if success:
-        print("Data migration completed successfully.")
+        print(f"Data migration completed successfully ({sum(result['rows'] for result in results)} rows).")
     else:
-        print("Data migration failed.")
-        
+        print("Data migration failed: row counts or checksums don't match.")
+
     return success
 
 def check_database():
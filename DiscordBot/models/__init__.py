@@ -5,8 +5,14 @@ from .character import Character
 from .card import Card
 from .series import Series
 from .event import Event
+from .leaderboard import LeaderboardScore
+from .catalog import CatalogFile
+from .migration import MigrationCheckpoint
+from .id_sequence import IdSequence
+from .gacha import GachaPity
 
 __all__ = [
     'Base', 'engine', 'Session',
-    'User', 'Server', 'Character', 'Card', 'Series', 'Event'
+    'User', 'Server', 'Character', 'Card', 'Series', 'Event',
+    'LeaderboardScore', 'CatalogFile', 'MigrationCheckpoint', 'IdSequence', 'GachaPity'
 ]
\ No newline at end of file
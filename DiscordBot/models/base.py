@@ -1,8 +1,8 @@
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, update, Integer
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from .types import Snowflake
 from dotenv import load_dotenv
 from pathlib import Path
 
@@ -28,24 +28,100 @@ if DB_TYPE == "sqlite":
 if DB_TYPE == "sqlite":
     engine = create_engine(f"sqlite:///{SQLITE_DB_PATH}", echo=False)
 elif DB_TYPE == "postgresql":
-    if SUPABASE_URL and SUPABASE_KEY:
-        # Use Supabase for PostgreSQL
-        from supabase import create_client
-        supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-        # Still need a SQLAlchemy engine for ORM operations
-        engine = create_engine(POSTGRESQL_URL, echo=False)
-    else:
-        # Use direct PostgreSQL connection
-        engine = create_engine(POSTGRESQL_URL, echo=False)
+    # ORM operations always go through SQLAlchemy; the Supabase client is created by get_supabase()
+    engine = create_engine(POSTGRESQL_URL, echo=False)
 else:
     raise ValueError(f"Unsupported database type: {DB_TYPE}")
 
+if DB_TYPE == "sqlite":
+    @event.listens_for(engine, "connect")
+    def _enable_wal(dbapi_connection, connection_record):
+        # Readers, including online backups (utils/backup.py), then never block the writer
+        dbapi_connection.execute("PRAGMA journal_mode=WAL")
+
 # Create session factory
 Session = sessionmaker(bind=engine)
 
-def init_db():
-    """Initialize the database by creating all tables."""
-    Base.metadata.create_all(engine)
+def add_missing_columns(bind=engine):
+    """Add model columns missing from existing tables, backfilling them in the same transaction.
+
+    A column can set info={"backfill": fn}, where fn(table) returns the SQL
+    expression to fill existing rows with. Returns the added "table.column" names.
+    """
+    added = []
+    with bind.begin() as connection:
+        inspector = inspect(connection)
+        existing_tables = set(inspector.get_table_names())
+        preparer = connection.dialect.identifier_preparer
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {preparer.format_column(column)} {column.type.compile(connection.dialect)}"
+                if column.server_default is not None:
+                    ddl += f" DEFAULT {column.server_default.arg}"
+                if not column.nullable:
+                    ddl += " NOT NULL"
+                connection.exec_driver_sql(ddl)
+                backfill = column.info.get("backfill")
+                if backfill:
+                    connection.execute(update(table).values({column.name: backfill(table)}))
+                added.append(f"{table.name}.{column.name}")
+    for name in added:
+        print(f"Added column {name}")
+    return added
+
+def blocked_tables(bind=engine):
+    """New tables that can't be created yet because a foreign key targets a text Discord ID column.
+
+    PostgreSQL rejects a BIGINT foreign key to a VARCHAR column; such tables
+    are created once migrate_discord_ids.py has converted the IDs. SQLite
+    doesn't compare the types, so nothing is blocked there.
+    """
+    if bind.dialect.name != "postgresql":
+        return []
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    column_types = {}
+    blocked = []
+    for table in Base.metadata.sorted_tables:
+        if table.name in existing_tables:
+            continue
+        for foreign_key in table.foreign_keys:
+            target = foreign_key.column
+            if target.table in blocked:
+                blocked.append(table)
+                break
+            if not isinstance(target.type, Snowflake) or target.table.name not in existing_tables:
+                continue
+            if target.table.name not in column_types:
+                column_types[target.table.name] = {
+                    column["name"]: column["type"] for column in inspector.get_columns(target.table.name)
+                }
+            if not isinstance(column_types[target.table.name].get(target.name), Integer):
+                blocked.append(table)
+                break
+    return blocked
+
+def init_db(bind=engine):
+    """Initialize the database by creating all tables.
+
+    Returns the names of tables left out until migrate_discord_ids.py has run
+    (see blocked_tables).
+    """
+    blocked = blocked_tables(bind)
+    tables = [table for table in Base.metadata.sorted_tables if table not in blocked]
+    Base.metadata.create_all(bind, tables=tables)
+    add_missing_columns(bind)
+    
+    # create_all skips indexes on tables that already exist, so add any new ones
+    for table in tables:
+        for index in table.indexes:
+            index.create(bind, checkfirst=True)
+    return [table.name for table in blocked]
 
 def get_db():
     """Get a database session."""
@@ -55,19 +131,37 @@ def get_db():
     finally:
         db.close()
 
-# Async versions for future use
-if DB_TYPE == "sqlite":
-    async_engine = create_async_engine(f"sqlite+aiosqlite:///{SQLITE_DB_PATH}", echo=False)
-elif DB_TYPE == "postgresql":
-    async_engine = create_async_engine(POSTGRESQL_URL.replace("postgresql://", "postgresql+asyncpg://"), echo=False)
+_supabase = None
+
+def get_supabase():
+    """Get the Supabase client (PostgreSQL + Supabase only), importing it on first use."""
+    global _supabase
+    if _supabase is None and DB_TYPE == "postgresql" and SUPABASE_URL and SUPABASE_KEY:
+        from supabase import create_client
+        _supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+    return _supabase
+
+# Async versions for future use, created on first use
+_async_session_factory = None
 
-AsyncSessionLocal = sessionmaker(
-    bind=async_engine,
-    class_=AsyncSession,
-    expire_on_commit=False
-)
+def get_async_engine():
+    """Get the async engine and session factory, creating them on first use."""
+    global _async_session_factory
+    if _async_session_factory is None:
+        from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+        if DB_TYPE == "sqlite":
+            async_engine = create_async_engine(f"sqlite+aiosqlite:///{SQLITE_DB_PATH}", echo=False)
+        else:
+            async_engine = create_async_engine(POSTGRESQL_URL.replace("postgresql://", "postgresql+asyncpg://"), echo=False)
+        _async_session_factory = sessionmaker(
+            bind=async_engine,
+            class_=AsyncSession,
+            expire_on_commit=False
+        )
+    return _async_session_factory.kw["bind"], _async_session_factory
 
 async def get_async_db():
     """Get an async database session."""
-    async with AsyncSessionLocal() as session:
+    async_engine, session_factory = get_async_engine()
+    async with session_factory() as session:
         yield session
\ No newline at end of file
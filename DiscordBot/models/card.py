@@ -1,7 +1,12 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, JSON, ForeignKey, Table, Float
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, JSON, ForeignKey, Table, Float, Index
+from sqlalchemy.orm import relationship, validates
 from datetime import datetime
 from .base import Base
+from .types import Snowflake
+from .rarity import rarity_rank, rarity_rank_case
+
+def _default_rarity_rank(context):
+    return rarity_rank(context.get_current_parameters().get("rarity"))
 
 class Card(Base):
     """Card model for storing card data."""
@@ -11,10 +16,14 @@ class Card(Base):
     id = Column(Integer, primary_key=True)
     global_id = Column(String, unique=True, nullable=False)  # Unique identifier for the card
     character_id = Column(Integer, ForeignKey('characters.id'))
-    owner_id = Column(String, ForeignKey('users.id'))
+    owner_id = Column(Snowflake, ForeignKey('users.id'))
     
     # Card details
     rarity = Column(String, nullable=False)  # N, R, SR, SSR, UR, LR, ER
+    rarity_rank = Column(
+        Integer, nullable=False, default=_default_rarity_rank, server_default="0",
+        info={"backfill": lambda table: rarity_rank_case(table.c.rarity)}
+    )  # See models/rarity.py
     claimed_artwork = Column(String, nullable=False)  # URL of the artwork
     claim_method = Column(String, default="spawn")  # spawn, trade, gift, auction, gacha
     order = Column(Integer, nullable=False)  # Order in user's collection
@@ -49,18 +58,27 @@ class Card(Base):
     custom_name = Column(String, nullable=True)  # User-defined name
     notes = Column(String, nullable=True)  # User-defined notes
     
+    # Per-character affection ranking ("biggest simp") is answered from this index
+    __table_args__ = (
+        Index('ix_cards_character_affection', 'character_id', affection.desc()),
+        # Covers COUNT(DISTINCT owner_id) and owner breakdowns per character
+        Index('ix_cards_character_owner', 'character_id', 'owner_id'),
+        # Rarest-first collection sorts and top-N rarest cards per owner
+        Index('ix_cards_owner_rarity', 'owner_id', rarity_rank.desc(), 'order'),
+    )
+    
     def __repr__(self):
         return f"<Card(id={self.id}, global_id={self.global_id}, character_id={self.character_id})>"
     
+    @validates("rarity")
+    def _set_rarity_rank(self, key, rarity):
+        self.rarity_rank = rarity_rank(rarity)
+        return rarity
+    
     def increase_affection(self, amount=1):
         """Increase the affection level of the card."""
         self.affection += amount
         self.last_interaction = datetime.utcnow()
-        
-        # Update character's affection leaderboard
-        if self.character and self.owner:
-            self.character.update_affection_leaderboard(self.owner.id, self.affection)
-            
         return self.affection
     
     def add_tag(self, tag_emoji):
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime
+from datetime import datetime
+from .base import Base
+
+class CatalogFile(Base):
+    """Manifest entry for a character asset file that has been synced to the database."""
+    __tablename__ = 'catalog_files'
+
+    path = Column(String, primary_key=True)  # Path relative to assets/characters
+    sha256 = Column(String, nullable=False)  # Content hash at last sync
+    size = Column(Integer, nullable=False)
+    mtime_ns = Column(BigInteger, nullable=False)
+
+    # Timestamps
+    synced_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<CatalogFile(path={self.path}, sha256={self.sha256[:8]})>"
@@ -1,7 +1,10 @@
 from sqlalchemy import Column, Integer, String, DateTime, Boolean, JSON, ForeignKey, Table
-from sqlalchemy.orm import relationship
+from sqlalchemy import func
+from sqlalchemy.orm import relationship, object_session
 from datetime import datetime
 from .base import Base
+from .card import Card
+from .user import User
 
 class CharacterImage(Base):
     """Model for storing character images."""
@@ -28,7 +31,7 @@ class Character(Base):
 
     # Basic character information
     id = Column(Integer, primary_key=True)
-    name = Column(String, nullable=False)
+    name = Column(String, nullable=False, index=True)
     series_id = Column(Integer, ForeignKey('series.id'))
     description = Column(String, nullable=True)
     
@@ -42,7 +45,6 @@ class Character(Base):
     normal_cards = Column(Integer, default=0)
     event_cards = Column(Integer, default=0)
     wishlist_count = Column(Integer, default=0)
-    affection_leaderboard = Column(JSON, default=dict)  # Store top users by affection as JSON
     
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -75,12 +77,25 @@ class Character(Base):
     @property
     def owners(self):
         """Get users who own cards of this character."""
-        return list(set(card.owner for card in self.cards if card.owner))
+        session = object_session(self)
+        if session is None:
+            return list(set(card.owner for card in self.cards if card.owner))
+            
+        # Let the database dedupe owners instead of loading every card
+        return session.query(User).join(Card, Card.owner_id == User.id).filter(
+            Card.character_id == self.id
+        ).distinct().all()
     
     @property
     def owner_count(self):
         """Get the number of users who own cards of this character."""
-        return len(self.owners)
+        session = object_session(self)
+        if session is None:
+            return len(self.owners)
+            
+        return session.query(func.count(func.distinct(Card.owner_id))).filter(
+            Card.character_id == self.id
+        ).scalar()
     
     def add_image(self, url, is_primary=False, affection_required=0, is_event=False, event_id=None):
         """Add an image to the character."""
@@ -103,22 +118,6 @@ class Character(Base):
         
         return image
     
-    def update_affection_leaderboard(self, user_id, affection):
-        """Update the affection leaderboard for the character."""
-        if not self.affection_leaderboard:
-            self.affection_leaderboard = {}
-            
-        self.affection_leaderboard[str(user_id)] = affection
-        
-        # Keep only top 10 users
-        sorted_users = sorted(
-            self.affection_leaderboard.items(),
-            key=lambda x: x[1],
-            reverse=True
-        )
-        
-        self.affection_leaderboard = dict(sorted_users[:10])
-        
     def increment_wishlist_count(self):
         """Increment the wishlist count for the character."""
         self.wishlist_count += 1
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from datetime import datetime
+from .base import Base
+from .types import Snowflake
+
+class GachaPity(Base):
+    """Pulls a user has made on a banner since their last pity-tier card."""
+    __tablename__ = 'gacha_pity'
+
+    user_id = Column(Snowflake, ForeignKey('users.id'), primary_key=True)
+    banner = Column(String, primary_key=True)  # Key in config.GACHA_BANNERS
+    pulls = Column(Integer, nullable=False, default=0)
+    total_pulls = Column(Integer, nullable=False, default=0)
+
+    # Timestamps
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<GachaPity(user_id={self.user_id}, banner={self.banner}, pulls={self.pulls})>"
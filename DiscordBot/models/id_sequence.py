@@ -0,0 +1,16 @@
+from sqlalchemy import Column, BigInteger, String, DateTime
+from datetime import datetime
+from .base import Base
+
+class IdSequence(Base):
+    """Next unreserved value of a named ID counter; processes reserve blocks from it."""
+    __tablename__ = 'id_sequences'
+
+    name = Column(String, primary_key=True)  # Counter name, e.g. "card"
+    next_value = Column(BigInteger, nullable=False)
+
+    # Timestamps
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<IdSequence(name={self.name}, next_value={self.next_value})>"
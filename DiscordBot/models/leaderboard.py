@@ -0,0 +1,37 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from sqlalchemy.orm import relationship
+from datetime import datetime
+from .base import Base
+from .types import Snowflake
+
+# Metrics tracked on the leaderboard
+METRIC_CARDS = "cards"  # Total number of cards owned
+METRIC_RARITY = "rarity"  # Rarity-weighted collection score
+METRIC_AFFECTION = "affection"  # Total affection across all cards
+
+LEADERBOARD_METRICS = (METRIC_CARDS, METRIC_RARITY, METRIC_AFFECTION)
+
+class LeaderboardScore(Base):
+    """Materialized per-metric score for a user, maintained incrementally."""
+    __tablename__ = 'leaderboard_scores'
+
+    metric = Column(String, primary_key=True)
+    user_id = Column(Snowflake, ForeignKey('users.id'), primary_key=True)
+    score = Column(Integer, nullable=False, default=0)
+
+    # Competition rank (ties share a rank, the next one skips ahead), refreshed in bulk by the periodic recompute
+    rank = Column(Integer, nullable=True)
+
+    # Timestamps
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Relationships
+    user = relationship("User")
+
+    # Top-N and "my rank" queries walk this index instead of the cards table
+    __table_args__ = (
+        Index('ix_leaderboard_scores_metric_score', 'metric', 'score'),
+    )
+
+    def __repr__(self):
+        return f"<LeaderboardScore(metric={self.metric}, user_id={self.user_id}, score={self.score})>"
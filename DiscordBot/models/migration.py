@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime
+from datetime import datetime
+from .base import Base
+
+class MigrationCheckpoint(Base):
+    """Progress of a resumable data migration, committed together with each batch."""
+    __tablename__ = 'migration_checkpoints'
+
+    name = Column(String, primary_key=True)  # Migration name, e.g. "users_json"
+
+    # Source file fingerprint; a different file restarts the migration
+    source_size = Column(BigInteger, nullable=True)
+    source_mtime_ns = Column(BigInteger, nullable=True)
+
+    # Progress
+    offset = Column(BigInteger, default=0)  # Byte offset just past the last committed record
+    records_done = Column(Integer, default=0)
+    rows_done = Column(Integer, default=0)
+
+    # Timestamps
+    started_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    completed_at = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<MigrationCheckpoint(name={self.name}, records_done={self.records_done})>"
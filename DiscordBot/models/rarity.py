@@ -0,0 +1,22 @@
+"""
+Canonical card rarity registry.
+
+Cards store both the rarity code and its rank (Card.rarity_rank), so rarity
+sorts and top-N queries run on the (owner_id, rarity_rank) index instead of
+mapping codes in Python. Every rarity ordering should come from here.
+"""
+from sqlalchemy import case
+
+# Lowest to highest
+RARITIES = ["N", "R", "SR", "SSR", "UR", "LR", "ER"]
+
+# Rarity code -> rank (1 = N ... 7 = ER); unknown codes rank 0
+RARITY_RANKS = {code: rank for rank, code in enumerate(RARITIES, start=1)}
+
+def rarity_rank(code):
+    """Rank of a rarity code, 0 if unknown."""
+    return RARITY_RANKS.get(str(code or "").upper(), 0)
+
+def rarity_rank_case(column):
+    """SQL expression mapping a rarity code column to its rank (for backfills)."""
+    return case(RARITY_RANKS, value=column, else_=0)
@@ -1,7 +1,9 @@
 from sqlalchemy import Column, Integer, String, DateTime, Boolean, JSON, ForeignKey, Table
-from sqlalchemy.orm import relationship
+from sqlalchemy import func
+from sqlalchemy.orm import relationship, object_session
 from datetime import datetime
 from .base import Base
+from .character import Character
 
 class Series(Base):
     """Series model for storing anime series data."""
@@ -40,7 +42,11 @@ class Series(Base):
     @property
     def character_count(self):
         """Get the number of characters in the series."""
-        return len(self.characters)
+        session = object_session(self)
+        if session is None:
+            return len(self.characters)
+            
+        return session.query(func.count(Character.id)).filter(Character.series_id == self.id).scalar()
     
     @property
     def character_names(self):
@@ -55,5 +61,16 @@ class Series(Base):
             
     def update_statistics(self):
         """Update series statistics."""
-        self.total_characters = len(self.characters)
-        self.total_cards = sum(character.total_cards for character in self.characters)
\ No newline at end of file
+        session = object_session(self)
+        if session is None:
+            self.total_characters = len(self.characters)
+            self.total_cards = sum(character.total_cards for character in self.characters)
+            return
+            
+        total_characters, total_cards = session.query(
+            func.count(Character.id),
+            func.coalesce(func.sum(Character.total_cards), 0)
+        ).filter(Character.series_id == self.id).one()
+        
+        self.total_characters = total_characters
+        self.total_cards = total_cards
\ No newline at end of file
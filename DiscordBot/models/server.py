@@ -2,13 +2,14 @@ from sqlalchemy import Column, Integer, String, DateTime, Boolean, JSON, Foreign
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .base import Base
+from .types import Snowflake
 
 # Association table for server-admin many-to-many relationship
 server_admins = Table(
     'server_admins',
     Base.metadata,
-    Column('server_id', String, ForeignKey('servers.id')),
-    Column('user_id', String, ForeignKey('users.id'))
+    Column('server_id', Snowflake, ForeignKey('servers.id')),
+    Column('user_id', Snowflake, ForeignKey('users.id'))
 )
 
 class Server(Base):
@@ -16,14 +17,14 @@ class Server(Base):
     __tablename__ = 'servers'
 
     # Basic server information
-    id = Column(String, primary_key=True)  # Discord server ID
+    id = Column(Snowflake, primary_key=True)  # Discord server ID
     name = Column(String, nullable=False)
     registration_time = Column(DateTime, default=datetime.utcnow)
     
     # Channel IDs for specific commands
-    spawn_channel_id = Column(String, nullable=True)
-    log_channel_id = Column(String, nullable=True)
-    welcome_channel_id = Column(String, nullable=True)
+    spawn_channel_id = Column(Snowflake, nullable=True)
+    log_channel_id = Column(Snowflake, nullable=True)
+    welcome_channel_id = Column(Snowflake, nullable=True)
     
     # Relationships
     admins = relationship("User", secondary=server_admins)
@@ -77,17 +78,6 @@ class Server(Base):
             id_list (list): List of channel or role IDs.
             allow (bool): Whether to allow or deny the command.
         """
-        if not self.command_permissions:
-            self.command_permissions = {}
-            
-        if command_name not in self.command_permissions:
-            self.command_permissions[command_name] = {
-                "allowed_channels": [],
-                "denied_channels": [],
-                "allowed_roles": [],
-                "denied_roles": []
-            }
-            
         if permission_type == "channel":
             key = "allowed_channels" if allow else "denied_channels"
         elif permission_type == "role":
@@ -95,7 +85,17 @@ class Server(Base):
         else:
             raise ValueError(f"Invalid permission type: {permission_type}")
             
-        self.command_permissions[command_name][key] = id_list
+        # Build a new dict so SQLAlchemy notices the JSON change
+        permissions = dict(self.command_permissions or {})
+        command_perms = dict(permissions.get(command_name) or {
+            "allowed_channels": [],
+            "denied_channels": [],
+            "allowed_roles": [],
+            "denied_roles": []
+        })
+        command_perms[key] = id_list
+        permissions[command_name] = command_perms
+        self.command_permissions = permissions
         
     def check_command_permission(self, command_name, channel_id, role_ids):
         """Check if a command is allowed in a channel for roles.
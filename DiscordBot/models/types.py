@@ -0,0 +1,25 @@
+from sqlalchemy import BigInteger
+from sqlalchemy.types import TypeDecorator
+
+class Snowflake(TypeDecorator):
+    """Discord ID stored as BIGINT.
+
+    Accepts ints and digit strings (the legacy form used throughout the cogs)
+    and always returns ints. Columns that still hold text because
+    migrate_discord_ids.py hasn't been run yet only work on SQLite; PostgreSQL
+    rejects integer binds against VARCHAR, so the bot won't start there until
+    they are migrated.
+    """
+    impl = BigInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, int):
+            return value
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Not a Discord ID: {value!r}")
+
+    def process_result_value(self, value, dialect):
+        return int(value) if value is not None else None
@@ -1,13 +1,14 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, JSON, ForeignKey, Table
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, JSON, ForeignKey, Table, Index
+from sqlalchemy.orm import relationship, object_session
 from datetime import datetime
 from .base import Base
+from .types import Snowflake
 
 # Association table for user-badge many-to-many relationship
 user_badges = Table(
     'user_badges',
     Base.metadata,
-    Column('user_id', String, ForeignKey('users.id')),
+    Column('user_id', Snowflake, ForeignKey('users.id')),
     Column('badge_id', Integer, ForeignKey('badges.id'))
 )
 
@@ -15,7 +16,7 @@ user_badges = Table(
 user_favorite_series = Table(
     'user_favorite_series',
     Base.metadata,
-    Column('user_id', String, ForeignKey('users.id')),
+    Column('user_id', Snowflake, ForeignKey('users.id')),
     Column('series_id', Integer, ForeignKey('series.id'))
 )
 
@@ -23,16 +24,27 @@ user_favorite_series = Table(
 user_favorite_characters = Table(
     'user_favorite_characters',
     Base.metadata,
-    Column('user_id', String, ForeignKey('users.id')),
+    Column('user_id', Snowflake, ForeignKey('users.id')),
     Column('character_id', Integer, ForeignKey('characters.id'))
 )
 
+# Association table for user wishlists (character demand)
+user_wishlists = Table(
+    'wishlists',
+    Base.metadata,
+    Column('user_id', Snowflake, ForeignKey('users.id'), primary_key=True),
+    Column('character_id', Integer, ForeignKey('characters.id'), primary_key=True),
+    Column('added_at', DateTime, default=datetime.utcnow),
+    # Reverse index: who wants this character
+    Index('ix_wishlists_character_id', 'character_id')
+)
+
 class User(Base):
     """User model for storing user-related data."""
     __tablename__ = 'users'
 
     # Basic user information
-    id = Column(String, primary_key=True)  # Discord user ID
+    id = Column(Snowflake, primary_key=True)  # Discord user ID
     username = Column(String)
     join_date = Column(DateTime, default=datetime.utcnow)
     
@@ -41,15 +53,18 @@ class User(Base):
     total_cards = Column(Integer, default=0)
     
     # Relationships
-    cards = relationship("Card", back_populates="owner")
+    # Claim order; the owner_id index would otherwise hand cards back rarest first
+    cards = relationship("Card", back_populates="owner", order_by="Card.id")
     badges = relationship("Badge", secondary=user_badges, back_populates="users")
     favorite_series = relationship("Series", secondary=user_favorite_series)
     favorite_characters = relationship("Character", secondary=user_favorite_characters)
+    wishlist = relationship("Character", secondary=user_wishlists, viewonly=True)
     
     # Inventory and resources
     inventory = Column(JSON, default=dict)  # Store inventory items as JSON
     currency = Column(Integer, default=0)  # Main currency
     premium_currency = Column(Integer, default=0)  # Premium currency
+    gacha_tickets = Column(Integer, nullable=False, default=0, server_default="0")  # Spent by !gacha pulls
     
     # Profile customization
     profile_color = Column(String, default="#3498db")
@@ -83,20 +98,15 @@ class User(Base):
     @property
     def rarest_cards(self):
         """Get the user's rarest cards."""
-        if not self.cards:
-            return []
-        
-        # Define rarity order (highest to lowest)
-        rarity_order = {"ER": 7, "LR": 6, "UR": 5, "SSR": 4, "SR": 3, "R": 2, "N": 1}
-        
-        # Sort cards by rarity
-        sorted_cards = sorted(
-            self.cards, 
-            key=lambda card: rarity_order.get(card.rarity, 0), 
-            reverse=True
-        )
+        session = object_session(self)
+        if "cards" not in self.__dict__ and session is not None:
+            # Collection not loaded; read the top 5 straight off the (owner_id, rarity_rank) index
+            from .card import Card
+            return session.query(Card).filter(Card.owner_id == self.id).order_by(
+                Card.rarity_rank.desc(), Card.order
+            ).limit(5).all()
         
-        return sorted_cards[:5]  # Return top 5 rarest cards
+        return sorted(self.cards, key=lambda card: (-card.rarity_rank, card.order))[:5]
     
     @property
     def favorite_card(self):
@@ -109,7 +119,8 @@ class User(Base):
                 return card
         
         # If no favorite is set, return the rarest card
-        return self.rarest_cards[0] if self.rarest_cards else None
+        rarest = self.rarest_cards
+        return rarest[0] if rarest else None
     
     def add_card(self, card):
         """Add a card to the user's collection."""
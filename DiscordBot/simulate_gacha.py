@@ -0,0 +1,114 @@
+"""
+Statistical check of the gacha banners.
+Simulates millions of pulls per banner with the same draw code the bot uses
+(no database) and fails if:
+  - rarities drawn without pity stray from the configured rates,
+  - rarities drawn with pity stray from the expected long-run rates,
+  - any run of pulls goes past the pity limit without a pity-tier card,
+  - 10x/100x pulls give different results from the same number of 1x pulls.
+
+Deviations are z-scores against a binomial with the expected rate; the default
+limit of 4.5 makes a false failure very unlikely with a fixed seed.
+
+    python simulate_gacha.py --pulls 2000000
+    python simulate_gacha.py --pity-pulls 10
+"""
+import sys
+import math
+import time
+import random
+import argparse
+from pathlib import Path
+
+# Add the parent directory to sys.path to import modules
+sys.path.append(str(Path(__file__).parent))
+
+from models.rarity import RARITY_RANKS
+from utils.gacha import BANNERS, Banner
+
+def check_rates(label, counts, expected, pulls, max_z):
+    """Print observed vs expected rates; return the rarities whose z-score is over max_z."""
+    failures = []
+    print(f"  {label}")
+    print(f"    {'rarity':<7} {'expected %':>11} {'observed %':>11} {'z':>7}")
+    for code, rate in expected.items():
+        observed = counts.get(code, 0)
+        deviation = math.sqrt(pulls * rate * (1 - rate)) or 1.0
+        z = (observed - pulls * rate) / deviation
+        flag = "  <-- FAIL" if abs(z) > max_z else ""
+        print(f"    {code:<7} {rate * 100:>11.4f} {observed / pulls * 100:>11.4f} {z:>7.2f}{flag}")
+        if flag:
+            failures.append(f"{label}: {code} z={z:.2f}")
+    return failures
+
+def simulate(banner, pulls, batch, rng, pity=True):
+    """Pull `pulls` times in batches; returns (counts, longest run without a pity-tier card)."""
+    counts = {}
+    counter = 0
+    streak = 0
+    longest = 0
+    remaining = pulls
+    while remaining:
+        size = min(batch, remaining)
+        if pity:
+            rarities, counter = banner.draw(size, counter, rng)
+        else:
+            rarities = banner.table.sample(size, rng)
+        for rarity in rarities:
+            counts[rarity] = counts.get(rarity, 0) + 1
+            if RARITY_RANKS[rarity] >= banner.pity_rank:
+                longest = max(longest, streak + 1)
+                streak = 0
+            else:
+                streak += 1
+        remaining -= size
+    return counts, max(longest, streak)
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify gacha rates and pity by simulation.")
+    parser.add_argument("--pulls", type=int, default=2000000, help="Pulls per check")
+    parser.add_argument("--banners", nargs="+", help="Only check these banners")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--max-z", type=float, default=4.5, help="Largest allowed z-score")
+    parser.add_argument("--pity-pulls", type=int, help="Override the pity limit (a short one makes pity dominate)")
+    args = parser.parse_args()
+
+    failures = []
+    for key, banner in BANNERS.items():
+        if args.banners and key not in args.banners:
+            continue
+        if args.pity_pulls and banner.pity_rarity:
+            rates = {code: rate * 100 for code, rate in banner.rates.items()}
+            banner = Banner(key, banner.name, rates, banner.cost, {"pulls": args.pity_pulls, "rarity": banner.pity_rarity})
+        print(f"{key} ({banner.name}), {args.pulls} pulls per check")
+
+        started = time.perf_counter()
+        counts, _ = simulate(banner, args.pulls, 100, random.Random(args.seed), pity=False)
+        elapsed = time.perf_counter() - started
+        failures += check_rates("base rates (pity off)", counts, banner.rates, args.pulls, args.max_z)
+        print(f"    {args.pulls / elapsed / 1e6:.2f}M pulls/s")
+
+        if banner.pity_pulls:
+            counts, longest = simulate(banner, args.pulls, 10, random.Random(args.seed + 1))
+            failures += check_rates("effective rates (pity on)", counts, banner.effective_rates(), args.pulls, args.max_z)
+            print(f"    longest run to a {banner.pity_rarity}+ card: {longest} pulls (limit {banner.pity_pulls})")
+            if longest > banner.pity_pulls:
+                failures.append(f"{key}: {longest} pulls without a {banner.pity_rarity}+ card")
+
+        # Batching must not change the outcome: same seed, 1x pulls vs 10x and 100x pulls
+        sample = min(args.pulls, 100000)
+        singles, _ = simulate(banner, sample, 1, random.Random(args.seed + 2))
+        for batch in (10, 100):
+            batched, _ = simulate(banner, sample, batch, random.Random(args.seed + 2))
+            agree = batched == singles
+            print(f"  {batch}x pulls {'match' if agree else 'DIFFER from'} single pulls over {sample} pulls")
+            if not agree:
+                failures.append(f"{key}: {batch}x pulls differ from {batch} single pulls")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    print("All gacha checks passed." if not failures else f"{len(failures)} gacha checks failed.")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
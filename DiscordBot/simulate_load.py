@@ -0,0 +1,369 @@
+"""
+Offline end-to-end load simulation.
+Drives a real commands.Bot with the cogs loaded through fake guilds, members,
+messages, reactions and button clicks (utils/simulation.py), against a
+throwaway SQLite database and without any network access. Replays a scripted
+workload and reports per-action latency, event-loop lag and error counts.
+
+The default workload is:
+    1. every guild spawns a card at once
+    2. claims at --claims-per-minute for --claim-seconds (reactions for N/R, tclaim otherwise)
+    3. --trades concurrent trades (invite, accept, add cards, view cards button, close both sides)
+
+A custom workload is a JSON list of phases, for example:
+    [{"type": "spawn", "rounds": 2}, {"type": "claim", "per_minute": 5000, "seconds": 60}, {"type": "trade", "concurrent": 100}]
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+from pathlib import Path
+from collections import Counter, defaultdict
+
+# Add the parent directory to sys.path to import modules
+sys.path.append(str(Path(__file__).parent))
+
+DEFAULT_EXTENSIONS = ["cogs.trade"]
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, max(0, int(round(fraction * len(samples) + 0.5)) - 1))
+    return samples[index]
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {
+        "count": len(samples),
+        "p50_ms": round(percentile(samples, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(samples, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(samples, 0.99) * 1000, 2),
+        "max_ms": round(samples[-1] * 1000, 2) if samples else 0.0
+    }
+
+class Simulation:
+    def __init__(self, bot, guilds, rng):
+        self.bot = bot
+        self.guilds = guilds  # [(guild, channel, member payloads)]
+        self.rng = rng
+        self.latencies = defaultdict(list)
+        self.counters = Counter()
+        self.phases = []
+
+    @property
+    def spawn_cog(self):
+        return self.bot.get_cog("Spawn")
+
+    async def timed(self, label, coroutine):
+        started = time.perf_counter()
+        try:
+            return await coroutine
+        finally:
+            self.latencies[label].append(time.perf_counter() - started)
+
+    async def command(self, label, channel, member, content, mentions=()):
+        return await self.timed(label, self.bot.deliver_message(channel, member, content, mentions=mentions))
+
+    # Phases
+
+    async def spawn_phase(self, rounds=1):
+        """Every guild spawns at once, `rounds` times."""
+        for _ in range(rounds):
+            await asyncio.gather(*(
+                self.timed("spawn", self.spawn_cog.send_spawn(channel)) for _, channel, _ in self.guilds
+            ))
+
+    async def claim_one(self):
+        guild, channel, members = self.rng.choice(self.guilds)
+        spawn_cog = self.spawn_cog
+        if not spawn_cog.currently_spawned.get(guild.id):
+            await self.timed("spawn", spawn_cog.send_spawn(channel))
+        name = spawn_cog.currently_spawned.get(guild.id)
+        if not name:
+            self.counters["claim_without_spawn"] += 1
+            return
+
+        member = self.rng.choice(members)
+        if spawn_cog.current_rarity.get(guild.id) in ("N", "R"):
+            message = spawn_cog.spawn_message[guild.id]
+            events = await self.timed("reaction_claim", self.bot.deliver_reaction(message, member))
+            if "on_reaction_add" not in events:
+                # The spawn message fell out of the bot's message cache
+                self.counters["reaction_not_dispatched"] += 1
+        else:
+            await self.command("claim", channel, member, f"tclaim {name}")
+
+    async def claim_phase(self, per_minute=5000, seconds=30):
+        """Claims arriving at a fixed rate across random guilds."""
+        loop = asyncio.get_running_loop()
+        interval = 60.0 / per_minute
+        tasks = []
+        started = loop.time()
+        for index in range(int(per_minute * seconds / 60)):
+            delay = started + index * interval - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(loop.create_task(self.claim_one()))
+        await asyncio.gather(*tasks)
+
+    async def trade_one(self, channel, initiator, recipient):
+        trade_cog = self.bot.get_cog("TradeCog")
+        await self.command("trade", channel, initiator, f"ttrade <@{recipient['id']}>", mentions=[recipient])
+        await self.command("trade_accept", channel, recipient, "ttac")
+
+        session = trade_cog.active_trades.get(f"{initiator['id']}_{recipient['id']}")
+        if not session:
+            self.counters["trade_not_started"] += 1
+            return
+        for member in (initiator, recipient):
+            card = self.trade_cards.get(member["id"])
+            await self.command("tradeadd", channel, member, f"tta {card}")
+
+        buttons = self.bot.buttons(session.trade_message)
+        if buttons:
+            seconds = await self.bot.deliver_click(session.trade_message, recipient, buttons[0])
+            self.latencies["click:view_cards"].append(seconds)
+
+        await self.command("tradeclose", channel, initiator, "ttc")
+        await self.command("tradeclose", channel, recipient, "ttc")
+        if session.status == "COMPLETED":
+            self.counters["trades_completed"] += 1
+
+    async def trade_phase(self, concurrent=100):
+        """Concurrent trades between distinct pairs of members."""
+        from sqlalchemy.orm import close_all_sessions
+        from utils.db import add_card
+        from utils.catalog import character_catalog
+
+        pairs = []
+        for guild, channel, members in self.guilds:
+            for index in range(0, len(members) - 1, 2):
+                pairs.append((channel, members[index], members[index + 1]))
+                if len(pairs) == concurrent:
+                    break
+            if len(pairs) == concurrent:
+                break
+        if len(pairs) < concurrent:
+            print(f"Only {len(pairs)} member pairs available for {concurrent} trades.")
+
+        # Every trader needs a card to offer (setup, not timed)
+        character_ids = list(character_catalog.current.character_ids.values())
+        self.trade_cards = {}
+        for _, initiator, recipient in pairs:
+            for member in (initiator, recipient):
+                card = add_card(member["id"], self.rng.choice(character_ids), "R", "https://example.com/trade.png", claim_method="spawn")
+                self.trade_cards[member["id"]] = card.global_id
+        close_all_sessions()
+
+        await asyncio.gather(*(self.trade_one(*pair) for pair in pairs))
+
+    async def run_phase(self, phase):
+        kind = phase.get("type")
+        options = {key: value for key, value in phase.items() if key != "type"}
+        runner = {"spawn": self.spawn_phase, "claim": self.claim_phase, "trade": self.trade_phase}.get(kind)
+        if runner is None:
+            raise ValueError(f"Unknown workload phase: {kind}")
+
+        before = sum(len(samples) for samples in self.latencies.values())
+        started = time.perf_counter()
+        await runner(**options)
+        elapsed = time.perf_counter() - started
+        actions = sum(len(samples) for samples in self.latencies.values()) - before
+        self.phases.append({
+            "phase": kind,
+            "options": options,
+            "seconds": round(elapsed, 2),
+            "actions": actions,
+            "actions_per_sec": round(actions / elapsed, 1) if elapsed else 0.0
+        })
+        print(f"Phase {kind} {options}: {actions} actions in {elapsed:.2f}s")
+
+async def build(args):
+    """Create the bot, world and cogs."""
+    import discord
+    from utils.simulation import SimulatedBot, user_payload, snowflake
+    from sqlalchemy.orm import close_all_sessions
+    from utils.db import register_server, update_server
+    from utils.catalog import character_catalog
+    from utils.permissions import check_command_permissions
+    from utils import metrics
+    from models.base import engine
+    from config import CORE_EXTENSIONS
+
+    summary = character_catalog.load()
+    print(f"Catalog loaded: {len(character_catalog.current)} characters ({summary['elapsed_ms']} ms)")
+
+    intents = discord.Intents.default()
+    intents.message_content = True
+    intents.guilds = True
+    intents.reactions = True
+    intents.members = True
+    bot = SimulatedBot(command_prefix="t", intents=intents, api_latency=args.api_latency_ms / 1000, max_messages=args.max_messages)
+    bot.remove_command("help")
+    bot.add_check(check_command_permissions)
+    metrics.instrument_bot(bot, engine)
+
+    command_errors = Counter()
+    async def on_command_error(ctx, error):
+        command_errors[type(error).__name__] += 1
+        if sum(command_errors.values()) <= 5:
+            print(f"Command error in {ctx.command}: {error!r}")
+    bot.add_listener(on_command_error, "on_command_error")
+    bot.command_errors = command_errors
+
+    await bot.prepare()
+    for extension in CORE_EXTENSIONS + args.extensions:
+        await bot.load_extension(extension)
+
+    # The simulation drives spawns itself instead of the 5 minute loop
+    spawn_cog = bot.get_cog("Spawn")
+    if spawn_cog:
+        spawn_cog.spawn_task.cancel()
+
+    guilds = []
+    for index in range(args.guilds):
+        members = [user_payload(snowflake(), f"member{index}_{number}") for number in range(args.members)]
+        guild = bot.add_guild(f"Guild {index}", members, channel_names=("spawn",))
+        channel = guild.text_channels[0]
+        register_server(guild.id, guild.name, admin_id=members[0]["id"], admin_name=members[0]["username"])
+        update_server(guild.id, guild.name, "spawn_channel_id", str(channel.id))
+        # get_db() sessions hold a connection until collected; don't let setup drain the pool
+        close_all_sessions()
+        guilds.append((guild, channel, members))
+
+    if args.sql_report:
+        from utils.query_audit import query_audit
+        query_audit.install(engine)
+
+    bot.mark_ready()
+    return bot, guilds
+
+async def simulate(args, phases):
+    from utils.simulation import LoopLagMonitor
+    from utils.loop_watchdog import LoopWatchdog
+    from utils import metrics
+
+    bot, guilds = await build(args)
+    simulation = Simulation(bot, guilds, random.Random(args.seed))
+    random.seed(args.seed)
+
+    monitor = LoopLagMonitor(args.lag_interval_ms / 1000)
+    monitor.start()
+    watchdog = LoopWatchdog(threshold_ms=args.block_threshold_ms)
+    watchdog.start()
+    started = time.perf_counter()
+    try:
+        for phase in phases:
+            await simulation.run_phase(phase)
+    finally:
+        await monitor.stop()
+        await watchdog.stop()
+        elapsed = time.perf_counter() - started
+
+    # Let background tasks (wishlist DMs, delete_after) settle before closing
+    await asyncio.sleep(0)
+    report = {
+        "parameters": {
+            "guilds": args.guilds, "members": args.members, "api_latency_ms": args.api_latency_ms,
+            "max_messages": args.max_messages, "seed": args.seed, "extensions": args.extensions
+        },
+        "workload": phases,
+        "seconds": round(elapsed, 2),
+        "phases": simulation.phases,
+        "latency": {label: summarize(samples) for label, samples in sorted(simulation.latencies.items())},
+        "loop_lag": summarize(monitor.samples),
+        "loop_blockers": [
+            {"site": site, "count": count, "seconds": round(seconds, 3), "max_ms": round(longest * 1000, 1)}
+            for site, count, seconds, longest in watchdog.top_blockers(10)
+        ],
+        "counters": dict(simulation.counters),
+        "command_errors": dict(bot.command_errors),
+        "event_errors": dict(bot.event_errors),
+        "api_calls": dict(bot.http.calls.most_common()),
+        "interaction_calls": dict(bot.adapter.calls.most_common()),
+        "commands": {
+            labels["command"]: {
+                "count": metrics.command_seconds.stats(**labels)[0],
+                "p95_ms": round(metrics.command_seconds.quantile(0.95, **labels) * 1000, 2),
+                "sql_statements_per_call": round(metrics.command_queries.stats(**labels)[1] / max(metrics.command_queries.stats(**labels)[0], 1), 2)
+            }
+            for labels in metrics.command_seconds.label_sets()
+        }
+    }
+    if args.sql_report:
+        from utils.query_audit import query_audit
+        print(f"SQL audit report written to {query_audit.write_report(args.sql_report)}")
+    await bot.close()
+    return report
+
+def print_report(report):
+    print(f"\nSimulated {report['parameters']['guilds']} guilds in {report['seconds']}s")
+    print(f"  {'action':<20} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for label, stats in report["latency"].items():
+        print(f"  {label:<20} {stats['count']:>7} {stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f} {stats['max_ms']:>9.2f}")
+    lag = report["loop_lag"]
+    print(f"\nEvent loop lag: p50 {lag['p50_ms']} ms, p95 {lag['p95_ms']} ms, p99 {lag['p99_ms']} ms, max {lag['max_ms']} ms")
+    for blocker in report["loop_blockers"]:
+        print(f"  blocked {blocker['count']}x, {blocker['seconds']}s total, max {blocker['max_ms']} ms: {blocker['site']}")
+    for title, values in (("Counters", report["counters"]), ("Command errors", report["command_errors"]), ("Event errors", report["event_errors"])):
+        if values:
+            print(f"{title}: " + ", ".join(f"{key}={value}" for key, value in values.items()))
+    for command, stats in report["commands"].items():
+        print(f"  t{command}: {stats['count']} calls, p95 {stats['p95_ms']} ms, {stats['sql_statements_per_call']} SQL statements/call")
+    print("Busiest API routes: " + ", ".join(f"{key} x{value}" for key, value in list(report["api_calls"].items())[:5]))
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a scripted workload against the bot without Discord.")
+    parser.add_argument("--guilds", type=int, default=200)
+    parser.add_argument("--members", type=int, default=10, help="Members per guild")
+    parser.add_argument("--spawn-rounds", type=int, default=1)
+    parser.add_argument("--claims-per-minute", type=int, default=5000)
+    parser.add_argument("--claim-seconds", type=float, default=30)
+    parser.add_argument("--trades", type=int, default=100, help="Concurrent trades")
+    parser.add_argument("--workload", help="JSON file with a list of phases (overrides the options above)")
+    parser.add_argument("--extensions", nargs="*", default=DEFAULT_EXTENSIONS, help="Cogs to load on top of the core cogs")
+    parser.add_argument("--api-latency-ms", type=float, default=0.0, help="Simulated Discord API round trip")
+    parser.add_argument("--max-messages", type=int, default=1000, help="Bot message cache size (discord.py default)")
+    parser.add_argument("--lag-interval-ms", type=float, default=50.0, help="Event loop lag sampling interval")
+    parser.add_argument("--block-threshold-ms", type=float, default=250.0, help="Stall length at which the watchdog samples the stack")
+    parser.add_argument("--database", help="SQLite file to use instead of a throwaway one")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--sql-report", help="Audit SQL per command and write the N+1/slow query report here")
+    args = parser.parse_args()
+
+    if args.workload:
+        with open(args.workload) as f:
+            phases = json.load(f)
+    else:
+        phases = [
+            {"type": "spawn", "rounds": args.spawn_rounds},
+            {"type": "claim", "per_minute": args.claims_per_minute, "seconds": args.claim_seconds},
+            {"type": "trade", "concurrent": args.trades}
+        ]
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # models.base reads these on import, so they are set before any bot module is loaded
+        os.environ["DB_TYPE"] = "sqlite"
+        os.environ["SQLITE_DB_PATH"] = args.database or os.path.join(temp_dir, "simulation.db")
+        os.environ["CATALOG_SNAPSHOT_PATH"] = os.path.join(temp_dir, "catalog.snapshot")
+        report = asyncio.run(simulate(args, phases))
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
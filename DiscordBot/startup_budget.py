@@ -0,0 +1,140 @@
+"""
+Startup budget check.
+Runs the bot's startup path (imports, core cogs, on_ready catalog load) in a
+fresh interpreter with -X importtime, without connecting to Discord, and exits
+with status 1 when time-to-ready exceeds the budget or when a deferred heavy
+dependency is imported eagerly. Run it before merging changes to startup code.
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+BOT_DIR = Path(__file__).parent
+
+# Milliseconds from interpreter start to the end of on_ready's startup work
+DEFAULT_BUDGET_MS = 2500
+
+# Modules that must only be imported on first use
+DEFERRED_MODULES = ("PIL", "requests", "supabase", "sqlalchemy.ext.asyncio", "cogs.lookup", "cogs.profile")
+
+# Mirrors main.py: imports, core extensions, then the on_ready startup work
+STARTUP_SCRIPT = """
+import time, json, asyncio
+started = time.perf_counter()
+import discord
+from discord.ext import commands
+from config import CORE_EXTENSIONS
+from utils.db import initialize_database
+from utils.catalog import character_catalog
+from utils.permissions import check_command_permissions
+imported = time.perf_counter()
+
+async def startup():
+    intents = discord.Intents.default()
+    intents.message_content = True
+    intents.members = True
+    bot = commands.Bot(command_prefix="t", intents=intents)
+    bot.add_check(check_command_permissions)
+    for ext in CORE_EXTENSIONS:
+        await bot.load_extension(ext)
+    loaded = time.perf_counter()
+    character_catalog.load()
+    return loaded
+
+loaded = asyncio.run(startup())
+ready = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "extensions_ms": (loaded - imported) * 1000,
+    "on_ready_ms": (ready - loaded) * 1000,
+    "total_ms": (ready - started) * 1000
+}))
+"""
+
+def parse_importtime(stderr):
+    """Parse -X importtime output into [(module, self_us, cumulative_us, depth)]."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            entries.append((name.strip(), int(self_us), int(cumulative_us), (len(name) - len(name.lstrip())) // 2))
+        except ValueError:
+            continue  # Header line
+    return entries
+
+def run_startup(python=sys.executable):
+    """Run the startup script once and return (timings, importtime entries)."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        env = dict(os.environ)
+        env["DB_TYPE"] = "sqlite"
+        env["SQLITE_DB_PATH"] = os.path.join(temp_dir, "startup.db")
+        env["CATALOG_SNAPSHOT_PATH"] = os.path.join(temp_dir, "catalog.snapshot")
+        result = subprocess.run(
+            [python, "-X", "importtime", "-c", STARTUP_SCRIPT],
+            cwd=BOT_DIR, env=env, capture_output=True, text=True
+        )
+    if result.returncode != 0:
+        print(result.stderr[-4000:])
+        raise RuntimeError(f"Startup script failed with exit code {result.returncode}")
+
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    return timings, parse_importtime(result.stderr)
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail when bot startup exceeds its time budget.")
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("STARTUP_BUDGET_MS", DEFAULT_BUDGET_MS)))
+    parser.add_argument("--runs", type=int, default=3, help="Runs to take the best time from")
+    parser.add_argument("--top", type=int, default=10, help="Slowest top-level imports to list")
+    parser.add_argument("--json", action="store_true", help="Print a machine-readable report")
+    args = parser.parse_args()
+
+    runs = [run_startup() for _ in range(max(args.runs, 1))]
+    # Use the fastest run; the slower ones mostly measure a cold disk cache
+    timings, entries = min(runs, key=lambda run: run[0]["total_ms"])
+
+    imported = {name for name, _, _, _ in entries}
+    eager = sorted(
+        module for module in DEFERRED_MODULES
+        if module in imported or any(name.startswith(module + ".") for name in imported)
+    )
+    slowest = sorted(
+        (entry for entry in entries if entry[3] == 0), key=lambda entry: entry[2], reverse=True
+    )[:args.top]
+
+    failures = []
+    if timings["total_ms"] > args.budget_ms:
+        failures.append(f"time to ready {timings['total_ms']:.0f} ms exceeds budget of {args.budget_ms:.0f} ms")
+    for module in eager:
+        failures.append(f"{module} is imported at startup but should be deferred")
+
+    if args.json:
+        print(json.dumps({
+            "budget_ms": args.budget_ms,
+            "timings": timings,
+            "slowest_imports": [{"module": name, "cumulative_ms": cumulative / 1000} for name, _, cumulative, _ in slowest],
+            "eager_deferred_modules": eager,
+            "failures": failures
+        }, indent=2))
+    else:
+        print(f"Imports:        {timings['import_ms']:8.1f} ms")
+        print(f"Core cogs:      {timings['extensions_ms']:8.1f} ms")
+        print(f"on_ready work:  {timings['on_ready_ms']:8.1f} ms")
+        print(f"Time to ready:  {timings['total_ms']:8.1f} ms (budget {args.budget_ms:.0f} ms)")
+        print("\nSlowest top-level imports:")
+        for name, _, cumulative, _ in slowest:
+            print(f"  {cumulative / 1000:8.1f} ms  {name}")
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        if not failures:
+            print("\nStartup is within budget.")
+
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""
+Write-behind buffer for card affection.
+
+!flirt, !hug and !kiss add a few points to one card at a time. Instead of
+rewriting the collection on every command, the increment is applied to an
+in-memory copy of the card's affection (so the reply shows the right number
+straight away) and queued. flush() writes the queued increments as one batch of
+UPDATE cards SET affection = affection + ? statements, bumps the affection
+leaderboard in the same transaction and then updates the per-character
+affection heaps. The affection cog flushes every AFFECTION_FLUSH_SECONDS and on
+shutdown.
+
+A card stays cached from its first increment until the flush that writes it,
+so readers see the cached value through current(). update_user("cards")
+rewrites cards with absolute values, so it discards the queued increments for
+the cards it replaces.
+"""
+import os
+import threading
+from sqlalchemy import update, select, bindparam
+
+from models.base import get_db
+from models.card import Card
+from models.character import Character
+from utils.leaderboard import record_affection
+from utils.affection_rank import affection_ranking
+
+AFFECTION_FLUSH_SECONDS = float(os.getenv("AFFECTION_FLUSH_SECONDS", "5"))
+
+# Global IDs per SELECT ... IN (...) when reading the flushed cards back
+LOOKUP_CHUNK = 500
+
+class AffectionBuffer:
+    """Pending affection increments per card, coalesced until the next flush."""
+
+    def __init__(self):
+        self._pending = {}  # Global ID -> affection not written yet
+        self._cards = {}  # Global ID -> [owner_id, name, affection including pending]
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    def add(self, user_id, global_id, amount):
+        """Add affection to one of the user's cards.
+
+        Returns (card_name, new_affection), or (None, None) if the user doesn't own the card.
+        """
+        user_id = int(user_id)
+        with self._lock:
+            cached = self._cards.get(global_id)
+            if cached and cached[0] == user_id:
+                cached[2] += amount
+                self._pending[global_id] = self._pending.get(global_id, 0) + amount
+                return cached[1], cached[2]
+
+        db = get_db()
+        row = db.query(Card.owner_id, Character.name, Card.affection).join(
+            Character, Card.character_id == Character.id
+        ).filter(Card.global_id == global_id).first()
+        db.close()
+
+        if not row or row.owner_id != user_id:
+            return None, None
+
+        with self._lock:
+            # Another command may have cached the card while we were reading it
+            cached = self._cards.setdefault(global_id, [row.owner_id, row.name, row.affection or 0])
+            cached[2] += amount
+            self._pending[global_id] = self._pending.get(global_id, 0) + amount
+            return cached[1], cached[2]
+
+    def current(self, global_id, stored):
+        """A card's affection including unflushed increments, given the stored value."""
+        with self._lock:
+            cached = self._cards.get(global_id)
+        return cached[2] if cached else stored
+
+    def pending_count(self):
+        """Number of cards with increments waiting for the next flush."""
+        with self._lock:
+            return len(self._pending)
+
+    def discard(self, user_id, global_ids=()):
+        """Drop queued increments for a user's cards and the given cards.
+
+        Called before a collection is rewritten with absolute affection values
+        (which already include the cached increments). Waits for a running flush.
+        """
+        user_id = int(user_id)
+        global_ids = set(global_ids)
+        with self._flush_lock, self._lock:
+            for global_id in [key for key, cached in self._cards.items() if cached[0] == user_id or key in global_ids]:
+                del self._cards[global_id]
+                self._pending.pop(global_id, None)
+
+    def flush(self):
+        """Write every queued increment in one transaction. Returns the number of cards updated."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+
+            cards = Card.__table__
+            db = get_db()
+            try:
+                db.execute(
+                    update(cards).where(cards.c.global_id == bindparam("card_global_id")).values(
+                        affection=cards.c.affection + bindparam("delta")
+                    ),
+                    [{"card_global_id": global_id, "delta": delta} for global_id, delta in batch.items()]
+                )
+
+                global_ids = list(batch)
+                rows = []
+                for start in range(0, len(global_ids), LOOKUP_CHUNK):
+                    rows.extend(db.execute(
+                        select(cards.c.global_id, cards.c.owner_id, cards.c.character_id, cards.c.affection).where(
+                            cards.c.global_id.in_(global_ids[start:start + LOOKUP_CHUNK])
+                        )
+                    ).all())
+
+                gained = {}
+                for global_id, owner_id, _, _ in rows:
+                    if owner_id is not None:
+                        gained[owner_id] = gained.get(owner_id, 0) + batch[global_id]
+                for owner_id, delta in gained.items():
+                    record_affection(db, owner_id, delta)
+
+                db.commit()
+            except Exception:
+                db.rollback()
+                with self._lock:
+                    # Requeue so the next flush retries
+                    for global_id, delta in batch.items():
+                        self._pending[global_id] = self._pending.get(global_id, 0) + delta
+                raise
+            finally:
+                db.close()
+
+            for global_id, owner_id, character_id, affection in rows:
+                if owner_id is not None:
+                    affection_ranking.observe(character_id, global_id, owner_id, affection)
+
+            with self._lock:
+                # The database has these values now; keep only cards touched since the flush started
+                for global_id in batch:
+                    if global_id not in self._pending:
+                        self._cards.pop(global_id, None)
+            return len(batch)
+
+# Shared instance used by the affection cog and utils.db
+affection_buffer = AffectionBuffer()
@@ -0,0 +1,161 @@
+"""
+Per-character affection ranking ("biggest simp").
+
+Rankings are answered from the cards(character_id, affection DESC) index. A
+small top-K min-heap per character is kept in memory and updated on every
+affection write, so repeated lookups of popular characters never touch the
+database at all.
+"""
+import heapq
+import threading
+from sqlalchemy import func
+
+from models.base import get_db
+from models.card import Card
+
+# Number of top cards kept warm per character
+TOP_K = 10
+
+class AffectionRanking:
+    """Top-K affection heaps per character, loaded lazily from the index."""
+
+    def __init__(self, k=TOP_K):
+        self.k = k
+        self._heaps = {}  # Character ID -> min-heap of (affection, global_id, owner_id)
+        # Character ID -> writes seen while its heap is being loaded, as (global_id, owner_id, affection)
+        # with affection None for a discard; None if the load was invalidated
+        self._loading = {}
+        self._lock = threading.Lock()
+
+    def _load(self, character_id):
+        """Load a character's top-K cards with an index-ordered LIMIT query."""
+        db = get_db()
+        rows = db.query(Card.affection, Card.global_id, Card.owner_id).filter(
+            Card.character_id == character_id,
+            Card.owner_id.isnot(None),
+            Card.affection > 0
+        ).order_by(Card.affection.desc()).limit(self.k).all()
+
+        heap = [(row.affection, row.global_id, row.owner_id) for row in rows]
+        heapq.heapify(heap)
+        return heap
+
+    def _apply(self, heap, global_id, owner_id, affection):
+        """Apply a card's new affection to a heap. Returns False if the heap can't be kept."""
+        for index, entry in enumerate(heap):
+            if entry[1] == global_id:
+                if affection < entry[0] and len(heap) >= self.k:
+                    # A card outside the heap may now outrank this one
+                    return False
+                heap[index] = heap[-1]
+                heap.pop()
+                heapq.heapify(heap)
+                break
+
+        if affection <= 0:
+            return True
+
+        if len(heap) < self.k:
+            heapq.heappush(heap, (affection, global_id, owner_id))
+        elif affection > heap[0][0]:
+            heapq.heapreplace(heap, (affection, global_id, owner_id))
+        return True
+
+    def _install(self, character_id, heap, pending):
+        """Cache a freshly loaded heap after replaying the writes made during the load (lock held)."""
+        if pending is None:
+            return
+        # The load may or may not have seen these writes; replaying a newer value is harmless either way
+        for global_id, owner_id, affection in pending:
+            if affection is None:
+                if any(entry[1] == global_id for entry in heap):
+                    return
+            elif not self._apply(heap, global_id, owner_id, affection):
+                return
+        self._heaps[character_id] = heap
+
+    def top(self, character_id, limit=TOP_K):
+        """Get the highest affection cards for a character as (owner_id, global_id, affection)."""
+        with self._lock:
+            heap = self._heaps.get(character_id)
+            # Only one reader loads into the cache; concurrent readers load for themselves
+            loader = heap is None and character_id not in self._loading
+            if loader:
+                self._loading[character_id] = []
+
+        if heap is None:
+            try:
+                heap = self._load(character_id)
+            except Exception:
+                if loader:
+                    with self._lock:
+                        self._loading.pop(character_id, None)
+                raise
+            if loader:
+                with self._lock:
+                    self._install(character_id, list(heap), self._loading.pop(character_id))
+
+        with self._lock:
+            ranked = heapq.nlargest(min(limit, self.k), heap)
+        return [(owner_id, global_id, affection) for affection, global_id, owner_id in ranked]
+
+    def biggest_simp(self, character_id):
+        """Get (owner_id, affection) of the top card for a character, or (None, 0)."""
+        top = self.top(character_id, limit=1)
+        if not top:
+            return None, 0
+        owner_id, _, affection = top[0]
+        return owner_id, affection
+
+    def observe(self, character_id, global_id, owner_id, affection):
+        """Record a card's new affection value (called on every affection write)."""
+        with self._lock:
+            pending = self._loading.get(character_id)
+            if pending is not None:
+                pending.append((global_id, owner_id, affection))
+
+            heap = self._heaps.get(character_id)
+            if heap is None:
+                # Cold character: the next read loads it straight from the index
+                return
+            if not self._apply(heap, global_id, owner_id, affection):
+                del self._heaps[character_id]
+
+    def discard(self, character_id, global_id):
+        """Forget a card that was deleted or changed hands."""
+        with self._lock:
+            pending = self._loading.get(character_id)
+            if pending is not None:
+                pending.append((global_id, None, None))
+
+            heap = self._heaps.get(character_id)
+            if heap is not None and any(entry[1] == global_id for entry in heap):
+                # Reload on next read so the next best card can move up
+                del self._heaps[character_id]
+
+    def invalidate(self, character_id=None):
+        """Drop cached heaps for one character, or all of them."""
+        with self._lock:
+            if character_id is None:
+                self._heaps.clear()
+                for loading in self._loading:
+                    self._loading[loading] = None
+            else:
+                self._heaps.pop(character_id, None)
+                if character_id in self._loading:
+                    self._loading[character_id] = None
+
+def get_simp_rank(character_id, affection):
+    """Get the rank a card with the given affection has for a character.
+
+    Counts higher affection cards with a range scan on the character/affection index.
+    """
+    db = get_db()
+    ahead = db.query(func.count(Card.id)).filter(
+        Card.character_id == character_id,
+        Card.affection > affection
+    ).scalar()
+    return ahead + 1
+
+# Shared instance used by utils.db and the cogs
+affection_ranking = AffectionRanking()
@@ -0,0 +1,162 @@
+"""
+Online backups of the SQLite database.
+
+Backups use sqlite3's backup API and copy the whole database in one step,
+inside a single read transaction. The bot runs SQLite in WAL mode (see
+models.base), where that read doesn't block writers, so the bot keeps
+claiming and spawning during a backup and every snapshot is a consistent copy
+of one committed state. (A copy in small steps would be restarted by every
+commit and might never finish under load.) A copy that can't finish within
+BACKUP_TIMEOUT_SECONDS is abandoned. A snapshot is written to a temporary
+file, checked with PRAGMA integrity_check and only then renamed into the
+backup directory.
+"""
+import os
+import time
+import sqlite3
+import datetime
+from models.base import SQLITE_DB_PATH
+
+BACKUP_DIR = os.getenv("SQLITE_BACKUP_DIR", os.path.join(os.path.dirname(SQLITE_DB_PATH), "backups"))
+BACKUP_PREFIX = "taipu_"
+BACKUP_SUFFIX = ".db"
+
+# Longest a copy may take, including waiting for locks, before it is abandoned
+BACKUP_TIMEOUT_SECONDS = float(os.getenv("SQLITE_BACKUP_TIMEOUT_SECONDS", 300))
+# Pause before retrying while the source is locked
+BUSY_SLEEP_SECONDS = 0.05
+
+# Scheduled snapshots
+BACKUP_INTERVAL_HOURS = float(os.getenv("SQLITE_BACKUP_INTERVAL_HOURS", 6))
+BACKUP_RETENTION = int(os.getenv("SQLITE_BACKUP_RETENTION", 14))
+
+def _copy(source_path, target_path, timeout=BACKUP_TIMEOUT_SECONDS, progress=None):
+    """Copy one SQLite database into another with the backup API, in one step.
+
+    Raises TimeoutError if the copy hasn't finished after `timeout` seconds.
+    """
+    deadline = time.monotonic() + timeout
+
+    def step(status, remaining, total):
+        if progress:
+            progress(status, remaining, total)
+        # Called after every attempt, including the ones that found the source locked
+        if status != sqlite3.SQLITE_DONE and time.monotonic() > deadline:
+            raise TimeoutError(f"Copying {source_path} didn't finish within {timeout:g}s")
+
+    # backup_step waits in the source's busy handler, so that wait must fit in the deadline too
+    source = sqlite3.connect(source_path, timeout=min(timeout, 30))
+    target = sqlite3.connect(target_path, timeout=30)
+    try:
+        source.backup(target, pages=-1, sleep=BUSY_SLEEP_SECONDS, progress=step)
+        # The copy inherits the source's WAL flag; keep it a single self-contained file
+        target.execute("PRAGMA journal_mode=DELETE")
+    finally:
+        target.close()
+        source.close()
+
+def verify_backup(path):
+    """Run PRAGMA integrity_check on a database file. Returns (ok, message)."""
+    if not os.path.exists(path):
+        return False, f"{path} does not exist"
+    try:
+        connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            rows = [row[0] for row in connection.execute("PRAGMA integrity_check")]
+        finally:
+            connection.close()
+    except sqlite3.DatabaseError as e:
+        return False, str(e)
+    if rows == ["ok"]:
+        return True, "ok"
+    return False, "; ".join(rows[:10])
+
+def create_backup(source_path=SQLITE_DB_PATH, backup_dir=BACKUP_DIR, timeout=BACKUP_TIMEOUT_SECONDS):
+    """Take an online snapshot of the database. Returns a summary dict.
+
+    Raises FileNotFoundError if the database doesn't exist, TimeoutError if
+    the copy takes longer than `timeout` seconds and RuntimeError if the copy
+    fails its integrity check. The temporary file is removed in every case.
+    """
+    if not os.path.exists(source_path):
+        raise FileNotFoundError(f"SQLite database not found at {source_path}")
+    os.makedirs(backup_dir, exist_ok=True)
+
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    path = os.path.join(backup_dir, f"{BACKUP_PREFIX}{timestamp}{BACKUP_SUFFIX}")
+    suffix = 1
+    while os.path.exists(path):
+        path = os.path.join(backup_dir, f"{BACKUP_PREFIX}{timestamp}_{suffix}{BACKUP_SUFFIX}")
+        suffix += 1
+    temp_path = f"{path}.tmp"
+
+    steps = 0
+    def count_step(status, remaining, total):
+        nonlocal steps
+        steps += 1
+
+    started = time.perf_counter()
+    try:
+        _copy(source_path, temp_path, timeout, progress=count_step)
+        ok, message = verify_backup(temp_path)
+        if not ok:
+            raise RuntimeError(f"Backup failed integrity check: {message}")
+        os.replace(temp_path, path)
+    finally:
+        for leftover in (temp_path, f"{temp_path}-journal"):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+    return {
+        "path": path,
+        "size": os.path.getsize(path),
+        "steps": steps,
+        "seconds": round(time.perf_counter() - started, 3)
+    }
+
+def list_backups(backup_dir=BACKUP_DIR):
+    """List backup files, newest first."""
+    if not os.path.isdir(backup_dir):
+        return []
+    paths = [
+        os.path.join(backup_dir, name) for name in os.listdir(backup_dir)
+        if name.startswith(BACKUP_PREFIX) and name.endswith(BACKUP_SUFFIX)
+    ]
+    return sorted(paths, key=os.path.getmtime, reverse=True)
+
+def prune_backups(keep=BACKUP_RETENTION, backup_dir=BACKUP_DIR):
+    """Delete all but the newest `keep` backups. Returns the deleted paths."""
+    removed = []
+    for path in list_backups(backup_dir)[max(keep, 1):]:
+        try:
+            os.remove(path)
+            removed.append(path)
+        except OSError as e:
+            print(f"Error removing old backup {path}: {e}")
+    return removed
+
+def resolve_backup(name, backup_dir=BACKUP_DIR):
+    """Find a backup by path or by file name inside the backup directory."""
+    if os.path.exists(name):
+        return name
+    path = os.path.join(backup_dir, os.path.basename(name))
+    return path if os.path.exists(path) else None
+
+def restore_backup(path, target_path=SQLITE_DB_PATH, backup_dir=BACKUP_DIR, timeout=BACKUP_TIMEOUT_SECONDS):
+    """Verify a backup and copy it over the database.
+
+    The current database is snapshotted first so a restore can be undone.
+    Stop the bot before restoring; a restore replaces the live data.
+    Returns the summary of the safety snapshot, or None if there was no database.
+    """
+    ok, message = verify_backup(path)
+    if not ok:
+        raise RuntimeError(f"Refusing to restore {path}: {message}")
+
+    safety = create_backup(target_path, backup_dir, timeout) if os.path.exists(target_path) else None
+    _copy(path, target_path, timeout)
+
+    ok, message = verify_backup(target_path)
+    if not ok:
+        raise RuntimeError(f"Restored database failed integrity check: {message}")
+    return safety
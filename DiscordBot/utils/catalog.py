@@ -0,0 +1,545 @@
+"""
+Character catalog sync from assets/characters to the database.
+
+Each asset file is tracked in the catalog_files manifest by size, mtime and
+SHA-256. Files whose stat data is unchanged are skipped without being read,
+files whose content hash is unchanged are only re-stamped, and the remaining
+files are diffed against the database in bulk: series and characters are
+inserted or updated, and CharacterImage rows are inserted, updated and deleted
+with bulk statements, all in one transaction.
+
+The cogs read characters from an immutable CatalogSnapshot (name/ID search
+indexes plus the spawn sampler). character_catalog.reload() re-parses only the
+files whose stat data changed, patches copies of the indexes and swaps the new
+snapshot in with a single assignment, so a command that grabbed the previous
+snapshot keeps a consistent view until it finishes. On a cold start the
+characters come from the precompiled snapshot file (see utils.catalog_snapshot)
+when it matches the asset tree, and from the JSON files otherwise.
+"""
+import os
+import json
+import time
+import random
+import hashlib
+import threading
+from sqlalchemy import insert, delete
+from sqlalchemy.orm import selectinload
+from sqlalchemy.exc import SQLAlchemyError
+
+from models.base import get_db
+from models.series import Series
+from models.character import Character, CharacterImage
+from models.catalog import CatalogFile
+from utils.catalog_snapshot import (
+    SnapshotError, read_snapshot, write_snapshot, stat_series_file, load_series_metadata
+)
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets")
+CHARACTERS_DIR = os.path.join(ASSETS_DIR, "characters")
+SERIES_FILE = os.path.join(ASSETS_DIR, "series.json")
+SNAPSHOT_PATH = os.getenv("CATALOG_SNAPSHOT_PATH", os.path.join(ASSETS_DIR, "catalog.snapshot"))
+
+# Keep IN (...) lists under SQLite's bound parameter limit
+IN_CHUNK_SIZE = 500
+
+CHARACTER_COLUMNS = (
+    Character.id, Character.name, Character.series_id, Character.description,
+    Character.normal_cards, Character.event_cards
+)
+
+def _chunks(items, size=IN_CHUNK_SIZE):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def scan_asset_files(base_dir=CHARACTERS_DIR):
+    """Get {relative_path: (absolute_path, size, mtime_ns)} for every character JSON file."""
+    files = {}
+    for root, dirs, filenames in os.walk(base_dir):
+        for filename in filenames:
+            if filename.endswith(".json"):
+                path = os.path.join(root, filename)
+                stat = os.stat(path)
+                rel_path = os.path.relpath(path, base_dir).replace(os.sep, "/")
+                files[rel_path] = (path, stat.st_size, stat.st_mtime_ns)
+    return files
+
+def parse_characters(raw):
+    """Parse the contents of a character asset file into {name: character_data}.
+
+    Accepts both the {"Name": {...}} layout and a single {"id", "name", ...} object.
+    """
+    data = json.loads(raw)
+    if isinstance(data, dict) and "id" in data and "name" in data:
+        return {data["name"]: data}
+    return dict(data)
+
+def _desired_images(character_data):
+    """Get {(url, is_primary): (affection_required, is_event)} for a character's images."""
+    images = {}
+    primary = (character_data.get("primary_image") or {}).get("url")
+    if primary:
+        images[(primary, True)] = (0, False)
+    for image_data in character_data.get("extra_images", []):
+        url = image_data.get("url")
+        if url:
+            images[(url, False)] = (
+                image_data.get("affection_required", 0),
+                image_data.get("is_event", False)
+            )
+    return images
+
+def apply_characters(db, characters):
+    """Diff parsed characters against the database and apply the changes in bulk.
+
+    Does not commit; the caller owns the transaction.
+    """
+    stats = {
+        "characters_added": 0, "characters_updated": 0,
+        "images_added": 0, "images_updated": 0, "images_removed": 0
+    }
+    if not characters:
+        return stats
+
+    # Series: one lookup, one bulk insert for the missing ones
+    series_names = {data.get("series", "Unknown") for data in characters.values()}
+    series_ids = {}
+    for chunk in _chunks(series_names):
+        series_ids.update(db.query(Series.name, Series.id).filter(Series.name.in_(chunk)))
+    missing_series = series_names - series_ids.keys()
+    if missing_series:
+        db.execute(insert(Series), [{"name": name} for name in missing_series])
+        for chunk in _chunks(missing_series):
+            series_ids.update(db.query(Series.name, Series.id).filter(Series.name.in_(chunk)))
+
+    # Characters: insert new ones, collect field updates for existing ones
+    existing = {}
+    for chunk in _chunks(characters):
+        for row in db.query(*CHARACTER_COLUMNS).filter(Character.name.in_(chunk)):
+            existing[row.name] = row
+
+    new_rows = [
+        {
+            "name": name,
+            "series_id": series_ids[data.get("series", "Unknown")],
+            "description": data.get("description"),
+            "total_cards": 0, "normal_cards": 0, "event_cards": 0, "wishlist_count": 0
+        }
+        for name, data in characters.items() if name not in existing
+    ]
+    new_ids = set()
+    if new_rows:
+        db.execute(insert(Character), new_rows)
+        stats["characters_added"] = len(new_rows)
+        for chunk in _chunks([row["name"] for row in new_rows]):
+            for row in db.query(*CHARACTER_COLUMNS).filter(Character.name.in_(chunk)):
+                existing[row.name] = row
+                new_ids.add(row.id)
+
+    character_updates = {}
+    for name, data in characters.items():
+        row = existing[name]
+        series_id = series_ids[data.get("series", "Unknown")]
+        if row.series_id != series_id or row.description != data.get("description"):
+            character_updates[row.id] = {"id": row.id, "series_id": series_id, "description": data.get("description")}
+
+    # Images: load the current rows for every touched character at once
+    character_ids = [existing[name].id for name in characters]
+    current_images = {}
+    for chunk in _chunks(character_ids):
+        for image in db.query(
+            CharacterImage.id, CharacterImage.character_id, CharacterImage.url, CharacterImage.is_primary,
+            CharacterImage.affection_required, CharacterImage.is_event, CharacterImage.event_id
+        ).filter(CharacterImage.character_id.in_(chunk)):
+            current_images.setdefault(image.character_id, []).append(image)
+
+    image_inserts = []
+    image_updates = []
+    image_deletes = []
+    for name, data in characters.items():
+        character_id = existing[name].id
+        desired = _desired_images(data)
+        normal_cards = 0
+        event_cards = 0
+
+        for image in current_images.get(character_id, []):
+            key = (image.url, bool(image.is_primary))
+            if image.event_id is not None and key not in desired:
+                # Images attached by events are managed outside the asset files
+                if image.is_event:
+                    event_cards += 1
+                else:
+                    normal_cards += 1
+                continue
+            if key not in desired:
+                image_deletes.append(image.id)
+                continue
+            affection_required, is_event = desired.pop(key)
+            if image.affection_required != affection_required or bool(image.is_event) != is_event:
+                image_updates.append({"id": image.id, "affection_required": affection_required, "is_event": is_event})
+            if is_event:
+                event_cards += 1
+            else:
+                normal_cards += 1
+
+        for (url, is_primary), (affection_required, is_event) in desired.items():
+            image_inserts.append({
+                "character_id": character_id,
+                "url": url,
+                "is_primary": is_primary,
+                "affection_required": affection_required,
+                "is_event": is_event
+            })
+            if is_event:
+                event_cards += 1
+            else:
+                normal_cards += 1
+
+        row = existing[name]
+        if row.normal_cards != normal_cards or row.event_cards != event_cards:
+            counts = {"normal_cards": normal_cards, "event_cards": event_cards, "total_cards": normal_cards + event_cards}
+            character_updates.setdefault(character_id, {"id": character_id}).update(counts)
+
+    for chunk in _chunks(image_deletes):
+        db.execute(delete(CharacterImage).where(CharacterImage.id.in_(chunk)))
+    if image_inserts:
+        db.execute(insert(CharacterImage), image_inserts)
+    if image_updates:
+        db.bulk_update_mappings(CharacterImage, image_updates)
+    if character_updates:
+        db.bulk_update_mappings(Character, list(character_updates.values()))
+
+    stats["characters_updated"] = len(character_updates.keys() - new_ids)
+    stats["images_added"] = len(image_inserts)
+    stats["images_updated"] = len(image_updates)
+    stats["images_removed"] = len(image_deletes)
+    return stats
+
+def sync_catalog(base_dir=CHARACTERS_DIR, force=False):
+    """Sync changed asset files to the database and return a summary dict.
+
+    With force=True every file is re-read and diffed regardless of the manifest.
+    """
+    started = time.perf_counter()
+    summary = {"files": 0, "changed": 0, "removed": 0, "characters": 0}
+
+    if not os.path.exists(base_dir):
+        print(f"Characters directory not found at {base_dir}")
+        return summary
+
+    files = scan_asset_files(base_dir)
+    summary["files"] = len(files)
+
+    db = get_db()
+    try:
+        manifest = {entry.path: entry for entry in db.query(CatalogFile)}
+        dirty = False
+
+        changed = {}
+        for rel_path, (path, size, mtime_ns) in files.items():
+            entry = manifest.get(rel_path)
+            if not force and entry and entry.size == size and entry.mtime_ns == mtime_ns:
+                continue
+
+            with open(path, "rb") as f:
+                raw = f.read()
+            digest = hashlib.sha256(raw).hexdigest()
+
+            if not force and entry and entry.sha256 == digest:
+                # Touched but identical: just re-stamp the manifest
+                entry.size = size
+                entry.mtime_ns = mtime_ns
+                dirty = True
+                continue
+
+            changed[rel_path] = (raw, digest, size, mtime_ns)
+
+        for rel_path in manifest.keys() - files.keys():
+            # Characters stay in the database (cards reference them); only forget the file
+            db.delete(manifest[rel_path])
+            summary["removed"] += 1
+            dirty = True
+
+        characters = {}
+        for rel_path, (raw, digest, size, mtime_ns) in list(changed.items()):
+            try:
+                characters.update(parse_characters(raw))
+            except (ValueError, AttributeError, TypeError) as e:
+                print(f"Error reading {rel_path}: {e}")
+                # Leave it out of the manifest so it is retried next sync
+                del changed[rel_path]
+
+        if changed:
+            summary.update(apply_characters(db, characters))
+            for rel_path, (raw, digest, size, mtime_ns) in changed.items():
+                entry = manifest.get(rel_path)
+                if entry:
+                    entry.sha256 = digest
+                    entry.size = size
+                    entry.mtime_ns = mtime_ns
+                else:
+                    db.add(CatalogFile(path=rel_path, sha256=digest, size=size, mtime_ns=mtime_ns))
+            dirty = True
+
+        if dirty:
+            db.commit()
+
+        summary["changed"] = len(changed)
+        summary["characters"] = len(characters)
+    except SQLAlchemyError as e:
+        print(f"Error syncing character catalog: {e}")
+        db.rollback()
+
+    summary["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return summary
+
+def _search_key(name):
+    return name.strip().lower()
+
+class CatalogSnapshot:
+    """Immutable view of the character catalog; replaced as a whole on reload."""
+    __slots__ = ("characters", "character_ids", "files", "series", "by_key", "by_id", "spawn_pool", "version")
+
+    def __init__(self, characters, character_ids, files, by_key, by_id, version=1, series=None):
+        self.characters = characters  # Name -> character data (treat as read-only)
+        self.character_ids = character_ids  # Name -> database character ID
+        self.files = files  # Relative path -> (size, mtime_ns, names)
+        self.series = series or {}  # Series name -> metadata from series.json
+        self.by_key = by_key  # Lowercase name -> character data
+        self.by_id = by_id  # Asset "id" -> character data
+        self.spawn_pool = tuple(characters)  # Sampler for random spawns
+        self.version = version
+
+    @classmethod
+    def build(cls, characters, character_ids, files, version=1, series=None):
+        """Build a snapshot and its indexes from scratch."""
+        by_key = {}
+        by_id = {}
+        for name, data in characters.items():
+            by_key[_search_key(name)] = data
+            if data.get("id") is not None:
+                by_id.setdefault(data["id"], data)
+        return cls(characters, character_ids, files, by_key, by_id, version, series)
+
+    def patched(self, files, removed_names, added, character_ids, series=None):
+        """Copy this snapshot with some characters removed and others added or replaced."""
+        characters = dict(self.characters)
+        by_key = dict(self.by_key)
+        by_id = dict(self.by_id)
+
+        for name in removed_names:
+            data = characters.pop(name, None)
+            if data is None:
+                continue
+            by_key.pop(_search_key(name), None)
+            if by_id.get(data.get("id")) is data:
+                del by_id[data["id"]]
+
+        for name, data in added.items():
+            characters[name] = data
+            by_key[_search_key(name)] = data
+            if data.get("id") is not None:
+                by_id[data["id"]] = data
+
+        return CatalogSnapshot(
+            characters, character_ids, files, by_key, by_id, self.version + 1,
+            self.series if series is None else series
+        )
+
+    def get(self, name):
+        """Get a character by exact or case-insensitive name."""
+        return self.characters.get(name) or self.by_key.get(_search_key(name))
+
+    def find(self, identifier):
+        """Find a character by asset ID (all digits) or case-insensitive name."""
+        key = _search_key(identifier)
+        if key.isdigit():
+            return self.by_id.get(int(key))
+        return self.by_key.get(key)
+
+    def random_name(self):
+        """Pick a random character name to spawn."""
+        return random.choice(self.spawn_pool) if self.spawn_pool else None
+
+    def __len__(self):
+        return len(self.characters)
+
+def _read_files(paths):
+    """Parse asset files into ({rel_path: names}, {name: data}), skipping unreadable ones."""
+    names = {}
+    characters = {}
+    for rel_path, path in paths.items():
+        try:
+            with open(path, "rb") as f:
+                parsed = parse_characters(f.read())
+        except (OSError, ValueError, AttributeError, TypeError) as e:
+            print(f"Error reading {rel_path}: {e}")
+            continue
+        names[rel_path] = tuple(parsed)
+        characters.update(parsed)
+    return names, characters
+
+def _database_characters(asset_names):
+    """Get ({name: id} for every character, {name: data} for characters not backed by an asset file)."""
+    db = get_db()
+    character_ids = dict(db.query(Character.name, Character.id))
+
+    extras = {}
+    extra_names = [name for name in character_ids if name not in asset_names]
+    for chunk in _chunks(extra_names):
+        query = db.query(Character).options(
+            selectinload(Character.images), selectinload(Character.series)
+        ).filter(Character.name.in_(chunk))
+        for character in query:
+            primary = character.primary_image
+            extras[character.name] = {
+                "name": character.name,
+                "series": character.series.name if character.series else "Unknown",
+                "primary_image": {"url": primary.url if primary else "https://via.placeholder.com/800"},
+                "extra_images": [
+                    {"url": image.url, "affection_required": image.affection_required, "is_event": image.is_event}
+                    for image in character.images if not image.is_primary
+                ]
+            }
+    return character_ids, extras
+
+# Served by CharacterCatalog.current before the first load
+EMPTY_SNAPSHOT = CatalogSnapshot.build({}, {}, {}, version=0)
+
+class CharacterCatalog:
+    """Holds the current CatalogSnapshot and rebuilds it when asset files change."""
+
+    def __init__(self, base_dir=CHARACTERS_DIR, series_path=SERIES_FILE, snapshot_path=SNAPSHOT_PATH):
+        self.base_dir = base_dir
+        self.series_path = series_path
+        self.snapshot_path = snapshot_path
+        self._snapshot = None
+        self._series_stat = None
+        self._reload_lock = threading.Lock()
+
+    @property
+    def current(self):
+        """The current snapshot; grab it once per command for a consistent view.
+
+        Until the first load() finishes (main.py runs it in an executor) this is
+        an empty snapshot, so a command that races startup finds no characters
+        instead of blocking the event loop on a full sync.
+        """
+        return self._snapshot if self._snapshot is not None else EMPTY_SNAPSHOT
+
+    @property
+    def loaded(self):
+        return self._snapshot is not None
+
+    def _read_catalog(self, files):
+        """Get (file_names, characters, series) from the snapshot file, or the JSON tree if it is stale."""
+        series_stat = stat_series_file(self.series_path)
+        try:
+            snapshot = read_snapshot(self.snapshot_path)
+            if snapshot.is_fresh(files, series_stat):
+                file_names = {rel_path: entry[2] for rel_path, entry in snapshot.files.items()}
+                return file_names, snapshot.characters, snapshot.series
+            print("Catalog snapshot is stale, loading characters from JSON files...")
+        except SnapshotError as e:
+            print(f"Catalog snapshot not used ({e}), loading characters from JSON files...")
+
+        file_names, characters = _read_files({rel_path: stat[0] for rel_path, stat in files.items()})
+        series = load_series_metadata(self.series_path)
+        try:
+            # Refresh the snapshot so the next cold start can skip the JSON tree
+            write_snapshot(self.snapshot_path, files, file_names, characters, series, series_stat)
+        except (OSError, SnapshotError) as e:
+            print(f"Could not write catalog snapshot: {e}")
+        return file_names, characters, series
+
+    def load(self):
+        """Sync the database and build a full snapshot. Returns the sync summary."""
+        with self._reload_lock:
+            summary = sync_catalog(self.base_dir)
+            files = scan_asset_files(self.base_dir) if os.path.exists(self.base_dir) else {}
+            names, characters, series = self._read_catalog(files)
+            character_ids, extras = _database_characters(characters.keys())
+
+            file_index = {
+                rel_path: (size, mtime_ns, names.get(rel_path, ()))
+                for rel_path, (path, size, mtime_ns) in files.items()
+            }
+            version = self._snapshot.version + 1 if self._snapshot else 1
+            self._snapshot = CatalogSnapshot.build(
+                {**extras, **characters}, character_ids, file_index, version, series
+            )
+            self._series_stat = stat_series_file(self.series_path)
+            return summary
+
+    def reload(self):
+        """Apply changed, added and removed asset files.
+
+        Returns a summary dict, or None when nothing changed on disk.
+        """
+        if self._snapshot is None:
+            return self.load()
+
+        with self._reload_lock:
+            old = self._snapshot
+            files = scan_asset_files(self.base_dir) if os.path.exists(self.base_dir) else {}
+
+            changed = {
+                rel_path: path
+                for rel_path, (path, size, mtime_ns) in files.items()
+                if old.files.get(rel_path, (None, None))[:2] != (size, mtime_ns)
+            }
+            removed = old.files.keys() - files.keys()
+            series_stat = stat_series_file(self.series_path)
+            series = load_series_metadata(self.series_path) if series_stat != self._series_stat else None
+            self._series_stat = series_stat
+            if not changed and not removed and series is None:
+                return None
+
+            # Bring the database up to date first (it skips files whose hash is unchanged)
+            summary = sync_catalog(self.base_dir)
+
+            names, added = _read_files(changed)
+            removed_names = set()
+            for rel_path in removed | changed.keys():
+                removed_names.update(old.files.get(rel_path, (None, None, ()))[2])
+
+            file_index = dict(old.files)
+            for rel_path in removed:
+                del file_index[rel_path]
+            for rel_path, (path, size, mtime_ns) in files.items():
+                if rel_path in changed:
+                    file_index[rel_path] = (size, mtime_ns, names.get(rel_path, ()))
+
+            character_ids = dict(old.character_ids)
+            new_names = [name for name in added if name not in character_ids]
+            if new_names:
+                db = get_db()
+                for chunk in _chunks(new_names):
+                    character_ids.update(db.query(Character.name, Character.id).filter(Character.name.in_(chunk)))
+
+            # Single reference swap: readers see either the old or the new snapshot
+            self._snapshot = old.patched(file_index, removed_names, added, character_ids, series)
+
+            summary["reloaded_files"] = len(changed)
+            summary["removed_files"] = len(removed)
+            summary["version"] = self._snapshot.version
+            return summary
+
+def build_snapshot(base_dir=CHARACTERS_DIR, series_path=SERIES_FILE, snapshot_path=SNAPSHOT_PATH):
+    """Compile the asset tree and series.json into a snapshot file. Returns a summary dict."""
+    started = time.perf_counter()
+    files = scan_asset_files(base_dir) if os.path.exists(base_dir) else {}
+    file_names, characters = _read_files({rel_path: stat[0] for rel_path, stat in files.items()})
+    series = load_series_metadata(series_path)
+    size = write_snapshot(snapshot_path, files, file_names, characters, series, stat_series_file(series_path))
+    return {
+        "path": snapshot_path,
+        "files": len(files),
+        "characters": len(characters),
+        "series": len(series),
+        "bytes": size,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)
+    }
+
+# Shared instance used by main.py and the cogs
+character_catalog = CharacterCatalog()
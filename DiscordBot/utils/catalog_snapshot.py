@@ -0,0 +1,345 @@
+"""
+Precompiled binary snapshot of the character catalog.
+
+build_catalog.py compiles assets/characters and assets/series.json into a
+single file so a cold start reads one file instead of parsing every JSON
+asset. The layout is little-endian and array-backed:
+
+    header      magic, format version, record counts, series.json stat
+    strings     uint32 offsets + one UTF-8 blob (every name, URL and path once)
+    files       (path, size, mtime_ns, first character, character count)
+    characters  (name, series, asset id, primary URL, first image, image count, extra JSON)
+    images      (url, affection_required, flags)
+    series      (name, metadata JSON)
+
+All references are indexes into the string table. The file stat table lets
+the loader detect a stale snapshot with os.stat alone. Values that don't fit a
+column (a non-integer asset id, unknown image keys, ...) are kept in the
+character's extra JSON, and write_snapshot refuses to install a file that
+doesn't read back to exactly the catalog it was given.
+"""
+import os
+import json
+import struct
+from array import array
+
+MAGIC = b"TPCS"
+FORMAT_VERSION = 2
+
+HEADER = struct.Struct("<4sHHIIIIIqq")
+FILE_RECORD = struct.Struct("<IqqII")
+CHARACTER_RECORD = struct.Struct("<IIqIIII")
+IMAGE_RECORD = struct.Struct("<IiB")
+SERIES_RECORD = struct.Struct("<II")
+
+NO_STRING = 0xFFFFFFFF
+NO_ASSET_ID = -(2 ** 63)
+
+# Image flags
+IMAGE_IS_EVENT = 1
+IMAGE_HAS_AFFECTION = 2
+IMAGE_HAS_EVENT_FLAG = 4
+
+# Character keys stored in their own columns; anything else goes to the extra JSON
+CHARACTER_COLUMNS = ("id", "name", "series", "primary_image", "extra_images")
+IMAGE_COLUMNS = ("url", "affection_required", "is_event")
+
+INT32_RANGE = (-(2 ** 31), 2 ** 31 - 1)
+INT64_RANGE = (-(2 ** 63) + 1, 2 ** 63 - 1)  # -2^63 is NO_ASSET_ID
+
+# Errors a damaged file can raise while it is decoded
+DECODE_ERRORS = (ValueError, IndexError, KeyError, TypeError, struct.error, UnicodeDecodeError)
+
+class SnapshotError(Exception):
+    """Raised when a snapshot file is missing, truncated or from another format version."""
+    pass
+
+class CatalogSnapshotFile:
+    """Decoded contents of a snapshot file."""
+
+    def __init__(self, files, characters, series, series_stat):
+        self.files = files  # Relative path -> (size, mtime_ns, names)
+        self.characters = characters  # Name -> character data
+        self.series = series  # Series name -> metadata from series.json
+        self.series_stat = series_stat  # (size, mtime_ns) of series.json, or (-1, -1)
+
+    def is_fresh(self, files, series_stat):
+        """Check the snapshot against a scan_asset_files() result and the series.json stat."""
+        if series_stat != self.series_stat or files.keys() != self.files.keys():
+            return False
+        return all(
+            self.files[rel_path][:2] == (size, mtime_ns)
+            for rel_path, (path, size, mtime_ns) in files.items()
+        )
+
+class _StringTable:
+    def __init__(self):
+        self.index = {}
+        self.strings = []
+
+    def add(self, value):
+        if value is None:
+            return NO_STRING
+        value = str(value)
+        position = self.index.get(value)
+        if position is None:
+            position = self.index[value] = len(self.strings)
+            self.strings.append(value)
+        return position
+
+def stat_series_file(path):
+    """Get (size, mtime_ns) for series.json, or (-1, -1) if it doesn't exist."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return (-1, -1)
+    return (stat.st_size, stat.st_mtime_ns)
+
+def load_series_metadata(path):
+    """Read assets/series.json as {series name: metadata}; an empty or missing file is {}."""
+    try:
+        with open(path, "rb") as f:
+            raw = f.read()
+    except OSError:
+        return {}
+    if not raw.strip():
+        return {}
+    try:
+        data = json.loads(raw)
+    except ValueError as e:
+        print(f"Error reading {path}: {e}")
+        return {}
+    if isinstance(data, list):
+        return {item["name"]: item for item in data if isinstance(item, dict) and "name" in item}
+    return {name: value for name, value in data.items() if isinstance(value, dict)}
+
+def _is_int(value, bounds):
+    return type(value) is int and bounds[0] <= value <= bounds[1]
+
+def _fits_primary_image(image):
+    return isinstance(image, dict) and image.keys() == {"url"} and isinstance(image["url"], str)
+
+def _fits_image(image):
+    """Whether an extra_images item is stored exactly by an image record."""
+    return (
+        isinstance(image, dict)
+        and image.keys() <= set(IMAGE_COLUMNS)
+        and isinstance(image.get("url"), str)
+        and ("affection_required" not in image or _is_int(image["affection_required"], INT32_RANGE))
+        and ("is_event" not in image or type(image["is_event"]) is bool)
+    )
+
+def _split_character(name, data):
+    """Get (id, series, primary URL, images, extra) with everything the columns can't hold in extra."""
+    extra = {key: value for key, value in data.items() if key not in CHARACTER_COLUMNS}
+    if data.get("name") != name or "name" not in data:
+        # The display name can differ from the key it is filed under
+        extra["name"] = data.get("name")
+
+    asset_id = data.get("id")
+    if "id" in data and not _is_int(asset_id, INT64_RANGE):
+        extra["id"] = asset_id
+        asset_id = None
+
+    series = data.get("series")
+    if "series" in data and not isinstance(series, str):
+        extra["series"] = series
+        series = None
+
+    primary_url = None
+    if "primary_image" in data:
+        if _fits_primary_image(data["primary_image"]):
+            primary_url = data["primary_image"]["url"]
+        else:
+            extra["primary_image"] = data["primary_image"]
+
+    images = []
+    if "extra_images" in data:
+        value = data["extra_images"]
+        if isinstance(value, list) and value and all(_fits_image(image) for image in value):
+            images = value
+        else:
+            extra["extra_images"] = value
+
+    return asset_id, series, primary_url, images, extra
+
+def write_snapshot(path, files, file_names, characters, series, series_stat):
+    """Compile a catalog into a snapshot file.
+
+    files is a scan_asset_files() result, file_names maps each relative path to
+    the character names it defines and characters maps names to their data.
+    The file is written to a temporary path and renamed into place.
+    """
+    strings = _StringTable()
+    file_records = bytearray()
+    character_records = bytearray()
+    image_records = bytearray()
+    character_count = 0
+    image_count = 0
+
+    for rel_path in sorted(files):
+        size, mtime_ns = files[rel_path][1:]
+        names = [name for name in file_names.get(rel_path, ()) if name in characters]
+        file_records += FILE_RECORD.pack(strings.add(rel_path), size, mtime_ns, character_count, len(names))
+
+        for name in names:
+            asset_id, series_name, primary_url, images, extra = _split_character(name, characters[name])
+
+            character_records += CHARACTER_RECORD.pack(
+                strings.add(name),
+                strings.add(series_name),
+                asset_id if asset_id is not None else NO_ASSET_ID,
+                strings.add(primary_url),
+                image_count,
+                len(images),
+                strings.add(json.dumps(extra, separators=(",", ":"))) if extra else NO_STRING
+            )
+            character_count += 1
+
+            for image in images:
+                flags = 0
+                if image.get("is_event"):
+                    flags |= IMAGE_IS_EVENT
+                if "affection_required" in image:
+                    flags |= IMAGE_HAS_AFFECTION
+                if "is_event" in image:
+                    flags |= IMAGE_HAS_EVENT_FLAG
+                image_records += IMAGE_RECORD.pack(
+                    strings.add(image.get("url")), int(image.get("affection_required") or 0), flags
+                )
+                image_count += 1
+
+    series_records = bytearray()
+    for name, metadata in sorted(series.items()):
+        series_records += SERIES_RECORD.pack(strings.add(name), strings.add(json.dumps(metadata, separators=(",", ":"))))
+
+    encoded = [value.encode("utf-8") for value in strings.strings]
+    offsets = array("I", [0])
+    for value in encoded:
+        offsets.append(offsets[-1] + len(value))
+    if offsets.itemsize != 4:
+        raise SnapshotError("array('I') is not 32-bit on this platform")
+
+    header = HEADER.pack(
+        MAGIC, FORMAT_VERSION, 0,
+        len(encoded), len(files), character_count, image_count, len(series),
+        series_stat[0], series_stat[1]
+    )
+
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(header)
+        f.write(offsets.tobytes())
+        f.write(b"".join(encoded))
+        f.write(file_records)
+        f.write(character_records)
+        f.write(image_records)
+        f.write(series_records)
+
+    # Only install a file that serves exactly what the JSON tree would
+    expected = {name: characters[name] for rel_path in files for name in file_names.get(rel_path, ()) if name in characters}
+    try:
+        written = read_snapshot(temp_path)
+        if written.characters != expected or written.series != series:
+            different = next(
+                (name for name in expected if written.characters.get(name) != expected[name]), "series metadata"
+            )
+            raise SnapshotError(f"Snapshot doesn't round-trip ({different})")
+    except SnapshotError:
+        os.remove(temp_path)
+        raise
+    os.replace(temp_path, path)
+    return os.path.getsize(path)
+
+def read_snapshot(path):
+    """Load a snapshot file with a single read. Raises SnapshotError if it can't be used."""
+    try:
+        with open(path, "rb") as f:
+            buffer = memoryview(f.read())
+    except OSError as e:
+        raise SnapshotError(f"Snapshot not readable: {e}")
+
+    try:
+        return _decode(buffer)
+    except DECODE_ERRORS as e:
+        raise SnapshotError(f"Snapshot is corrupt: {type(e).__name__}: {e}")
+
+def _decode(buffer):
+    if len(buffer) < HEADER.size:
+        raise SnapshotError("Snapshot is truncated")
+    (
+        magic, version, _, string_count, file_count, character_count, image_count, series_count,
+        series_size, series_mtime
+    ) = HEADER.unpack_from(buffer)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise SnapshotError(f"Unsupported snapshot format {magic!r} v{version}")
+
+    position = HEADER.size
+    offsets = array("I")
+    offsets_size = (string_count + 1) * offsets.itemsize
+    if position + offsets_size > len(buffer):
+        raise SnapshotError("Snapshot is truncated (string offsets)")
+    offsets.frombytes(buffer[position:position + offsets_size])
+    position += offsets_size
+
+    if offsets[0] != 0 or any(offsets[i] > offsets[i + 1] for i in range(string_count)):
+        raise SnapshotError("Snapshot string offsets are out of order")
+    if position + offsets[-1] > len(buffer):
+        raise SnapshotError("Snapshot is truncated (string table)")
+    blob = bytes(buffer[position:position + offsets[-1]])
+    position += offsets[-1]
+    strings = [blob[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(string_count)]
+
+    def records(record, count):
+        nonlocal position
+        size = record.size * count
+        if position + size > len(buffer):
+            raise SnapshotError("Snapshot is truncated")
+        chunk = buffer[position:position + size]
+        position += size
+        return list(record.iter_unpack(chunk)) if count else []
+
+    file_rows = records(FILE_RECORD, file_count)
+    character_rows = records(CHARACTER_RECORD, character_count)
+    image_rows = records(IMAGE_RECORD, image_count)
+    series_rows = records(SERIES_RECORD, series_count)
+
+    characters = {}
+    names_by_index = []
+    for name_ref, series_ref, asset_id, primary_ref, first_image, images, extra_ref in character_rows:
+        name = strings[name_ref]
+        if first_image + images > len(image_rows):
+            raise SnapshotError(f"Snapshot image range of {name} is out of bounds")
+        data = {}
+        if asset_id != NO_ASSET_ID:
+            data["id"] = asset_id
+        data["name"] = name
+        if series_ref != NO_STRING:
+            data["series"] = strings[series_ref]
+        if primary_ref != NO_STRING:
+            data["primary_image"] = {"url": strings[primary_ref]}
+
+        extra_images = []
+        for url_ref, affection_required, flags in image_rows[first_image:first_image + images]:
+            image = {"url": strings[url_ref] if url_ref != NO_STRING else None}
+            if flags & IMAGE_HAS_AFFECTION:
+                image["affection_required"] = affection_required
+            if flags & IMAGE_HAS_EVENT_FLAG:
+                image["is_event"] = bool(flags & IMAGE_IS_EVENT)
+            extra_images.append(image)
+        if images:
+            data["extra_images"] = extra_images
+
+        if extra_ref != NO_STRING:
+            data.update(json.loads(strings[extra_ref]))
+        characters[name] = data
+        names_by_index.append(name)
+
+    files = {}
+    for path_ref, size, mtime_ns, first, count in file_rows:
+        if first + count > len(names_by_index):
+            raise SnapshotError(f"Snapshot character range of {strings[path_ref]} is out of bounds")
+        files[strings[path_ref]] = (size, mtime_ns, tuple(names_by_index[first:first + count]))
+    series = {strings[name_ref]: json.loads(strings[meta_ref]) for name_ref, meta_ref in series_rows}
+
+    return CatalogSnapshotFile(files, characters, series, (series_size, series_mtime))
@@ -2,18 +2,24 @@ import json
 import os
 import datetime
 from sqlalchemy.orm import Session
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, func, case
 from sqlalchemy.exc import SQLAlchemyError
-import random
-import string
 
 from models.base import Base, engine, init_db, get_db
-from models.user import User, Badge
+from models.user import User, Badge, user_wishlists
 from models.server import Server
 from models.character import Character, CharacterImage
 from models.card import Card
 from models.series import Series
 from models.event import Event
+from utils.leaderboard import record_claim, refresh_user_scores
+from utils.affection_rank import affection_ranking
+from utils.affection_buffer import affection_buffer
+from utils.wishlist_index import wishlist_index
+from utils.guild_config import guild_config_cache
+from utils.permissions import permission_cache
+from utils.migration import migrate_users_json
+from utils.global_ids import global_ids
 
 # Path to the old JSON database
 import os.path
@@ -31,87 +37,18 @@ def initialize_database():
         return False
 
 def migrate_json_to_db():
-    """Migrate data from JSON to the database."""
-    if not os.path.exists(OLD_DB_PATH):
-        print(f"JSON database not found at {OLD_DB_PATH}")
+    """Migrate data from JSON to the database (streamed, batched and resumable)."""
+    summary = migrate_users_json(OLD_DB_PATH)
+    if summary is None:
         return False
-        
-    try:
-        # Load JSON data
-        with open(OLD_DB_PATH, "r") as f:
-            data = json.load(f)
-            
-        db = get_db()
-        
-        # Migrate users and their cards
-        for user_id, user_data in data.items():
-            # Create user if not exists
-            user = db.query(User).filter(User.id == user_id).first()
-            if not user:
-                user = User(
-                    id=user_id,
-                    username=user_data.get("username", f"User_{user_id}"),
-                    join_date=datetime.datetime.utcnow(),
-                    total_claims=len(user_data.get("cards", [])),
-                    total_cards=len(user_data.get("cards", [])),
-                    profile_color=user_data.get("profile_color", "#3498db"),
-                    leaderboard_rank=user_data.get("leaderboard_rank", None)
-                )
-                db.add(user)
-                
-            # Migrate cards
-            for card_data in user_data.get("cards", []):
-                # Find or create character
-                character_name = card_data.get("name", "Unknown")
-                character = db.query(Character).filter(Character.name == character_name).first()
-                
-                if not character:
-                    # Find or create series
-                    series_name = card_data.get("series", "Unknown")
-                    series = db.query(Series).filter(Series.name == series_name).first()
-                    
-                    if not series:
-                        series = Series(name=series_name)
-                        db.add(series)
-                        db.flush()  # Get series ID
-                        
-                    character = Character(
-                        name=character_name,
-                        series_id=series.id
-                    )
-                    db.add(character)
-                    db.flush()  # Get character ID
-                    
-                    # Add character image
-                    artwork = card_data.get("claimed_artwork", "https://via.placeholder.com/800")
-                    character.add_image(url=artwork, is_primary=True)
-                
-                # Create card
-                card = Card(
-                    global_id=card_data.get("global_id", generate_global_id()),
-                    character_id=character.id,
-                    owner_id=user_id,
-                    rarity=card_data.get("rarity", "N"),
-                    claimed_artwork=card_data.get("claimed_artwork", "https://via.placeholder.com/800"),
-                    claim_method=card_data.get("claim_method", "spawn"),
-                    order=card_data.get("order", 0),
-                    affection=card_data.get("affection", 0),
-                    is_favorite=card_data.get("favorite", False),
-                    claimed_at=datetime.datetime.utcnow()
-                )
-                db.add(card)
-                
-        db.commit()
-        print("Data migration completed successfully.")
-        return True
-    except Exception as e:
-        print(f"Error migrating data: {e}")
-        db.rollback()
-        return False
-
-def generate_global_id():
-    """Generate a unique global ID for a card."""
-    return ''.join(random.choices(string.ascii_lowercase + string.digits, k=7))
+    if summary["skipped"]:
+        print("JSON data was already migrated.")
+    else:
+        print(
+            f"Migrated {summary['users']} users ({summary['rows']} rows) in {summary['batches']} batches, "
+            f"{summary['rows_per_sec']} rows/sec."
+        )
+    return True
 
 # User functions
 
@@ -143,7 +80,7 @@ def get_user(user_id):
     # If we get here, either the JSON file doesn't exist, the user isn't in it,
     # or there was an error loading it. Try the database.
     db = get_db()
-    user = db.query(User).filter(User.id == str(user_id)).first()
+    user = db.query(User).filter(User.id == int(user_id)).first()
     
     if not user:
         # For backward compatibility, return empty dict
@@ -159,7 +96,9 @@ def get_user(user_id):
         "cards": [],
         "profile_color": user.profile_color,
         "leaderboard_rank": user.leaderboard_rank,
-        "badges": [badge.name for badge in user.badges]
+        "gacha_tickets": user.gacha_tickets,
+        "badges": [badge.name for badge in user.badges],
+        "wishlist": [character.name for character in user.wishlist]
     }
     
     # Add cards
@@ -171,9 +110,11 @@ def get_user(user_id):
             "character_id": character.id,
             "name": character.name,
             "series": character.series.name if character.series else "Unknown",
-            "affection": card.affection,
+            # Includes increments still waiting in the write-behind buffer
+            "affection": affection_buffer.current(card.global_id, card.affection),
             "claimed_artwork": card.claimed_artwork,
             "rarity": card.rarity,
+            "rarity_rank": card.rarity_rank,
             "claimed_by": f"<@{user.id}>",
             "favorite": card.is_favorite,
             "wishlist": card.is_wishlist,
@@ -194,19 +135,31 @@ def get_user(user_id):
 
 def update_user(user_id, key, value):
     """Update a user in the database."""
+    # Affection heap updates, applied once the commit has succeeded
+    observed = []
+    discarded = []
+    if key == "cards":
+        # Reserve IDs for cards without one before the session takes the write lock
+        new_ids = iter(global_ids.take(sum(1 for card_data in value if not card_data.get("global_id"))))
+        # The new values already include buffered affection, so don't add it again on the next flush
+        affection_buffer.discard(user_id, (card_data.get("global_id") for card_data in value))
     db = get_db()
-    user = db.query(User).filter(User.id == str(user_id)).first()
+    user = db.query(User).filter(User.id == int(user_id)).first()
     
     if not user:
         # Create new user
-        user = User(id=str(user_id))
+        user = User(id=int(user_id))
         db.add(user)
         
     # Handle special keys
     if key == "cards":
+        # Remember the old cards so the affection ranking can drop any that left
+        previous_cards = db.query(Card.global_id, Card.character_id).filter(Card.owner_id == int(user_id)).all()
+        
         # Clear existing cards and add new ones
-        db.query(Card).filter(Card.owner_id == str(user_id)).delete()
+        db.query(Card).filter(Card.owner_id == int(user_id)).delete()
         
+        kept_ids = set()
         for card_data in value:
             # Find or create character
             character_name = card_data.get("name", "Unknown")
@@ -235,9 +188,9 @@ def update_user(user_id, key, value):
             
             # Create card
             card = Card(
-                global_id=card_data.get("global_id", generate_global_id()),
+                global_id=card_data.get("global_id") or next(new_ids),
                 character_id=character.id,
-                owner_id=str(user_id),
+                owner_id=int(user_id),
                 rarity=card_data.get("rarity", "N"),
                 claimed_artwork=card_data.get("claimed_artwork", "https://via.placeholder.com/800"),
                 claim_method=card_data.get("claim_method", "spawn"),
@@ -247,9 +200,20 @@ def update_user(user_id, key, value):
                 claimed_at=datetime.datetime.utcnow()
             )
             db.add(card)
+            kept_ids.add(card.global_id)
+            
+            # Keep the per-character affection heaps warm
+            observed.append((character.id, card.global_id, int(user_id), card.affection))
+            
+        for global_id, character_id in previous_cards:
+            if global_id not in kept_ids:
+                discarded.append((character_id, global_id))
             
         user.total_cards = len(value)
         user.total_claims = len(value)
+        
+        # Collection was rewritten wholesale, so re-aggregate this user's scores
+        refresh_user_scores(db, user_id)
     elif key == "favourite_card":
         # Find the card and set it as favorite
         global_id = value.get("global_id")
@@ -276,8 +240,29 @@ def update_user(user_id, key, value):
                 badge = Badge(name=badge_name)
                 db.add(badge)
             user.badges.append(badge)
+    elif key == "wishlist":
+        # Legacy callers pass the full list of character names
+        wanted = set()
+        for character_name in value:
+            character = db.query(Character).filter(func.lower(Character.name) == character_name.strip().lower()).first()
+            if character:
+                wanted.add(character.id)
+                
+        current = {
+            row.character_id
+            for row in db.query(user_wishlists.c.character_id).filter(user_wishlists.c.user_id == int(user_id))
+        }
+        
+        for character_id in wanted - current:
+            _add_wishlist_entry(db, user_id, character_id)
+        for character_id in current - wanted:
+            _remove_wishlist_entry(db, user_id, character_id)
     
     db.commit()
+    for character_id, global_id, owner_id, affection in observed:
+        affection_ranking.observe(character_id, global_id, owner_id, affection)
+    for character_id, global_id in discarded:
+        affection_ranking.discard(character_id, global_id)
     return True
 
 # Server functions
@@ -285,7 +270,7 @@ def update_user(user_id, key, value):
 def get_server(server_id):
     """Get a server from the database."""
     db = get_db()
-    server = db.query(Server).filter(Server.id == str(server_id)).first()
+    server = db.query(Server).filter(Server.id == int(server_id)).first()
     
     if not server:
         return None
@@ -295,11 +280,11 @@ def get_server(server_id):
 def update_server(server_id, name, key, value):
     """Update a server in the database."""
     db = get_db()
-    server = db.query(Server).filter(Server.id == str(server_id)).first()
+    server = db.query(Server).filter(Server.id == int(server_id)).first()
     
     if not server:
         # Create new server
-        server = Server(id=str(server_id), name=name)
+        server = Server(id=int(server_id), name=name)
         db.add(server)
         
     # Handle special keys
@@ -313,9 +298,9 @@ def update_server(server_id, name, key, value):
         # Clear existing admins and add new ones
         server.admins = []
         for admin_id in value:
-            user = db.query(User).filter(User.id == str(admin_id)).first()
+            user = db.query(User).filter(User.id == int(admin_id)).first()
             if not user:
-                user = User(id=str(admin_id))
+                user = User(id=int(admin_id))
                 db.add(user)
             server.admins.append(user)
     elif key == "command_permissions":
@@ -324,6 +309,58 @@ def update_server(server_id, name, key, value):
         server.settings = value
         
     db.commit()
+    
+    # Write through to the in-memory caches
+    guild_config_cache.store(server)
+    if key == "command_permissions":
+        permission_cache.update(server_id, value)
+    return True
+
+def register_server(server_id, name, admin_id=None, admin_name=None):
+    """Register a server with an optional first admin. Returns False if it already exists."""
+    if guild_config_cache.is_registered(server_id):
+        return False
+        
+    db = get_db()
+    server = db.query(Server).filter(Server.id == int(server_id)).first()
+    if server:
+        guild_config_cache.store(server)
+        return False
+        
+    server = Server(
+        id=int(server_id),
+        name=name,
+        registration_time=datetime.datetime.utcnow()
+    )
+    db.add(server)
+    
+    if admin_id is not None:
+        user = db.query(User).filter(User.id == int(admin_id)).first()
+        if not user:
+            user = User(
+                id=int(admin_id),
+                username=admin_name,
+                join_date=datetime.datetime.utcnow()
+            )
+            db.add(user)
+        server.add_admin(user)
+        
+    db.commit()
+    guild_config_cache.store(server)
+    return True
+
+def set_command_permission(server_id, command_name, permission_type, id_list, allow=True):
+    """Set a command permission for a registered server and refresh the caches."""
+    db = get_db()
+    server = db.query(Server).filter(Server.id == int(server_id)).first()
+    if not server:
+        return False
+        
+    server.set_command_permission(command_name, permission_type, id_list, allow=allow)
+    db.commit()
+    
+    guild_config_cache.store(server)
+    permission_cache.update(server_id, server.command_permissions)
     return True
 
 # Character functions
@@ -406,6 +443,127 @@ def add_character(name, series_name, primary_image_url, description=None):
     db.commit()
     return character
 
+def get_character_owner_stats(character_id, limit=10):
+    """Get (owner_count, top_owners) for a character, where top_owners is [(user_id, copies)]."""
+    db = get_db()
+    
+    owner_count = db.query(func.count(func.distinct(Card.owner_id))).filter(
+        Card.character_id == character_id
+    ).scalar()
+    
+    copies = func.count(Card.id)
+    top_owners = db.query(Card.owner_id, copies).filter(
+        Card.character_id == character_id,
+        Card.owner_id.isnot(None)
+    ).group_by(Card.owner_id).order_by(copies.desc()).limit(limit).all()
+    
+    return owner_count, [(owner_id, count) for owner_id, count in top_owners]
+
+def find_character(name):
+    """Find a character by name, ignoring case and surrounding whitespace."""
+    db = get_db()
+    return db.query(Character).filter(func.lower(Character.name) == name.strip().lower()).first()
+
+# Wishlist functions
+
+def _add_wishlist_entry(db, user_id, character_id):
+    """Add a wishlist row and bump the character's demand count in the same transaction."""
+    exists = db.query(user_wishlists.c.user_id).filter(
+        user_wishlists.c.user_id == int(user_id),
+        user_wishlists.c.character_id == character_id
+    ).first()
+    if exists:
+        return False
+        
+    db.execute(user_wishlists.insert().values(
+        user_id=int(user_id),
+        character_id=character_id,
+        added_at=datetime.datetime.utcnow()
+    ))
+    db.query(Character).filter(Character.id == character_id).update(
+        {Character.wishlist_count: func.coalesce(Character.wishlist_count, 0) + 1},
+        synchronize_session=False
+    )
+    wishlist_index.add(character_id, user_id)
+    return True
+
+def _remove_wishlist_entry(db, user_id, character_id):
+    """Remove a wishlist row and lower the character's demand count in the same transaction."""
+    result = db.execute(user_wishlists.delete().where(
+        user_wishlists.c.user_id == int(user_id),
+        user_wishlists.c.character_id == character_id
+    ))
+    if not result.rowcount:
+        return False
+        
+    db.query(Character).filter(Character.id == character_id).update(
+        {Character.wishlist_count: case((Character.wishlist_count > 0, Character.wishlist_count - 1), else_=0)},
+        synchronize_session=False
+    )
+    wishlist_index.remove(character_id, user_id)
+    return True
+
+def add_to_wishlist(user_id, character_id):
+    """Add a character to a user's wishlist. Returns False if it was already there."""
+    db = get_db()
+    
+    # Make sure the user exists for the foreign key
+    if not db.query(User.id).filter(User.id == int(user_id)).first():
+        db.add(User(id=int(user_id)))
+        db.flush()
+        
+    added = _add_wishlist_entry(db, user_id, character_id)
+    db.commit()
+    return added
+
+def remove_from_wishlist(user_id, character_id):
+    """Remove a character from a user's wishlist. Returns False if it wasn't there."""
+    db = get_db()
+    removed = _remove_wishlist_entry(db, user_id, character_id)
+    db.commit()
+    return removed
+
+def get_wishlist(user_id, offset=0, limit=10):
+    """Get one page of a user's wishlist as (character_names, total_count)."""
+    db = get_db()
+    
+    names = db.query(Character.name).join(
+        user_wishlists, user_wishlists.c.character_id == Character.id
+    ).filter(
+        user_wishlists.c.user_id == int(user_id)
+    ).order_by(
+        user_wishlists.c.added_at, user_wishlists.c.character_id
+    ).offset(offset).limit(limit).all()
+    
+    total = db.query(func.count()).select_from(user_wishlists).filter(
+        user_wishlists.c.user_id == int(user_id)
+    ).scalar()
+    
+    return [row.name for row in names], total
+
+def set_user_setting(user_id, key, value):
+    """Set a single key in a user's settings."""
+    db = get_db()
+    user = db.query(User).filter(User.id == int(user_id)).first()
+    
+    if not user:
+        user = User(id=int(user_id))
+        db.add(user)
+        
+    # Assign a new dict so the JSON column is flagged as changed
+    settings = dict(user.settings or {})
+    settings[key] = value
+    user.settings = settings
+    
+    db.commit()
+    return True
+
+def get_wishlisters(character_id):
+    """Get the IDs of all users wishlisting a character (reverse index lookup)."""
+    db = get_db()
+    rows = db.query(user_wishlists.c.user_id).filter(user_wishlists.c.character_id == character_id).all()
+    return [row.user_id for row in rows]
+
 # Card functions
 
 def get_card(global_id):
@@ -418,14 +576,37 @@ def get_card(global_id):
         
     return card
 
+def get_rarest_cards(user_id, limit=5):
+    """Get a user's rarest cards as dicts, highest rarity first, from the (owner_id, rarity_rank) index."""
+    db = get_db()
+    rows = db.query(Card.global_id, Card.rarity, Card.rarity_rank, Card.order, Card.claimed_artwork, Character.name).join(
+        Character, Card.character_id == Character.id
+    ).filter(Card.owner_id == int(user_id)).order_by(Card.rarity_rank.desc(), Card.order).limit(limit).all()
+    db.close()
+    return [
+        {"global_id": global_id, "rarity": rarity, "rarity_rank": rank, "order": order, "claimed_artwork": artwork, "name": name}
+        for global_id, rarity, rank, order, artwork, name in rows
+    ]
+
+def get_card_ids_by_rarity(user_id):
+    """Get a user's card global IDs ordered highest rarity first (ties in claim order)."""
+    db = get_db()
+    rows = db.query(Card.global_id).filter(Card.owner_id == int(user_id)).order_by(
+        Card.rarity_rank.desc(), Card.order
+    ).all()
+    db.close()
+    return [global_id for (global_id,) in rows]
+
 def add_card(user_id, character_id, rarity, claimed_artwork, claim_method="spawn"):
     """Add a card to the database."""
+    # Taken before the session starts writing; usually served from the cached block
+    global_id = global_ids.next_id()
     db = get_db()
     
     # Get user
-    user = db.query(User).filter(User.id == str(user_id)).first()
+    user = db.query(User).filter(User.id == int(user_id)).first()
     if not user:
-        user = User(id=str(user_id))
+        user = User(id=int(user_id))
         db.add(user)
         
     # Get character
@@ -435,12 +616,11 @@ def add_card(user_id, character_id, rarity, claimed_artwork, claim_method="spawn
         
     # Create card
     order = len(user.cards) + 1
-    global_id = generate_global_id()
     
     card = Card(
         global_id=global_id,
         character_id=character.id,
-        owner_id=str(user_id),
+        owner_id=int(user_id),
         rarity=rarity,
         claimed_artwork=claimed_artwork,
         claim_method=claim_method,
@@ -453,71 +633,15 @@ def add_card(user_id, character_id, rarity, claimed_artwork, claim_method="spawn
     user.total_cards += 1
     user.total_claims += 1
     
-    db.commit()
-    return card
-
-# Load all characters from JSON files
-def load_characters_from_json():
-    """Load characters from JSON files and add them to the database."""
-    characters = {}
-    base_dir = "DiscordBot/assets/characters/"
-    
-    if not os.path.exists(base_dir):
-        print(f"Characters directory not found at {base_dir}")
-        return {}
-        
-    for root, dirs, files in os.walk(base_dir):
-        for file in files:
-            if file.endswith(".json"):
-                file_path = os.path.join(root, file)
-                try:
-                    with open(file_path, "r") as f:
-                        data = json.load(f)
-                        characters.update(data)
-                except Exception as e:
-                    print(f"Error reading {file_path}: {e}")
-                    
-    # Add characters to database
-    db = get_db()
+    # Update leaderboard scores in the same transaction
+    record_claim(db, user_id, rarity)
     
-    for name, character_data in characters.items():
-        # Find or create series
-        series_name = character_data.get("series", "Unknown")
-        series = db.query(Series).filter(Series.name == series_name).first()
-        
-        if not series:
-            series = Series(name=series_name)
-            db.add(series)
-            db.flush()  # Get series ID
-            
-        # Find or create character
-        character = db.query(Character).filter(Character.name == name).first()
-        
-        if not character:
-            character = Character(
-                name=name,
-                series_id=series.id,
-                description=character_data.get("description")
-            )
-            db.add(character)
-            db.flush()  # Get character ID
-            
-            # Add primary image
-            primary_image = character_data.get("primary_image", {}).get("url")
-            if primary_image:
-                character.add_image(url=primary_image, is_primary=True)
-                
-            # Add extra images
-            for image_data in character_data.get("extra_images", []):
-                character.add_image(
-                    url=image_data.get("url"),
-                    is_primary=False,
-                    affection_required=image_data.get("affection_required", 0),
-                    is_event=image_data.get("is_event", False)
-                )
-                
     db.commit()
-    return characters
+    
+    # Load the card and release the connection; callers read it after the session is gone
+    db.refresh(card)
+    db.close()
+    return card
 
 # Initialize database on module import
 from models.base import DB_TYPE
@@ -0,0 +1,192 @@
+"""
+Table-by-table bulk copy from the SQLite database to PostgreSQL.
+
+Tables are copied parents-first (Base.metadata.sorted_tables), rows are read
+from SQLite in streamed batches and written with PostgreSQL COPY (or a bulk
+INSERT on drivers without COPY support). Afterwards serial sequences are moved
+past the copied IDs and every table is verified by row count and by an
+order-independent checksum computed from the typed column values on both sides.
+"""
+import io
+import json
+import time
+import hashlib
+import datetime
+from sqlalchemy import create_engine, select, func, text, Integer
+
+import models  # Registers every table on Base.metadata
+from models.base import Base, init_db
+
+DEFAULT_BATCH_SIZE = 10000
+CHECKSUM_MODULUS = 2 ** 256
+
+def _normalize(value):
+    """Render a column value the same way regardless of which database it came from."""
+    if value is None:
+        return "\x00"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, float):
+        return repr(value)
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, sort_keys=True, separators=(",", ":"))
+    return str(value)
+
+def _row_hash(row):
+    digest = hashlib.sha256("\x1f".join(_normalize(value) for value in row).encode("utf-8")).digest()
+    return int.from_bytes(digest, "big")
+
+def _csv_value(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
+
+def _stream(connection, table, batch_size):
+    """Yield lists of rows from a table without loading it all."""
+    result = connection.execution_options(stream_results=True, yield_per=batch_size).execute(select(table))
+    for partition in result.partitions(batch_size):
+        yield partition
+
+def table_stats(engine, table, batch_size=DEFAULT_BATCH_SIZE):
+    """Get (row_count, checksum) for a table; the checksum doesn't depend on row order."""
+    count = 0
+    checksum = 0
+    with engine.connect() as connection:
+        for rows in _stream(connection, table, batch_size):
+            count += len(rows)
+            for row in rows:
+                checksum = (checksum + _row_hash(row)) % CHECKSUM_MODULUS
+    return count, format(checksum, "064x")
+
+def _csv_field(value):
+    """Encode one value for COPY ... WITH (FORMAT csv): NULL is an unquoted empty field."""
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, int):
+        return str(value)
+    if isinstance(value, float):
+        return repr(value)
+    value = _csv_value(value)
+    return '"' + str(value).replace('"', '""') + '"'
+
+def _copy_rows(raw_connection, table, columns, rows):
+    """Write a batch with COPY ... FROM STDIN (psycopg2 or psycopg 3)."""
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write(",".join(_csv_field(value) for value in row))
+        buffer.write("\n")
+    buffer.seek(0)
+
+    column_list = ", ".join(f'"{column}"' for column in columns)
+    statement = f'COPY "{table.name}" ({column_list}) FROM STDIN WITH (FORMAT csv)'
+    cursor = raw_connection.cursor()
+    try:
+        if hasattr(cursor, "copy_expert"):
+            cursor.copy_expert(statement, buffer)
+        else:
+            with cursor.copy(statement) as copy:
+                copy.write(buffer.getvalue())
+    finally:
+        cursor.close()
+
+def _supports_copy(engine):
+    return engine.dialect.name == "postgresql" and engine.dialect.driver in ("psycopg2", "psycopg")
+
+def _reset_sequence(connection, table):
+    """Move a serial primary key's sequence past the copied IDs (PostgreSQL only)."""
+    primary_key = list(table.primary_key.columns)
+    if len(primary_key) != 1 or not isinstance(primary_key[0].type, Integer):
+        return
+    column = primary_key[0].name
+    connection.execute(text(
+        f"SELECT setval(pg_get_serial_sequence('\"{table.name}\"', '{column}'), "
+        f"COALESCE(MAX(\"{column}\"), 1), MAX(\"{column}\") IS NOT NULL) FROM \"{table.name}\" "
+        f"WHERE pg_get_serial_sequence('\"{table.name}\"', '{column}') IS NOT NULL"
+    ))
+
+def copy_database(source_url, target_url, batch_size=DEFAULT_BATCH_SIZE, truncate=False, tables=None, progress=print):
+    """Copy every table from source_url to target_url and verify it.
+
+    The source schema is first brought up to date like the bot does at
+    startup (missing tables and backfilled columns), so a database last
+    written by an older version can be copied. The target schema is created
+    if needed. Non-empty target tables are an error unless truncate=True.
+    Returns a list of per-table result dicts with rows, seconds, rows_per_sec
+    and verified.
+    """
+    source = create_engine(source_url)
+    target = create_engine(target_url)
+    init_db(source)
+    Base.metadata.create_all(target)
+
+    selected = [table for table in Base.metadata.sorted_tables if not tables or table.name in tables]
+    use_copy = _supports_copy(target)
+
+    with target.begin() as connection:
+        if truncate:
+            for table in reversed(selected):
+                if target.dialect.name == "postgresql":
+                    connection.execute(text(f'TRUNCATE TABLE "{table.name}" CASCADE'))
+                else:
+                    connection.execute(table.delete())
+        for table in selected:
+            existing = connection.execute(select(func.count()).select_from(table)).scalar()
+            if existing:
+                raise RuntimeError(f"Target table {table.name} already has {existing} rows (use truncate)")
+
+    results = []
+    for table in selected:
+        started = time.perf_counter()
+        columns = [column.name for column in table.columns]
+        copied = 0
+
+        with source.connect() as reader:
+            if use_copy:
+                raw_connection = target.raw_connection()
+                try:
+                    for rows in _stream(reader, table, batch_size):
+                        _copy_rows(raw_connection, table, columns, rows)
+                        copied += len(rows)
+                    raw_connection.commit()
+                except Exception:
+                    raw_connection.rollback()
+                    raise
+                finally:
+                    raw_connection.close()
+            else:
+                with target.begin() as writer:
+                    for rows in _stream(reader, table, batch_size):
+                        writer.execute(table.insert(), [dict(zip(columns, row)) for row in rows])
+                        copied += len(rows)
+
+        elapsed = time.perf_counter() - started
+        result = {
+            "table": table.name,
+            "rows": copied,
+            "seconds": round(elapsed, 3),
+            "rows_per_sec": round(copied / elapsed, 1) if elapsed else 0.0
+        }
+        results.append(result)
+        if progress:
+            progress(f"Copied {table.name}: {copied} rows in {result['seconds']}s ({result['rows_per_sec']} rows/sec)")
+
+    if target.dialect.name == "postgresql":
+        with target.begin() as connection:
+            for table in selected:
+                _reset_sequence(connection, table)
+
+    for result, table in zip(results, selected):
+        source_count, source_checksum = table_stats(source, table, batch_size)
+        target_count, target_checksum = table_stats(target, table, batch_size)
+        result["verified"] = source_count == target_count and source_checksum == target_checksum
+        result["source_rows"] = source_count
+        result["target_rows"] = target_count
+        if progress:
+            status = "OK" if result["verified"] else "MISMATCH"
+            progress(f"Verify {table.name}: {source_count} -> {target_count} rows, checksum {status}")
+
+    return results
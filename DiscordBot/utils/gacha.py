@@ -0,0 +1,238 @@
+"""
+Gacha engine.
+
+Banners (config.GACHA_BANNERS) are rate tables over card rarities plus a hard
+pity. A multi-pull rolls every rarity in one batch from a Vose alias table (one
+random number per pull), applies pity in pull order, and commits the result in
+a single transaction: one conditional UPDATE spends the tickets, one executemany
+INSERT adds the cards, and the pity counter, user totals and leaderboard scores
+are bumped once each. simulate_gacha.py checks the rates and pity statistically.
+"""
+import random
+import datetime
+from sqlalchemy import insert, func
+
+from config import GACHA_BANNERS
+from models.base import get_db
+from models.card import Card
+from models.user import User
+from models.gacha import GachaPity
+from models.rarity import RARITIES, RARITY_RANKS, rarity_rank
+from utils.catalog import character_catalog
+from utils.global_ids import global_ids
+from utils.leaderboard import record_claims
+
+PLACEHOLDER_ARTWORK = "https://via.placeholder.com/800"
+
+class GachaError(Exception):
+    pass
+
+class AliasTable:
+    """Weighted outcomes sampled in O(1) each (Vose's alias method)."""
+
+    def __init__(self, outcomes, weights):
+        count = len(outcomes)
+        total = float(sum(weights))
+        scaled = [weight * count / total for weight in weights]
+        small = [index for index, value in enumerate(scaled) if value < 1.0]
+        large = [index for index, value in enumerate(scaled) if value >= 1.0]
+
+        self.outcomes = list(outcomes)
+        self.probability = [1.0] * count
+        self.alias = list(range(count))
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.probability[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] -= 1.0 - scaled[less]
+            (small if scaled[more] < 1.0 else large).append(more)
+        # Whatever is left is 1.0 up to rounding error
+
+    def sample(self, count, rng=random):
+        """`count` independent draws, one random number each."""
+        outcomes, probability, alias = self.outcomes, self.probability, self.alias
+        columns = len(outcomes)
+        draws = []
+        for _ in range(count):
+            value = rng.random() * columns
+            column = min(int(value), columns - 1)
+            draws.append(outcomes[column] if value - column < probability[column] else outcomes[alias[column]])
+        return draws
+
+class Banner:
+    """A rate table with ticket cost and hard pity."""
+
+    def __init__(self, key, name, rates, cost=1, pity=None):
+        total = sum(rates.values())
+        if abs(total - 100) > 1e-6:
+            raise ValueError(f"Gacha banner {key} rates add up to {total}, not 100")
+        unknown = [code for code in rates if code not in RARITY_RANKS]
+        if unknown:
+            raise ValueError(f"Gacha banner {key} has unknown rarities: {', '.join(unknown)}")
+
+        self.key = key
+        self.name = name
+        self.cost = cost
+        # Lowest to highest, without the rarities this banner can't give
+        self.rates = {code: rates[code] / 100 for code in RARITIES if rates.get(code)}
+        self.table = AliasTable(list(self.rates), list(self.rates.values()))
+        self.pity_pulls = pity["pulls"] if pity else 0
+        self.pity_rarity = pity["rarity"] if pity else None
+        self.pity_rank = rarity_rank(self.pity_rarity)
+
+    def draw(self, count, pity=0, rng=random):
+        """Roll `count` pulls in one batch, then apply hard pity in pull order.
+
+        `pity` is the number of pulls since the last pity-tier card. Returns
+        (rarities, new pity counter).
+        """
+        rarities = self.table.sample(count, rng)
+        if self.pity_pulls:
+            for index, rarity in enumerate(rarities):
+                pity += 1
+                if RARITY_RANKS[rarity] >= self.pity_rank:
+                    pity = 0
+                elif pity >= self.pity_pulls:
+                    rarities[index] = self.pity_rarity
+                    pity = 0
+        return rarities, pity
+
+    def effective_rates(self):
+        """Long-run share of each rarity including pity, as fractions.
+
+        The pulls since the last pity-tier card form a chain whose stationary
+        weight for c misses in a row is proportional to (1 - p)^c (p: the base
+        chance of the pity tier or better); only the last state is forced.
+        """
+        if not self.pity_pulls:
+            return dict(self.rates)
+        hit = sum(rate for code, rate in self.rates.items() if RARITY_RANKS[code] >= self.pity_rank)
+        miss = 1.0 - hit
+        forced = miss ** (self.pity_pulls - 1) / sum(miss ** streak for streak in range(self.pity_pulls))
+
+        rates = {}
+        for code, rate in self.rates.items():
+            rates[code] = rate if RARITY_RANKS[code] >= self.pity_rank else rate * (1 - forced)
+        rates[self.pity_rarity] = rates.get(self.pity_rarity, 0.0) + miss * forced
+        return rates
+
+BANNERS = {key: Banner(key, **spec) for key, spec in GACHA_BANNERS.items()}
+
+_pool = (None, [])
+
+def _character_pool():
+    """Catalog character names that exist in the database, cached per catalog snapshot."""
+    global _pool
+    catalog = character_catalog.current
+    if _pool[0] is not catalog:
+        _pool = (catalog, [name for name in catalog.spawn_pool if name in catalog.character_ids])
+    return catalog, _pool[1]
+
+def _artwork(character, rng):
+    """A random artwork that needs no affection, like spawns use."""
+    images = []
+    primary = character.get("primary_image", {}).get("url")
+    if primary:
+        images.append(primary)
+    for image in character.get("extra_images", []):
+        if image.get("affection_required", 0) == 0 and image.get("url"):
+            images.append(image["url"])
+    return rng.choice(images) if images else PLACEHOLDER_ARTWORK
+
+def pull(user_id, banner_key, count, rng=random):
+    """Spend tickets and pull `count` cards in one transaction.
+
+    Returns {"cards": [card dicts], "pity": pulls since the last pity-tier card,
+    "tickets": tickets left}. Raises GachaError if the pull can't be made.
+    """
+    banner = BANNERS.get(banner_key)
+    if not banner:
+        raise GachaError(f"Unknown banner: {banner_key}")
+    catalog, pool = _character_pool()
+    if not pool:
+        raise GachaError("No characters are available to pull.")
+
+    user_id = int(user_id)
+    cost = banner.cost * count
+    # Taken before the session starts writing; usually served from the cached block
+    new_ids = global_ids.take(count)
+    db = get_db()
+    try:
+        # Spending first takes the user's row (or SQLite's) write lock, so pulls don't interleave
+        spent = db.query(User).filter(User.id == user_id, User.gacha_tickets >= cost).update(
+            {User.gacha_tickets: User.gacha_tickets - cost},
+            synchronize_session=False
+        )
+        if not spent:
+            raise GachaError(f"You need {cost} gacha tickets for {count} pull{'s' if count != 1 else ''}.")
+
+        state = db.query(GachaPity).filter(GachaPity.user_id == user_id, GachaPity.banner == banner.key).first()
+        rarities, pity = banner.draw(count, state.pulls if state else 0, rng)
+        names = rng.choices(pool, k=count)
+
+        order = db.query(func.coalesce(func.max(Card.order), 0)).filter(Card.owner_id == user_id).scalar()
+        now = datetime.datetime.utcnow()
+        cards = [
+            {
+                "global_id": global_id,
+                "character_id": catalog.character_ids[name],
+                "owner_id": user_id,
+                "rarity": rarity,
+                "rarity_rank": rarity_rank(rarity),
+                "claimed_artwork": _artwork(catalog.characters[name], rng),
+                "claim_method": "gacha",
+                "order": order + position,
+                "claimed_at": now
+            }
+            for position, (global_id, name, rarity) in enumerate(zip(new_ids, names, rarities), start=1)
+        ]
+        db.execute(insert(Card.__table__), cards)
+
+        db.query(User).filter(User.id == user_id).update(
+            {
+                User.total_cards: func.coalesce(User.total_cards, 0) + count,
+                User.total_claims: func.coalesce(User.total_claims, 0) + count
+            },
+            synchronize_session=False
+        )
+        record_claims(db, user_id, rarities)
+
+        if state:
+            state.pulls = pity
+            state.total_pulls += count
+        else:
+            db.add(GachaPity(user_id=user_id, banner=banner.key, pulls=pity, total_pulls=count))
+
+        tickets = db.query(User.gacha_tickets).filter(User.id == user_id).scalar()
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    for card, name in zip(cards, names):
+        card["name"] = name
+    return {"cards": cards, "pity": pity, "tickets": tickets}
+
+def get_pity(user_id, banner_key):
+    """Get (pulls since the last pity-tier card, tickets) for a user."""
+    db = get_db()
+    pulls = db.query(GachaPity.pulls).filter(GachaPity.user_id == int(user_id), GachaPity.banner == banner_key).scalar()
+    tickets = db.query(User.gacha_tickets).filter(User.id == int(user_id)).scalar()
+    db.close()
+    return pulls or 0, tickets or 0
+
+def grant_tickets(user_id, amount):
+    """Add gacha tickets to a user (creating them if needed). Returns the new balance."""
+    db = get_db()
+    updated = db.query(User).filter(User.id == int(user_id)).update(
+        {User.gacha_tickets: User.gacha_tickets + amount},
+        synchronize_session=False
+    )
+    if not updated:
+        db.add(User(id=int(user_id), gacha_tickets=amount))
+    db.commit()
+    tickets = db.query(User.gacha_tickets).filter(User.id == int(user_id)).scalar()
+    db.close()
+    return tickets
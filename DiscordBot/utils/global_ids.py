@@ -0,0 +1,99 @@
+"""
+Card global ID allocator.
+
+IDs are a counter encoded in base36. Each process reserves a block of
+ID_BLOCK_SIZE values from the id_sequences row in one short transaction and
+hands them out from memory, so claiming a card costs no extra round trip and
+two processes (or a restart) never reuse a value. Unused values in a block are
+simply skipped.
+
+The counter starts at 36^4, so IDs are 5 characters ("10000") and grow to 6.
+Seven character values are never produced: every legacy ID, random or from
+the users.json migration, is exactly 7 characters, so new IDs cannot collide
+with them. After 36^6 - 1 ("zzzzzz") the counter jumps to 8 characters.
+"""
+import os
+import threading
+from sqlalchemy import update, select, insert
+from sqlalchemy.exc import IntegrityError
+from models.base import engine
+from models.id_sequence import IdSequence
+
+ID_BLOCK_SIZE = int(os.getenv("GLOBAL_ID_BLOCK_SIZE", "100"))
+
+ALPHABET = "0123456789abcdefghijklmnopqrstuvwxyz"
+FIRST_VALUE = 36 ** 4
+LEGACY_START = 36 ** 6
+LEGACY_END = 36 ** 7
+
+def encode(value):
+    """Base36 text of a non-negative integer."""
+    if value == 0:
+        return ALPHABET[0]
+    digits = []
+    while value:
+        value, remainder = divmod(value, 36)
+        digits.append(ALPHABET[remainder])
+    return "".join(reversed(digits))
+
+def decode(text):
+    """Integer value of a base36 ID (raises ValueError on other characters)."""
+    return int(text, 36)
+
+class GlobalIdAllocator:
+    """Hands out IDs from a locally cached, database-reserved block."""
+
+    def __init__(self, name="card", block_size=ID_BLOCK_SIZE):
+        self.name = name
+        self.block_size = block_size
+        self.lock = threading.Lock()
+        self.next_value = 0
+        self.end_value = 0
+
+    def _reserve(self, count):
+        """Atomically take [start, start + count) from the shared counter."""
+        try:
+            return self._reserve_once(count)
+        except IntegrityError:
+            # Another process created the counter row first; its UPDATE path works now
+            return self._reserve_once(count)
+
+    def _reserve_once(self, count):
+        table = IdSequence.__table__
+        with engine.begin() as connection:
+            # The UPDATE takes the row (PostgreSQL) or database (SQLite) write lock first,
+            # so the read below sees this process's own increment and nobody else's
+            result = connection.execute(
+                update(table).where(table.c.name == self.name).values(next_value=table.c.next_value + count)
+            )
+            if result.rowcount == 0:
+                connection.execute(insert(table).values(name=self.name, next_value=FIRST_VALUE + count))
+                return FIRST_VALUE
+            end = connection.execute(select(table.c.next_value).where(table.c.name == self.name)).scalar_one()
+            start = end - count
+            if start < LEGACY_END and end > LEGACY_START:
+                # Skip the 7 character range reserved for legacy IDs
+                start = LEGACY_END
+                connection.execute(
+                    update(table).where(table.c.name == self.name).values(next_value=start + count)
+                )
+            return start
+
+    def next_id(self):
+        """A new unique global ID."""
+        with self.lock:
+            if self.next_value >= self.end_value:
+                self.next_value = self._reserve(self.block_size)
+                self.end_value = self.next_value + self.block_size
+            value = self.next_value
+            self.next_value += 1
+        return encode(value)
+
+    def take(self, count):
+        """`count` new IDs; large batches reserve their own block."""
+        if count > self.block_size:
+            start = self._reserve(count)
+            return [encode(value) for value in range(start, start + count)]
+        return [self.next_id() for _ in range(count)]
+
+global_ids = GlobalIdAllocator()
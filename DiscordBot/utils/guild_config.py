@@ -0,0 +1,104 @@
+"""
+Guild configuration cache.
+
+Every registered server is loaded once (with its admins) and served from
+memory afterwards: spawn/log/welcome channel IDs, admin ID sets, command
+permissions and settings. utils.db.update_server and register_server write
+through to this cache, so it never needs to be re-read from the database.
+"""
+import threading
+
+from models.base import get_db
+from models.server import Server, server_admins
+
+def _to_int(value):
+    """Convert a stored snowflake string to an int, keeping None."""
+    return int(value) if value not in (None, "") else None
+
+class GuildConfig:
+    """Read-only snapshot of one server's configuration."""
+    __slots__ = (
+        "id", "name", "spawn_channel_id", "log_channel_id", "welcome_channel_id",
+        "admin_ids", "command_permissions", "settings"
+    )
+
+    def __init__(self, server, admin_ids):
+        self.id = int(server.id)
+        self.name = server.name
+        self.spawn_channel_id = _to_int(server.spawn_channel_id)
+        self.log_channel_id = _to_int(server.log_channel_id)
+        self.welcome_channel_id = _to_int(server.welcome_channel_id)
+        self.admin_ids = frozenset(int(admin_id) for admin_id in admin_ids)
+        self.command_permissions = dict(server.command_permissions or {})
+        self.settings = dict(server.settings or {})
+
+    def is_admin(self, user_id):
+        """Check whether a user is a registered admin of the server."""
+        return int(user_id) in self.admin_ids
+
+    def __repr__(self):
+        return f"<GuildConfig(id={self.id}, name={self.name})>"
+
+class GuildConfigCache:
+    """All server configurations, keyed by guild ID."""
+
+    def __init__(self):
+        self._configs = {}  # Guild ID -> GuildConfig
+        self._lock = threading.Lock()
+        self.loaded = False
+
+    def load(self):
+        """Load every server and its admins with two queries."""
+        db = get_db()
+
+        admins = {}
+        for server_id, user_id in db.query(server_admins.c.server_id, server_admins.c.user_id):
+            admins.setdefault(server_id, []).append(user_id)
+
+        configs = {}
+        for server in db.query(Server).all():
+            config = GuildConfig(server, admins.get(server.id, ()))
+            configs[config.id] = config
+
+        with self._lock:
+            self._configs = configs
+            self.loaded = True
+        return len(configs)
+
+    def _ensure_loaded(self):
+        if not self.loaded:
+            self.load()
+
+    def get(self, guild_id):
+        """Get a guild's configuration, or None if the server isn't registered."""
+        self._ensure_loaded()
+        return self._configs.get(int(guild_id))
+
+    def is_registered(self, guild_id):
+        """Check whether a guild has been registered."""
+        return self.get(guild_id) is not None
+
+    def spawn_channels(self):
+        """Get {guild_id: spawn_channel_id} for every guild with a spawn channel."""
+        self._ensure_loaded()
+        with self._lock:
+            return {
+                guild_id: config.spawn_channel_id
+                for guild_id, config in self._configs.items()
+                if config.spawn_channel_id
+            }
+
+    def store(self, server):
+        """Write through a server that was just saved (its admins are read from the ORM object)."""
+        config = GuildConfig(server, [admin.id for admin in server.admins])
+        with self._lock:
+            self._configs[config.id] = config
+        return config
+
+    def forget(self, guild_id):
+        """Drop a guild from the cache."""
+        with self._lock:
+            self._configs.pop(int(guild_id), None)
+
+# Shared instance used by utils.db and the cogs
+guild_config_cache = GuildConfigCache()
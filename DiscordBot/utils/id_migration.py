@@ -0,0 +1,202 @@
+"""
+Migration of Discord ID columns from text to BIGINT.
+
+Every column declared as models.types.Snowflake (user and server IDs, card
+owners, the association tables, channel IDs) used to be a String. On SQLite
+the Snowflake type reads and writes both forms, so the bot runs before and
+after this migration; on PostgreSQL text columns don't compare with integer
+binds, so main.py refuses to start until it has been run. Migrating makes the
+columns, their indexes and the joins on them integer-sized.
+
+SQLite can't change a column's type, so each affected table is rebuilt
+(create the new table, copy with CAST, drop, rename, recreate its indexes)
+inside one transaction with foreign key enforcement paused; the migration is
+rolled back if PRAGMA foreign_key_check finds more violations afterwards than
+before. PostgreSQL drops the foreign keys on the affected columns, alters the
+columns with USING ...::bigint and adds the keys back, which revalidates them.
+"""
+import time
+from sqlalchemy import inspect
+from sqlalchemy.schema import CreateTable, CreateIndex
+from sqlalchemy.sql import sqltypes
+
+import models  # Registers every table on Base.metadata
+from models.base import Base, engine
+from models.types import Snowflake
+
+class IdMigrationError(Exception):
+    pass
+
+def snowflake_columns():
+    """{table: [column names]} for every Snowflake column in the models."""
+    columns = {}
+    for table in Base.metadata.sorted_tables:
+        names = [column.name for column in table.columns if isinstance(column.type, Snowflake)]
+        if names:
+            columns[table] = names
+    return columns
+
+def pending_columns(bind=engine):
+    """{table: [column names]} whose database column is not an integer yet."""
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    pending = {}
+    for table, names in snowflake_columns().items():
+        if table.name not in existing_tables:
+            continue
+        types = {column["name"]: column["type"] for column in inspector.get_columns(table.name)}
+        stale = [name for name in names if name in types and not isinstance(types[name], sqltypes.Integer)]
+        if stale:
+            pending[table] = stale
+    return pending
+
+def _sqlite_sizes(cursor):
+    """{table or index name: bytes} from the dbstat virtual table, if it is compiled in."""
+    try:
+        return dict(cursor.execute("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name").fetchall())
+    except Exception:
+        return {}
+
+def _migrate_sqlite(pending, progress):
+    preparer = engine.dialect.identifier_preparer
+    raw = engine.raw_connection()
+    connection = raw.driver_connection
+    isolation_level = connection.isolation_level
+    # Autocommit mode, so the explicit BEGIN below also covers the DDL
+    connection.isolation_level = None
+    cursor = connection.cursor()
+    try:
+        foreign_keys = cursor.execute("PRAGMA foreign_keys").fetchone()[0]
+        cursor.execute("PRAGMA foreign_keys = OFF")
+        sizes_before = _sqlite_sizes(cursor)
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            violations_before = len(cursor.execute("PRAGMA foreign_key_check").fetchall())
+            rows = 0
+            for table, names in pending.items():
+                quoted = preparer.format_table(table)
+                for name in names:
+                    column = preparer.quote(name)
+                    bad = cursor.execute(
+                        f"SELECT COUNT(*) FROM {quoted} WHERE {column} IS NOT NULL AND ({column} = '' OR {column} GLOB '*[^0-9]*')"
+                    ).fetchone()[0]
+                    if bad:
+                        raise IdMigrationError(f"{table.name}.{name} has {bad} values that aren't Discord IDs")
+
+                existing = [row[1] for row in cursor.execute(f"PRAGMA table_info({quoted})").fetchall()]
+                new_name = f"{table.name}__bigint"
+                create = str(CreateTable(table).compile(dialect=engine.dialect))
+                create = create.replace(f"CREATE TABLE {quoted} (", f"CREATE TABLE {preparer.quote(new_name)} (", 1)
+                cursor.execute(create)
+
+                copied = [column.name for column in table.columns if column.name in existing]
+                targets = ", ".join(preparer.quote(name) for name in copied)
+                values = ", ".join(
+                    f"CAST({preparer.quote(name)} AS INTEGER)" if name in names else preparer.quote(name)
+                    for name in copied
+                )
+                cursor.execute(f"INSERT INTO {preparer.quote(new_name)} ({targets}) SELECT {values} FROM {quoted}")
+                count = cursor.execute(f"SELECT COUNT(*) FROM {preparer.quote(new_name)}").fetchone()[0]
+                cursor.execute(f"DROP TABLE {quoted}")
+                cursor.execute(f"ALTER TABLE {preparer.quote(new_name)} RENAME TO {quoted}")
+                for index in table.indexes:
+                    cursor.execute(str(CreateIndex(index).compile(dialect=engine.dialect)))
+                rows += count
+                progress(f"Rebuilt {table.name} ({count} rows): {', '.join(names)} -> BIGINT")
+
+            violations_after = len(cursor.execute("PRAGMA foreign_key_check").fetchall())
+            if violations_after > violations_before:
+                raise IdMigrationError(
+                    f"Foreign key check found {violations_after} violations after the migration ({violations_before} before)"
+                )
+            cursor.execute("COMMIT")
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+        finally:
+            cursor.execute(f"PRAGMA foreign_keys = {'ON' if foreign_keys else 'OFF'}")
+        return rows, sizes_before, _sqlite_sizes(cursor)
+    finally:
+        cursor.close()
+        connection.isolation_level = isolation_level
+        raw.close()
+
+def _postgresql_sizes(connection):
+    rows = connection.exec_driver_sql(
+        "SELECT indexrelname, pg_relation_size(indexrelid) FROM pg_stat_user_indexes"
+    ).fetchall()
+    return dict(rows)
+
+def _migrate_postgresql(pending, progress):
+    preparer = engine.dialect.identifier_preparer
+    affected = {(table.name, name) for table, names in pending.items() for name in names}
+    with engine.begin() as connection:
+        sizes_before = _postgresql_sizes(connection)
+        inspector = inspect(connection)
+
+        for table, names in pending.items():
+            for name in names:
+                bad = connection.exec_driver_sql(
+                    f"SELECT COUNT(*) FROM {preparer.format_table(table)} "
+                    f"WHERE {preparer.quote(name)} IS NOT NULL AND {preparer.quote(name)} !~ '^[0-9]+$'"
+                ).scalar()
+                if bad:
+                    raise IdMigrationError(f"{table.name}.{name} has {bad} values that aren't Discord IDs")
+
+        # Foreign keys on either side of an affected column can't survive the type change
+        dropped = []
+        for table_name in inspector.get_table_names():
+            for foreign_key in inspector.get_foreign_keys(table_name):
+                local = {(table_name, column) for column in foreign_key["constrained_columns"]}
+                remote = {(foreign_key["referred_table"], column) for column in foreign_key["referred_columns"]}
+                if (local | remote) & affected and foreign_key.get("name"):
+                    connection.exec_driver_sql(
+                        f"ALTER TABLE {preparer.quote(table_name)} DROP CONSTRAINT {preparer.quote(foreign_key['name'])}"
+                    )
+                    dropped.append((table_name, foreign_key))
+
+        rows = 0
+        for table, names in pending.items():
+            alterations = ", ".join(
+                f"ALTER COLUMN {preparer.quote(name)} TYPE BIGINT USING {preparer.quote(name)}::bigint"
+                for name in names
+            )
+            connection.exec_driver_sql(f"ALTER TABLE {preparer.format_table(table)} {alterations}")
+            count = connection.exec_driver_sql(f"SELECT COUNT(*) FROM {preparer.format_table(table)}").scalar()
+            rows += count
+            progress(f"Altered {table.name} ({count} rows): {', '.join(names)} -> BIGINT")
+
+        for table_name, foreign_key in dropped:
+            local = ", ".join(preparer.quote(column) for column in foreign_key["constrained_columns"])
+            remote = ", ".join(preparer.quote(column) for column in foreign_key["referred_columns"])
+            connection.exec_driver_sql(
+                f"ALTER TABLE {preparer.quote(table_name)} ADD CONSTRAINT {preparer.quote(foreign_key['name'])} "
+                f"FOREIGN KEY ({local}) REFERENCES {preparer.quote(foreign_key['referred_table'])} ({remote})"
+            )
+        progress(f"Re-added and validated {len(dropped)} foreign keys")
+        sizes_after = _postgresql_sizes(connection)
+    return rows, sizes_before, sizes_after
+
+def migrate_discord_ids(progress=print):
+    """Convert every pending Discord ID column to BIGINT. Returns a summary dict."""
+    pending = pending_columns()
+    if not pending:
+        return {"tables": 0, "rows": 0, "seconds": 0.0, "sizes": {}}
+
+    started = time.perf_counter()
+    if engine.dialect.name == "sqlite":
+        rows, before, after = _migrate_sqlite(pending, progress)
+    elif engine.dialect.name == "postgresql":
+        rows, before, after = _migrate_postgresql(pending, progress)
+    else:
+        raise IdMigrationError(f"Unsupported database: {engine.dialect.name}")
+
+    # Size of every index (and table, on SQLite) that was rebuilt or altered
+    names = {table.name for table in pending} | {index.name for table in pending for index in table.indexes}
+    sizes = {name: (before.get(name), after.get(name)) for name in sorted(names) if name in before or name in after}
+    return {
+        "tables": len(pending),
+        "rows": rows,
+        "seconds": round(time.perf_counter() - started, 2),
+        "sizes": sizes
+    }
@@ -0,0 +1,211 @@
+"""
+Materialized leaderboards.
+
+Scores live in the leaderboard_scores table (one row per metric and user) and
+are bumped incrementally whenever cards are claimed or gain affection, and
+recomputed for the user whenever a whole collection is rewritten (trades), so
+top-N and "my rank" queries never have to scan the cards table. Ranks are
+recomputed in bulk with a window function by the leaderboard cog.
+"""
+from sqlalchemy import func, case
+from sqlalchemy.exc import SQLAlchemyError
+
+from models.base import get_db
+from models.user import User
+from models.card import Card
+from models.rarity import rarity_rank
+from models.leaderboard import (
+    LeaderboardScore, LEADERBOARD_METRICS,
+    METRIC_CARDS, METRIC_RARITY, METRIC_AFFECTION
+)
+
+# Points each rarity contributes to the rarity-weighted score
+RARITY_SCORES = {"N": 1, "R": 2, "SR": 5, "SSR": 10, "UR": 25, "LR": 50, "ER": 100}
+# The same points keyed by Card.rarity_rank, so aggregates compare integers
+RANK_SCORES = {rarity_rank(code): score for code, score in RARITY_SCORES.items()}
+
+# Metric whose rank is copied to User.leaderboard_rank
+PRIMARY_METRIC = METRIC_RARITY
+
+def rarity_score(rarity):
+    """Get the rarity-weighted score of a single card."""
+    return RARITY_SCORES.get(rarity, 0)
+
+def _bump(db, metric, user_id, delta):
+    """Atomically add delta to a user's score, creating the row if needed."""
+    if not delta:
+        return
+
+    updated = db.query(LeaderboardScore).filter(
+        LeaderboardScore.metric == metric,
+        LeaderboardScore.user_id == int(user_id)
+    ).update(
+        {LeaderboardScore.score: LeaderboardScore.score + delta},
+        synchronize_session=False
+    )
+
+    if not updated:
+        db.add(LeaderboardScore(metric=metric, user_id=int(user_id), score=delta))
+
+# Incremental updates (called inside the caller's transaction)
+
+def record_claim(db, user_id, rarity, affection=0):
+    """Add a newly owned card to the user's scores."""
+    _bump(db, METRIC_CARDS, user_id, 1)
+    _bump(db, METRIC_RARITY, user_id, rarity_score(rarity))
+    _bump(db, METRIC_AFFECTION, user_id, affection)
+
+def record_claims(db, user_id, rarities):
+    """Add several newly owned cards at once (one bump per metric)."""
+    _bump(db, METRIC_CARDS, user_id, len(rarities))
+    _bump(db, METRIC_RARITY, user_id, sum(rarity_score(rarity) for rarity in rarities))
+
+def record_affection(db, user_id, delta):
+    """Add gained affection to the user's total affection score."""
+    _bump(db, METRIC_AFFECTION, user_id, delta)
+
+def refresh_user_scores(db, user_id):
+    """Recompute one user's scores from their cards.
+
+    Used when a whole collection is rewritten at once (update_user("cards")),
+    where there is no single card to diff against.
+    """
+    user_id = int(user_id)
+    count, rarity_total, affection_total = db.query(
+        func.count(Card.id),
+        func.coalesce(func.sum(case(RANK_SCORES, value=Card.rarity_rank, else_=0)), 0),
+        func.coalesce(func.sum(Card.affection), 0)
+    ).filter(Card.owner_id == user_id).one()
+
+    scores = {
+        METRIC_CARDS: count,
+        METRIC_RARITY: rarity_total,
+        METRIC_AFFECTION: affection_total
+    }
+
+    existing = {
+        entry.metric: entry
+        for entry in db.query(LeaderboardScore).filter(LeaderboardScore.user_id == user_id)
+    }
+
+    for metric, score in scores.items():
+        if metric in existing:
+            existing[metric].score = score
+        else:
+            db.add(LeaderboardScore(metric=metric, user_id=user_id, score=score))
+
+# Queries
+
+def get_top(metric, limit=10):
+    """Get the top users for a metric as a list of (user_id, username, score)."""
+    if metric not in LEADERBOARD_METRICS:
+        raise ValueError(f"Invalid leaderboard metric: {metric}")
+
+    db = get_db()
+    rows = db.query(LeaderboardScore.user_id, User.username, LeaderboardScore.score).outerjoin(
+        User, User.id == LeaderboardScore.user_id
+    ).filter(
+        LeaderboardScore.metric == metric,
+        LeaderboardScore.score > 0
+    ).order_by(
+        LeaderboardScore.score.desc(),
+        LeaderboardScore.user_id
+    ).limit(limit).all()
+
+    return [(row.user_id, row.username, row.score) for row in rows]
+
+def get_rank(user_id, metric):
+    """Get a user's live (rank, score) for a metric, or (None, 0) if unranked."""
+    if metric not in LEADERBOARD_METRICS:
+        raise ValueError(f"Invalid leaderboard metric: {metric}")
+
+    db = get_db()
+    score = db.query(LeaderboardScore.score).filter(
+        LeaderboardScore.metric == metric,
+        LeaderboardScore.user_id == int(user_id)
+    ).scalar()
+
+    if not score:
+        return None, 0
+
+    # Range count on (metric, score) index
+    ahead = db.query(func.count()).select_from(LeaderboardScore).filter(
+        LeaderboardScore.metric == metric,
+        LeaderboardScore.score > score
+    ).scalar()
+
+    return ahead + 1, score
+
+# Bulk maintenance
+
+def rebuild_scores():
+    """Rebuild every score from the cards table with one GROUP BY.
+
+    Only needed to bootstrap the table or to repair drift; normal operation
+    keeps scores up to date incrementally.
+    """
+    db = get_db()
+    try:
+        rows = db.query(
+            Card.owner_id,
+            func.count(Card.id),
+            func.coalesce(func.sum(case(RANK_SCORES, value=Card.rarity_rank, else_=0)), 0),
+            func.coalesce(func.sum(Card.affection), 0)
+        ).filter(Card.owner_id.isnot(None)).group_by(Card.owner_id).all()
+
+        db.query(LeaderboardScore).delete(synchronize_session=False)
+
+        mappings = []
+        for owner_id, count, rarity_total, affection_total in rows:
+            mappings.append({"metric": METRIC_CARDS, "user_id": owner_id, "score": count})
+            mappings.append({"metric": METRIC_RARITY, "user_id": owner_id, "score": rarity_total})
+            mappings.append({"metric": METRIC_AFFECTION, "user_id": owner_id, "score": affection_total})
+
+        db.bulk_insert_mappings(LeaderboardScore, mappings)
+        db.commit()
+        return len(rows)
+    except SQLAlchemyError as e:
+        print(f"Error rebuilding leaderboard scores: {e}")
+        db.rollback()
+        return 0
+
+def recompute_ranks():
+    """Recompute all ranks with RANK() OVER (PARTITION BY metric ORDER BY score DESC).
+
+    The primary metric's rank is also copied to User.leaderboard_rank.
+    """
+    db = get_db()
+    try:
+        rank_column = func.rank().over(
+            partition_by=LeaderboardScore.metric,
+            order_by=LeaderboardScore.score.desc()
+        ).label("rank")
+
+        rows = db.query(
+            LeaderboardScore.metric,
+            LeaderboardScore.user_id,
+            LeaderboardScore.score,
+            rank_column
+        ).all()
+
+        score_mappings = []
+        user_mappings = []
+        for metric, user_id, score, rank in rows:
+            rank = rank if score > 0 else None
+            score_mappings.append({"metric": metric, "user_id": user_id, "rank": rank})
+            if metric == PRIMARY_METRIC:
+                user_mappings.append({"id": user_id, "leaderboard_rank": rank})
+
+        db.bulk_update_mappings(LeaderboardScore, score_mappings)
+        db.bulk_update_mappings(User, user_mappings)
+        db.commit()
+        return len(rows)
+    except SQLAlchemyError as e:
+        print(f"Error recomputing leaderboard ranks: {e}")
+        db.rollback()
+        return 0
+
+def is_empty():
+    """Check whether the leaderboard has never been populated."""
+    db = get_db()
+    return db.query(LeaderboardScore.user_id).first() is None
@@ -0,0 +1,138 @@
+"""
+Event loop lag watchdog.
+
+A heartbeat task wakes every LOOP_WATCHDOG_INTERVAL_MS and records how late it
+was. A helper thread watches the heartbeat; once the loop has been stuck for
+longer than LOOP_LAG_THRESHOLD_MS it samples the loop thread's stack until
+the heartbeat resumes, then logs the bot code that was running (the cog frame
+and the innermost frame under DiscordBot/) with the stall duration. Stalls are
+aggregated per call site in the metrics registry and by top_blockers().
+"""
+import os
+import sys
+import time
+import asyncio
+import threading
+import traceback
+from pathlib import Path
+from collections import Counter
+from utils import metrics
+
+LOOP_LAG_THRESHOLD_MS = float(os.getenv("LOOP_LAG_THRESHOLD_MS", "250"))
+LOOP_WATCHDOG_INTERVAL_MS = float(os.getenv("LOOP_WATCHDOG_INTERVAL_MS", "100"))
+
+BOT_DIR = str(Path(__file__).resolve().parent.parent)
+
+loop_lag_seconds = metrics.registry.histogram("taipu_event_loop_lag_seconds", "How late the watchdog heartbeat woke up.")
+loop_blocks = metrics.registry.counter("taipu_event_loop_blocks_total", "Event loop stalls over the threshold, by call site.", ("site",))
+loop_blocked_seconds = metrics.registry.counter("taipu_event_loop_blocked_seconds_total", "Time the event loop spent stalled, by call site.", ("site",))
+
+def _bot_frames(frame):
+    """(relative path, function, line) for each frame in bot code, outermost first."""
+    frames = []
+    for summary in traceback.extract_stack(frame):
+        if summary.filename.startswith("<"):
+            continue
+        filename = os.path.abspath(summary.filename)
+        if filename.startswith(BOT_DIR) and "site-packages" not in filename:
+            frames.append((os.path.relpath(filename, BOT_DIR), summary.name, summary.lineno))
+    return frames
+
+def _site(frames, leaf):
+    """'cogs/x.py:command > utils/y.py:function', or the library leaf if no bot code is on the stack."""
+    if not frames:
+        return f"{os.path.basename(leaf.filename)}:{leaf.name}" if leaf else "unknown"
+    inner = frames[-1]
+    cog = next((frame for frame in reversed(frames) if frame[0].startswith("cogs")), None)
+    if cog and cog != inner:
+        return f"{cog[0]}:{cog[1]} > {inner[0]}:{inner[1]}"
+    return f"{inner[0]}:{inner[1]}"
+
+class LoopWatchdog:
+    def __init__(self, threshold_ms=LOOP_LAG_THRESHOLD_MS, interval_ms=LOOP_WATCHDOG_INTERVAL_MS):
+        self.threshold = threshold_ms / 1000
+        self.interval = interval_ms / 1000
+        self.last_beat = time.monotonic()
+        self.loop_thread_id = None
+        self.task = None
+        self.thread = None
+        self.stopping = threading.Event()
+        self.lock = threading.Lock()
+        self.blockers = {}
+
+    async def _heartbeat(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            loop_lag_seconds.observe(max(0.0, loop.time() - expected))
+            self.last_beat = time.monotonic()
+
+    def _watch(self):
+        poll = min(self.interval, self.threshold) / 4
+        while not self.stopping.wait(poll):
+            beat = self.last_beat
+            stalled = time.monotonic() - beat - self.interval
+            if stalled < self.threshold:
+                continue
+            sites = Counter()
+            stacks = {}
+            # Sample until the heartbeat moves again
+            while self.last_beat == beat and not self.stopping.is_set():
+                frame = sys._current_frames().get(self.loop_thread_id)
+                if frame is not None:
+                    frames = _bot_frames(frame)
+                    leaf = traceback.extract_stack(frame)[-1:]
+                    site = _site(frames, leaf[0] if leaf else None)
+                    sites[site] += 1
+                    stacks.setdefault(site, (frames, leaf))
+                    del frame
+                time.sleep(poll)
+            if sites:
+                self._record(sites, stacks, max(self.last_beat - beat - self.interval, stalled))
+
+    def _record(self, sites, stacks, duration):
+        site, _ = sites.most_common(1)[0]
+        frames, leaf = stacks[site]
+        loop_blocks.inc(site=site)
+        loop_blocked_seconds.inc(duration, site=site)
+        with self.lock:
+            entry = self.blockers.setdefault(site, {"count": 0, "seconds": 0.0, "max_seconds": 0.0})
+            entry["count"] += 1
+            entry["seconds"] += duration
+            entry["max_seconds"] = max(entry["max_seconds"], duration)
+        path = " > ".join(f"{filename}:{function}:{line}" for filename, function, line in frames[-4:])
+        if leaf:
+            path += f" [{os.path.basename(leaf[0].filename)}:{leaf[0].name}:{leaf[0].lineno}]"
+        print(f"Event loop blocked for {duration * 1000:.0f} ms in {site} ({path or 'no bot frames'})")
+
+    def top_blockers(self, limit=5):
+        """[(site, count, total seconds, max seconds)] by total time blocked."""
+        with self.lock:
+            rows = [(site, entry["count"], entry["seconds"], entry["max_seconds"]) for site, entry in self.blockers.items()]
+        rows.sort(key=lambda row: row[2], reverse=True)
+        return rows[:limit]
+
+    def start(self):
+        """Start the heartbeat on the running loop and the sampling thread."""
+        if self.task or not self.threshold:
+            return
+        self.loop_thread_id = threading.get_ident()
+        self.last_beat = time.monotonic()
+        self.stopping.clear()
+        self.task = asyncio.get_running_loop().create_task(self._heartbeat())
+        self.thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self.thread.start()
+
+    async def stop(self):
+        if not self.task:
+            return
+        self.stopping.set()
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+
+loop_watchdog = LoopWatchdog()
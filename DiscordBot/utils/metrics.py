@@ -0,0 +1,330 @@
+"""
+In-process performance metrics.
+
+A small registry of counters, gauges and histograms in the Prometheus data
+model, filled by hooks on command invocation, view callbacks, tasks.loop
+iterations, image work and SQLAlchemy statement execution. The work being
+measured is tracked in a context variable, so SQL statements are attributed
+to the command, view or loop that issued them. render() produces the
+Prometheus text format served by cogs/metrics.py; `!perf` summarizes it.
+"""
+import time
+import bisect
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# Seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SQL_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+# Statements per operation
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+def _label_key(labelnames, labels):
+    return tuple(str(labels.get(name, "")) for name in labelnames)
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labelnames, key, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, key)]
+    pairs += [f'{name}="{value}"' for name, value in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Metric:
+    """A named metric family with a fixed set of label names."""
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def samples(self):
+        """Yield (suffix, label key, extra labels, value) for the exposition format."""
+        with self.lock:
+            items = list(self.values.items())
+        for key, value in items:
+            yield "", key, (), value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, key, extra, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(self.labelnames, key, extra)} {value:g}")
+        return lines
+
+    def clear(self):
+        with self.lock:
+            self.values.clear()
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, **labels):
+        return self.values.get(_label_key(self.labelnames, labels), 0)
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self.lock:
+            self.values[key] = value
+
+class _HistogramValue:
+    __slots__ = ("buckets", "count", "sum")
+
+    def __init__(self, size):
+        self.buckets = [0] * size
+        self.count = 0
+        self.sum = 0.0
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.bounds = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self.lock:
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = _HistogramValue(len(self.bounds) + 1)
+            entry.buckets[bisect.bisect_left(self.bounds, value)] += 1
+            entry.count += 1
+            entry.sum += value
+
+    def samples(self):
+        with self.lock:
+            items = [(key, list(entry.buckets), entry.count, entry.sum) for key, entry in self.values.items()]
+        for key, buckets, count, total in items:
+            cumulative = 0
+            for bound, bucket in zip(self.bounds + (float("inf"),), buckets):
+                cumulative += bucket
+                yield "_bucket", key, (("le", "+Inf" if bound == float("inf") else f"{bound:g}"),), cumulative
+            yield "_count", key, (), count
+            yield "_sum", key, (), total
+
+    def stats(self, **labels):
+        """(count, sum) for one label set."""
+        entry = self.values.get(_label_key(self.labelnames, labels))
+        return (entry.count, entry.sum) if entry else (0, 0.0)
+
+    def quantile(self, fraction, **labels):
+        """Estimate a quantile by interpolating inside its bucket, like histogram_quantile()."""
+        entry = self.values.get(_label_key(self.labelnames, labels))
+        if not entry or not entry.count:
+            return 0.0
+        rank = fraction * entry.count
+        cumulative = 0
+        lower = 0.0
+        for bound, bucket in zip(self.bounds, entry.buckets):
+            if cumulative + bucket >= rank and bucket:
+                return lower + (bound - lower) * (rank - cumulative) / bucket
+            cumulative += bucket
+            lower = bound
+        return self.bounds[-1]
+
+    def label_sets(self):
+        with self.lock:
+            return [dict(zip(self.labelnames, key)) for key in self.values]
+
+class Registry:
+    """All metric families, in registration order."""
+
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric):
+        return self.metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+command_seconds = registry.histogram("taipu_command_seconds", "Prefix command latency.", ("command",))
+command_errors = registry.counter("taipu_command_errors_total", "Failed command invocations.", ("command", "error"))
+command_queries = registry.histogram("taipu_command_sql_statements", "SQL statements per command invocation.", ("command",), QUERY_COUNT_BUCKETS)
+view_seconds = registry.histogram("taipu_view_callback_seconds", "UI component callback latency.", ("view", "item"))
+view_errors = registry.counter("taipu_view_callback_errors_total", "UI component callbacks that raised.", ("view", "error"))
+loop_seconds = registry.histogram("taipu_task_loop_seconds", "Duration of one tasks.loop iteration.", ("loop",))
+loop_errors = registry.counter("taipu_task_loop_errors_total", "tasks.loop iterations that raised.", ("loop", "error"))
+image_seconds = registry.histogram("taipu_image_seconds", "Image fetch and render time.", ("stage",))
+sql_seconds = registry.histogram("taipu_sql_statement_seconds", "SQL statement execution time.", ("operation",), SQL_BUCKETS)
+sql_statements = registry.counter("taipu_sql_statements_total", "SQL statements executed.", ("operation",))
+
+class Operation:
+    """The command, view callback or loop iteration currently running in this task."""
+    __slots__ = ("kind", "name", "started", "statements")
+
+    def __init__(self, kind, name):
+        self.kind = kind
+        self.name = name
+        self.started = time.perf_counter()
+        self.statements = 0
+
+    @property
+    def label(self):
+        return f"{self.kind}:{self.name}"
+
+current_operation = contextvars.ContextVar("current_operation", default=None)
+
+# Callables run with each Operation when it ends (used by utils/query_audit.py)
+operation_listeners = []
+
+def _finish(op):
+    for listener in operation_listeners:
+        try:
+            listener(op)
+        except Exception as e:
+            print(f"Error in operation listener: {e}")
+
+@contextmanager
+def operation(kind, name):
+    """Attribute everything inside the block (SQL statements included) to one operation."""
+    op = Operation(kind, name)
+    token = current_operation.set(op)
+    try:
+        yield op
+    finally:
+        current_operation.reset(token)
+        _finish(op)
+
+@contextmanager
+def timer(histogram, **labels):
+    """Observe the duration of a block in a histogram."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - started, **labels)
+
+def timed(histogram, **labels):
+    """Decorator observing the duration of each call of a coroutine function."""
+    def decorator(function):
+        @functools.wraps(function)
+        async def wrapper(*args, **kwargs):
+            with timer(histogram, **labels):
+                return await function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def instrument_loop(name=None):
+    """Time each iteration of a tasks.loop coroutine. Put it below @tasks.loop."""
+    def decorator(function):
+        loop_name = name or function.__name__
+
+        @functools.wraps(function)
+        async def wrapper(*args, **kwargs):
+            with operation("loop", loop_name), timer(loop_seconds, loop=loop_name):
+                try:
+                    return await function(*args, **kwargs)
+                except Exception as e:
+                    loop_errors.inc(loop=loop_name, error=type(e).__name__)
+                    raise
+        return wrapper
+    return decorator
+
+# Command hooks (registered on the bot by instrument_bot)
+
+_command_operation = contextvars.ContextVar("command_operation", default=None)
+
+async def _before_invoke(ctx):
+    op = Operation("command", ctx.command.qualified_name)
+    _command_operation.set((op, current_operation.set(op)))
+
+async def _after_invoke(ctx):
+    state = _command_operation.get()
+    if state is None:
+        return
+    op, token = state
+    _command_operation.set(None)
+    try:
+        current_operation.reset(token)
+    except ValueError:
+        current_operation.set(None)
+    command_seconds.observe(time.perf_counter() - op.started, command=op.name)
+    command_queries.observe(op.statements, command=op.name)
+    _finish(op)
+
+def record_command_error(ctx, error):
+    """Count a failed invocation; call from on_command_error."""
+    name = ctx.command.qualified_name if ctx.command else "unknown"
+    error = getattr(error, "original", error)
+    command_errors.inc(command=name, error=type(error).__name__)
+
+# SQLAlchemy statement hooks
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    op = current_operation.get()
+    label = op.label if op else "background"
+    if op:
+        op.statements += 1
+    sql_statements.inc(operation=label)
+    sql_seconds.observe(time.perf_counter() - started, operation=label)
+
+def instrument_engine(engine):
+    from sqlalchemy import event
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+# View callbacks
+
+def instrument_views():
+    """Time every discord.ui component callback and count the ones that raise."""
+    import discord
+    View = discord.ui.View
+    if getattr(View._scheduled_task, "_instrumented", False):
+        return
+    original_task = View._scheduled_task
+    original_on_error = View.on_error
+
+    async def _scheduled_task(self, item, interaction):
+        view_name = type(self).__name__
+        item_name = type(item).__name__ if type(item).__module__ != "discord.ui.button" else (getattr(item, "label", None) or "Button")
+        with operation("view", f"{view_name}.{item_name}"), timer(view_seconds, view=view_name, item=item_name):
+            return await original_task(self, item, interaction)
+    _scheduled_task._instrumented = True
+
+    async def on_error(self, interaction, error, item):
+        view_errors.inc(view=type(self).__name__, error=type(error).__name__)
+        return await original_on_error(self, interaction, error, item)
+
+    View._scheduled_task = _scheduled_task
+    View.on_error = on_error
+
+def instrument_bot(bot, engine):
+    """Install the command, view and SQL hooks."""
+    bot.before_invoke(_before_invoke)
+    bot.after_invoke(_after_invoke)
+    instrument_engine(engine)
+    instrument_views()
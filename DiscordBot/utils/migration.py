@@ -0,0 +1,416 @@
+"""
+Streaming, resumable migration of the legacy users.json into the database.
+
+users.json is read one user at a time instead of being loaded whole. Users are
+grouped into batches of roughly batch_size cards; each batch is written with
+bulk inserts and commits together with its checkpoint (the byte offset just
+past the last user in the batch), so an interrupted run resumes where it
+stopped and a finished run is skipped until the file changes. Characters are
+resolved from an in-memory name map that is loaded once; wishlist entries that
+name a character before its first card are retried after the last batch.
+"""
+import os
+import json
+import time
+import codecs
+import hashlib
+import datetime
+from sqlalchemy import insert, func, case
+from sqlalchemy.exc import SQLAlchemyError
+
+from models.base import get_db
+from models.user import User, user_wishlists
+from models.series import Series
+from models.character import Character, CharacterImage
+from models.card import Card
+from models.rarity import rarity_rank
+from models.migration import MigrationCheckpoint
+from utils.leaderboard import rebuild_scores
+from utils.affection_rank import affection_ranking
+from utils.wishlist_index import wishlist_index
+
+USERS_JSON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "users.json")
+CHECKPOINT_NAME = "users_json"
+DEFAULT_BATCH_SIZE = 1000  # Cards per transaction
+PLACEHOLDER_ARTWORK = "https://via.placeholder.com/800"
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+
+def iter_json_object(path, offset=0, chunk_size=1 << 16):
+    """Yield (key, value, end_offset) for each member of a top-level JSON object.
+
+    Only one member is held in memory at a time. end_offset is the byte offset
+    just past the member's value; passing it back as offset resumes after it.
+    """
+    with open(path, "rb") as f:
+        f.seek(offset)
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        buffer = ""
+        base = offset  # Byte offset of buffer[0]
+        eof = False
+
+        def fill():
+            nonlocal buffer, eof
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer += decoder.decode(chunk, final=eof)
+            return not eof
+
+        def skip_whitespace(pos):
+            while True:
+                while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                    pos += 1
+                if pos < len(buffer) or not fill():
+                    return pos
+
+        def decode(pos):
+            while True:
+                try:
+                    value, end = _decoder.raw_decode(buffer, pos)
+                    # A value ending exactly at the buffer edge may be cut short (e.g. a number)
+                    if end < len(buffer) or eof:
+                        return value, end
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                if not fill():
+                    return _decoder.raw_decode(buffer, pos)
+
+        pos = skip_whitespace(0)
+        if offset == 0:
+            if pos >= len(buffer) or buffer[pos] != "{":
+                raise ValueError(f"{path} does not contain a JSON object")
+            pos = skip_whitespace(pos + 1)
+            if pos < len(buffer) and buffer[pos] == "}":
+                return
+        else:
+            # Resuming just past a value: expect "," or the closing "}"
+            if pos >= len(buffer) or buffer[pos] == "}":
+                return
+            if buffer[pos] != ",":
+                raise ValueError(f"Invalid resume offset {offset} for {path}")
+            pos = skip_whitespace(pos + 1)
+
+        while True:
+            key, pos = decode(pos)
+            pos = skip_whitespace(pos)
+            if pos >= len(buffer) or buffer[pos] != ":":
+                raise ValueError(f"Expected ':' after key {key!r} in {path}")
+            value, pos = decode(skip_whitespace(pos + 1))
+
+            # Drop the consumed text so the buffer only ever holds one member
+            base += len(buffer[:pos].encode("utf-8"))
+            buffer = buffer[pos:]
+            yield key, value, base
+
+            pos = skip_whitespace(0)
+            if pos >= len(buffer) or buffer[pos] == "}":
+                return
+            if buffer[pos] != ",":
+                raise ValueError(f"Expected ',' after key {key!r} in {path}")
+            pos = skip_whitespace(pos + 1)
+
+def _legacy_global_id(user_id, index):
+    """Deterministic 7 character global ID for a legacy card whose own ID is missing or taken."""
+    digest = int(hashlib.sha1(f"{user_id}:{index}".encode()).hexdigest(), 16)
+    chars = "0123456789abcdefghijklmnopqrstuvwxyz"
+    result = ""
+    for _ in range(7):
+        digest, remainder = divmod(digest, 36)
+        result += chars[remainder]
+    return result
+
+def _user_cards(user_data):
+    """Cards of a legacy user; older files store them under "characters"."""
+    return user_data.get("cards") or user_data.get("characters") or []
+
+def _wishlist_names(user_data):
+    """Non-blank character names on a legacy user's wishlist."""
+    names = (str(name).strip() for name in user_data.get("wishlist") or [] if name is not None)
+    return [name for name in names if name]
+
+def _card_name(card_data):
+    """Character name of a legacy card; missing, null and blank names become "Unknown"."""
+    return str(card_data.get("name") or "").strip() or "Unknown"
+
+def _card_series(card_data):
+    """Series name of a legacy card, normalized like _card_name."""
+    return str(card_data.get("series") or "").strip() or "Unknown"
+
+class _Migrator:
+    """Writes batches of legacy users; holds the character name map between batches."""
+
+    def __init__(self, db):
+        self.db = db
+        self.characters = {name.lower(): character_id for name, character_id in db.query(Character.name, Character.id)}
+        self.series = dict(db.query(Series.name, Series.id))
+        self.wishlist_added = []  # (character_id, user_id) pairs to push into the index after commit
+        self.deferred_wishlists = []  # (user_id, name) entries whose character had no card yet
+
+    def _resolve_characters(self, cards):
+        """Create any characters (and series) the cards reference that don't exist yet."""
+        missing = {}
+        for card_data in cards:
+            name = _card_name(card_data)
+            if name.lower() not in self.characters and name.lower() not in missing:
+                missing[name.lower()] = (name, _card_series(card_data), card_data.get("claimed_artwork"))
+        if not missing:
+            return
+
+        new_series = {series for _, series, _ in missing.values()} - self.series.keys()
+        if new_series:
+            self.db.execute(insert(Series), [{"name": name} for name in new_series])
+            self.series.update(self.db.query(Series.name, Series.id).filter(Series.name.in_(new_series)))
+
+        names = [name for name, _, _ in missing.values()]
+        self.db.execute(insert(Character), [
+            {
+                "name": name,
+                "series_id": self.series[series],
+                "total_cards": 1, "normal_cards": 1, "event_cards": 0, "wishlist_count": 0
+            }
+            for name, series, _ in missing.values()
+        ])
+        created = dict(self.db.query(Character.name, Character.id).filter(Character.name.in_(names)))
+        self.db.execute(insert(CharacterImage), [
+            {
+                "character_id": created[name],
+                "url": artwork or PLACEHOLDER_ARTWORK,
+                "is_primary": True
+            }
+            for name, _, artwork in missing.values()
+        ])
+        self.characters.update({name.lower(): character_id for name, character_id in created.items()})
+
+    def write_wishlists(self, entries, now=None):
+        """Insert (user_id, name) wishlist entries for characters that exist, bumping demand counts in one UPDATE.
+
+        Returns (rows inserted, entries whose character doesn't exist yet).
+        """
+        db = self.db
+        now = now or datetime.datetime.utcnow()
+        wanted = set()
+        unresolved = []
+        for user_id, name in entries:
+            character_id = self.characters.get(name.lower())
+            if character_id:
+                wanted.add((user_id, character_id))
+            else:
+                unresolved.append((user_id, name))
+        if not wanted:
+            return 0, unresolved
+
+        existing_pairs = set(db.query(user_wishlists.c.user_id, user_wishlists.c.character_id).filter(
+            user_wishlists.c.user_id.in_({user_id for user_id, _ in wanted})
+        ))
+        new_pairs = sorted(wanted - existing_pairs)
+        if new_pairs:
+            db.execute(user_wishlists.insert(), [
+                {"user_id": user_id, "character_id": character_id, "added_at": now}
+                for user_id, character_id in new_pairs
+            ])
+            increments = {}
+            for user_id, character_id in new_pairs:
+                increments[character_id] = increments.get(character_id, 0) + 1
+            db.query(Character).filter(Character.id.in_(increments)).update(
+                {Character.wishlist_count: func.coalesce(Character.wishlist_count, 0) + case(increments, value=Character.id, else_=0)},
+                synchronize_session=False
+            )
+            self.wishlist_added.extend((character_id, user_id) for user_id, character_id in new_pairs)
+        return len(new_pairs), unresolved
+
+    def write_batch(self, users):
+        """Insert the users, cards and wishlists of a batch. Returns the number of rows inserted."""
+        db = self.db
+        now = datetime.datetime.utcnow()
+        # users.json is keyed by the ID as text; the tables store it as an integer
+        skipped = [user_id for user_id, _ in users if not str(user_id).isdigit()]
+        if skipped:
+            print(f"Skipping {len(skipped)} users.json entries without a numeric Discord ID: {skipped[:5]}")
+        users = [(int(user_id), user_data) for user_id, user_data in users if str(user_id).isdigit()]
+        user_ids = [user_id for user_id, user_data in users]
+
+        existing_users = {user_id for (user_id,) in db.query(User.id).filter(User.id.in_(user_ids))}
+        new_users = [
+            {
+                "id": user_id,
+                "username": user_data.get("username", f"User_{user_id}"),
+                "join_date": now,
+                "total_claims": len(_user_cards(user_data)),
+                "total_cards": len(_user_cards(user_data)),
+                "profile_color": user_data.get("profile_color", "#3498db"),
+                "leaderboard_rank": user_data.get("leaderboard_rank", None)
+            }
+            for user_id, user_data in users if user_id not in existing_users
+        ]
+        if new_users:
+            db.execute(insert(User), new_users)
+
+        # Cards: keep the legacy global ID unless it is missing or already used by someone else
+        all_cards = [
+            (user_id, index, card_data)
+            for user_id, user_data in users
+            for index, card_data in enumerate(_user_cards(user_data))
+        ]
+        self._resolve_characters([card_data for _, _, card_data in all_cards])
+
+        candidates = set()
+        for user_id, index, card_data in all_cards:
+            if card_data.get("global_id") is not None:
+                candidates.add(str(card_data["global_id"]))
+            candidates.add(_legacy_global_id(user_id, index))
+        taken = dict(db.query(Card.global_id, Card.owner_id).filter(Card.global_id.in_(candidates)))
+
+        card_rows = []
+        assigned = set()
+        for user_id, index, card_data in all_cards:
+            global_id = card_data.get("global_id")
+            global_id = str(global_id) if global_id is not None else None
+            if global_id is None or global_id in assigned or taken.get(global_id, user_id) != user_id:
+                global_id = _legacy_global_id(user_id, index)
+            if global_id in taken:
+                continue  # Migrated by an earlier run
+            assigned.add(global_id)
+
+            card_rows.append({
+                "global_id": global_id,
+                "character_id": self.characters[_card_name(card_data).lower()],
+                "owner_id": user_id,
+                "rarity": card_data.get("rarity", "N"),
+                "rarity_rank": rarity_rank(card_data.get("rarity", "N")),
+                "claimed_artwork": card_data.get("claimed_artwork") or PLACEHOLDER_ARTWORK,
+                "claim_method": card_data.get("claim_method", "spawn"),
+                "order": card_data.get("order", 0),
+                "affection": card_data.get("affection", 0),
+                "is_favorite": bool(card_data.get("favorite", False)),
+                "claimed_at": now
+            })
+        if card_rows:
+            db.execute(insert(Card), card_rows)
+
+        # Entries naming a character whose first card is in a later batch are retried by migrate_users_json
+        entries = [(user_id, name) for user_id, user_data in users for name in _wishlist_names(user_data)]
+        wishlist_rows, unresolved = self.write_wishlists(entries, now)
+        self.deferred_wishlists.extend(unresolved)
+
+        return len(new_users) + len(card_rows) + wishlist_rows
+
+def migrate_users_json(path=USERS_JSON_PATH, batch_size=DEFAULT_BATCH_SIZE, restart=False, progress=None):
+    """Migrate users.json into the database, resuming from the last checkpoint.
+
+    Returns a summary dict, or None if the migration failed. progress, if
+    given, is called with the summary after every committed batch.
+    """
+    if not os.path.exists(path):
+        print(f"JSON database not found at {path}")
+        return None
+
+    stat = os.stat(path)
+    db = get_db()
+    started = time.perf_counter()
+    summary = {"users": 0, "rows": 0, "batches": 0, "skipped": False, "resumed_from": 0}
+
+    try:
+        checkpoint = db.query(MigrationCheckpoint).filter(MigrationCheckpoint.name == CHECKPOINT_NAME).first()
+        same_source = checkpoint and (checkpoint.source_size, checkpoint.source_mtime_ns) == (stat.st_size, stat.st_mtime_ns)
+
+        if same_source and checkpoint.completed_at and not restart:
+            summary["skipped"] = True
+            return summary
+
+        if not checkpoint:
+            checkpoint = MigrationCheckpoint(name=CHECKPOINT_NAME)
+            db.add(checkpoint)
+        if restart or not same_source:
+            # Inserts are idempotent, so a changed file is simply walked again from the start
+            checkpoint.offset = 0
+            checkpoint.records_done = 0
+            checkpoint.rows_done = 0
+            checkpoint.completed_at = None
+            checkpoint.started_at = datetime.datetime.utcnow()
+        checkpoint.source_size = stat.st_size
+        checkpoint.source_mtime_ns = stat.st_mtime_ns
+        db.commit()
+        summary["resumed_from"] = checkpoint.records_done
+
+        migrator = _Migrator(db)
+        resume_offset = checkpoint.offset
+        batch = []
+        batch_cards = 0
+        batch_end = checkpoint.offset
+
+        def commit(users, rows):
+            checkpoint.records_done += users
+            checkpoint.rows_done += rows
+            db.commit()
+
+            for character_id, user_id in migrator.wishlist_added:
+                wishlist_index.add(character_id, user_id)
+            migrator.wishlist_added = []
+
+            summary["users"] += users
+            summary["rows"] += rows
+            summary["batches"] += 1
+            elapsed = time.perf_counter() - started
+            summary["rows_per_sec"] = round(summary["rows"] / elapsed, 1) if elapsed else 0.0
+            if progress:
+                progress(dict(summary))
+
+        def flush():
+            nonlocal batch, batch_cards
+            rows = migrator.write_batch(batch)
+            checkpoint.offset = batch_end
+            commit(len(batch), rows)
+            batch = []
+            batch_cards = 0
+
+        for user_id, user_data, end_offset in iter_json_object(path, checkpoint.offset):
+            if not isinstance(user_data, dict):
+                continue
+            batch.append((str(user_id), user_data))
+            batch_cards += len(_user_cards(user_data))
+            batch_end = end_offset
+            if batch_cards >= batch_size:
+                flush()
+        if batch:
+            flush()
+
+        # Every card is in now, so retry the wishlist entries that named a character
+        # before its first card. Entries deferred by an earlier, interrupted run are
+        # no longer in memory, so the part of the file it committed is read again.
+        def deferred_entries():
+            yield from migrator.deferred_wishlists
+            if resume_offset:
+                for user_id, user_data, end_offset in iter_json_object(path):
+                    if end_offset > resume_offset:
+                        break
+                    if isinstance(user_data, dict) and str(user_id).isdigit():
+                        yield from ((int(user_id), name) for name in _wishlist_names(user_data))
+
+        entries = []
+        for entry in deferred_entries():
+            entries.append(entry)
+            if len(entries) >= batch_size:
+                commit(0, migrator.write_wishlists(entries)[0])
+                entries = []
+        if entries:
+            commit(0, migrator.write_wishlists(entries)[0])
+
+        checkpoint.offset = batch_end
+        checkpoint.completed_at = datetime.datetime.utcnow()
+        db.commit()
+    except (SQLAlchemyError, ValueError, OSError) as e:
+        print(f"Error migrating data: {e}")
+        db.rollback()
+        return None
+
+    if summary["rows"]:
+        # Cards were bulk inserted, so rebuild the derived leaderboard and affection data
+        rebuild_scores()
+        affection_ranking.invalidate()
+
+    elapsed = time.perf_counter() - started
+    summary["elapsed_sec"] = round(elapsed, 3)
+    summary["rows_per_sec"] = round(summary["rows"] / elapsed, 1) if elapsed else 0.0
+    return summary
@@ -0,0 +1,144 @@
+"""
+Compiled command permission cache.
+
+Server.command_permissions is stored as JSON lists of string IDs. For the
+global command check those lists are compiled once per guild into frozensets
+of integer IDs, so enforcing channel/role permissions is a few set lookups and
+never touches the database. The !perm commands push fresh data in after every
+change.
+"""
+import threading
+from discord.ext import commands
+
+from models.base import get_db
+from models.server import Server
+from config import DEVELOPER_IDS
+
+class CommandDisabled(commands.CheckFailure):
+    """Raised when a guild's command permissions block a command."""
+    pass
+
+class CompiledPermission:
+    """Allowed/denied channel and role IDs for one command, as frozensets."""
+    __slots__ = ("allowed_channels", "denied_channels", "allowed_roles", "denied_roles")
+
+    def __init__(self, perms):
+        self.allowed_channels = _id_set(perms.get("allowed_channels"))
+        self.denied_channels = _id_set(perms.get("denied_channels"))
+        self.allowed_roles = _id_set(perms.get("allowed_roles"))
+        self.denied_roles = _id_set(perms.get("denied_roles"))
+
+    def allows(self, channel_id, role_ids):
+        """Same rules as Server.check_command_permission, on precompiled sets."""
+        # Check if channel is explicitly denied
+        if channel_id in self.denied_channels:
+            return False
+
+        # Check if any role is explicitly denied
+        if self.denied_roles and not self.denied_roles.isdisjoint(role_ids):
+            return False
+
+        # Check if channel is explicitly allowed
+        if self.allowed_channels and channel_id not in self.allowed_channels:
+            return False
+
+        # Check if roles are explicitly allowed
+        if self.allowed_roles and self.allowed_roles.isdisjoint(role_ids):
+            return False
+
+        return True
+
+def _id_set(ids):
+    """Compile a JSON list of string IDs into a frozenset of ints."""
+    return frozenset(int(i) for i in ids or () if str(i).isdigit())
+
+def compile_permissions(command_permissions):
+    """Compile a Server.command_permissions dict into {command_name: CompiledPermission}."""
+    return {
+        command_name.lower(): CompiledPermission(perms)
+        for command_name, perms in (command_permissions or {}).items()
+    }
+
+class PermissionCache:
+    """Per-guild compiled permissions, loaded once and updated by !perm."""
+
+    def __init__(self):
+        self._guilds = {}  # Guild ID -> {command_name: CompiledPermission}
+        self._lock = threading.Lock()
+        self.loaded = False
+
+    def load(self):
+        """Compile permissions for every server in one query."""
+        db = get_db()
+        guilds = {}
+        for server_id, command_permissions in db.query(Server.id, Server.command_permissions):
+            if command_permissions:
+                guilds[int(server_id)] = compile_permissions(command_permissions)
+
+        with self._lock:
+            self._guilds = guilds
+            self.loaded = True
+        return len(guilds)
+
+    def update(self, guild_id, command_permissions):
+        """Replace a guild's compiled permissions (write-through from !perm)."""
+        compiled = compile_permissions(command_permissions)
+        with self._lock:
+            if compiled:
+                self._guilds[int(guild_id)] = compiled
+            else:
+                self._guilds.pop(int(guild_id), None)
+
+    def invalidate(self, guild_id=None):
+        """Drop cached permissions for one guild (reloading it) or reload everything."""
+        if guild_id is None:
+            self.load()
+            return
+
+        db = get_db()
+        server = db.query(Server).filter(Server.id == int(guild_id)).first()
+        self.update(guild_id, server.command_permissions if server else None)
+
+    def is_allowed(self, guild_id, command_names, channel_id, role_ids):
+        """Check whether any of the given command names is blocked in a channel for roles."""
+        if not self.loaded:
+            self.load()
+
+        guild_perms = self._guilds.get(guild_id)
+        if not guild_perms:
+            return True  # Allow by default
+
+        for command_name in command_names:
+            perm = guild_perms.get(command_name)
+            if perm is not None and not perm.allows(channel_id, role_ids):
+                return False
+        return True
+
+async def check_command_permissions(ctx):
+    """Global bot check enforcing per-guild channel/role command permissions."""
+    if ctx.guild is None or ctx.command is None:
+        return True
+
+    # Administrators can always run commands, so they can't lock themselves out
+    if getattr(ctx.author, "guild_permissions", None) and ctx.author.guild_permissions.administrator:
+        return True
+
+    # Match both the full command ("perm list") and its root ("perm")
+    command = ctx.command
+    command_names = {command.qualified_name.lower(), command.name.lower()}
+    if command.root_parent is not None:
+        command_names.add(command.root_parent.name.lower())
+
+    role_ids = [role.id for role in getattr(ctx.author, "roles", ())]
+    if not permission_cache.is_allowed(ctx.guild.id, command_names, ctx.channel.id, role_ids):
+        raise CommandDisabled(f"`{command.qualified_name}` is not allowed here.")
+    return True
+
+def is_developer():
+    """Command check restricting a command to the bot developers."""
+    async def predicate(ctx):
+        return ctx.author.id in DEVELOPER_IDS
+    return commands.check(predicate)
+
+# Shared instance used by the global check and the setup cog
+permission_cache = PermissionCache()
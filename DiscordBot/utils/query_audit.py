@@ -0,0 +1,223 @@
+"""
+Slow-query and N+1 detector.
+
+When installed on the engine, every statement is normalized (literals and
+IN-lists collapsed) and grouped per command invocation, view callback or loop
+iteration, using the operation tracked by utils/metrics.py. When the operation
+ends, statements repeated SQL_REPEAT_THRESHOLD or more times (the N+1 pattern)
+and statements slower than SQL_SLOW_MS are flagged, and their query plan is
+captured once with EXPLAIN QUERY PLAN (EXPLAIN on PostgreSQL).
+
+The per-operation report can be written as JSON and checked against a budget,
+so it doubles as a regression guard:
+
+    with query_audit.expect("get_user", max_statements=3, max_repeats=1):
+        get_user(user_id)
+
+Enable it in the bot with SQL_AUDIT=1; the report is written to
+SQL_AUDIT_REPORT on shutdown.
+"""
+import os
+import re
+import json
+import time
+import threading
+from contextlib import contextmanager
+from utils import metrics
+
+SQL_AUDIT = os.getenv("SQL_AUDIT", "0") == "1"
+SQL_AUDIT_REPORT = os.getenv("SQL_AUDIT_REPORT", "sql_audit.json")
+SQL_SLOW_MS = float(os.getenv("SQL_SLOW_MS", "100"))
+SQL_REPEAT_THRESHOLD = int(os.getenv("SQL_REPEAT_THRESHOLD", "5"))
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:\?|%\(\w+\)s|%s|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|%s|:\w+))*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize(statement):
+    """Statement text with literals replaced by ? and IN-lists collapsed to (...)."""
+    statement = _STRING.sub("?", statement)
+    statement = _NUMBER.sub("?", statement)
+    statement = _PLACEHOLDER_LIST.sub("(...)", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+class QueryAudit:
+    """Groups statements per operation and keeps a per-operation report."""
+
+    def __init__(self, slow_ms=SQL_SLOW_MS, repeat_threshold=SQL_REPEAT_THRESHOLD, explain=True):
+        self.slow_ms = slow_ms
+        self.repeat_threshold = repeat_threshold
+        self.explain = explain
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.report = {}
+        self.plans = {}
+        self.engine = None
+        self.last = {}
+
+    def install(self, engine):
+        from sqlalchemy import event
+        if self.engine is not None:
+            return
+        self.engine = engine
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+        metrics.operation_listeners.append(self._finish)
+
+    def uninstall(self):
+        from sqlalchemy import event
+        if self.engine is None:
+            return
+        event.remove(self.engine, "before_cursor_execute", self._before_cursor_execute)
+        event.remove(self.engine, "after_cursor_execute", self._after_cursor_execute)
+        metrics.operation_listeners.remove(self._finish)
+        self.engine = None
+
+    def reset(self):
+        with self.lock:
+            self.pending.clear()
+            self.report.clear()
+            self.plans.clear()
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("audit_started", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - conn.info["audit_started"].pop()) * 1000
+        normalized = normalize(statement)
+        op = metrics.current_operation.get()
+
+        with self.lock:
+            if op is None:
+                # Executor threads and startup work; only slow statements are kept
+                if elapsed_ms >= self.slow_ms:
+                    entry = self._entry("background")
+                    self._add(entry, normalized, 1, elapsed_ms, elapsed_ms)
+                    entry["slow"][normalized] = max(entry["slow"].get(normalized, 0), round(elapsed_ms, 2))
+            else:
+                _, statements = self.pending.setdefault(id(op), (op, {}))
+                counts = statements.setdefault(normalized, [0, 0.0, 0.0])
+                counts[0] += 1
+                counts[1] += elapsed_ms
+                counts[2] = max(counts[2], elapsed_ms)
+                repeats = counts[0]
+            needs_plan = (
+                self.explain and normalized not in self.plans
+                and (elapsed_ms >= self.slow_ms or (op is not None and repeats >= self.repeat_threshold))
+            )
+            if needs_plan:
+                self.plans[normalized] = None
+
+        if needs_plan and not executemany:
+            plan = self._explain(conn, statement, parameters)
+            with self.lock:
+                self.plans[normalized] = plan
+
+    def _explain(self, conn, statement, parameters):
+        """Query plan rows, run on the connection that just executed the statement."""
+        if not statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            return None
+        prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+        cursor = conn.connection.cursor()
+        try:
+            # A raw DBAPI cursor, so the EXPLAIN itself isn't audited
+            cursor.execute(prefix + statement, parameters)
+            return [" ".join(str(value) for value in row) for row in cursor.fetchall()]
+        except Exception as e:
+            return [f"EXPLAIN failed: {e}"]
+        finally:
+            cursor.close()
+
+    def _entry(self, label):
+        return self.report.setdefault(label, {
+            "invocations": 0, "statements": 0, "max_statements": 0, "total_ms": 0.0,
+            "queries": {}, "repeated": {}, "slow": {}
+        })
+
+    def _add(self, entry, normalized, count, total_ms, max_ms):
+        query = entry["queries"].setdefault(normalized, {"count": 0, "max_per_invocation": 0, "total_ms": 0.0, "max_ms": 0.0})
+        query["count"] += count
+        query["max_per_invocation"] = max(query["max_per_invocation"], count)
+        query["total_ms"] = round(query["total_ms"] + total_ms, 3)
+        query["max_ms"] = round(max(query["max_ms"], max_ms), 3)
+        entry["statements"] += count
+        entry["total_ms"] = round(entry["total_ms"] + total_ms, 3)
+
+    def _finish(self, op):
+        """Fold one finished operation into the report and print new findings."""
+        with self.lock:
+            _, statements = self.pending.pop(id(op), (op, {}))
+            entry = self._entry(op.label)
+            entry["invocations"] += 1
+            entry["max_statements"] = max(entry["max_statements"], sum(counts[0] for counts in statements.values()))
+            findings = []
+            for normalized, (count, total_ms, max_ms) in statements.items():
+                self._add(entry, normalized, count, total_ms, max_ms)
+                if count >= self.repeat_threshold:
+                    if normalized not in entry["repeated"]:
+                        findings.append(f"N+1: {count}x {normalized[:200]}")
+                    entry["repeated"][normalized] = max(entry["repeated"].get(normalized, 0), count)
+                if max_ms >= self.slow_ms:
+                    if normalized not in entry["slow"]:
+                        findings.append(f"slow: {max_ms:.0f} ms {normalized[:200]}")
+                    entry["slow"][normalized] = max(entry["slow"].get(normalized, 0), round(max_ms, 2))
+            self.last = {
+                "statements": sum(counts[0] for counts in statements.values()),
+                "max_repeats": max((counts[0] for counts in statements.values()), default=0)
+            }
+        for finding in findings:
+            print(f"SQL audit [{op.label}] {finding}")
+
+    def snapshot(self):
+        """The report with the captured query plans, ready for JSON."""
+        with self.lock:
+            report = json.loads(json.dumps(self.report))
+            plans = dict(self.plans)
+        for entry in report.values():
+            entry["plans"] = {normalized: plans.get(normalized) for normalized in list(entry["repeated"]) + list(entry["slow"])}
+        return report
+
+    def write_report(self, path=SQL_AUDIT_REPORT):
+        with open(path, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        return path
+
+    @contextmanager
+    def expect(self, name, max_statements=None, max_repeats=None):
+        """Run a block as one operation and raise QueryBudgetExceeded if it goes over budget."""
+        with metrics.operation("check", name):
+            yield
+        if max_statements is not None and self.last["statements"] > max_statements:
+            raise QueryBudgetExceeded(f"{name} ran {self.last['statements']} SQL statements (budget {max_statements})")
+        if max_repeats is not None and self.last["max_repeats"] > max_repeats:
+            raise QueryBudgetExceeded(f"{name} repeated one SQL statement {self.last['max_repeats']} times (budget {max_repeats})")
+
+def check_budget(report, budget):
+    """Compare a report with {label: {"max_statements": n, "max_repeats": n}}; returns the violations."""
+    violations = []
+    for label, limits in budget.items():
+        entry = report.get(label)
+        if not entry:
+            continue
+        if "max_statements" in limits and entry["max_statements"] > limits["max_statements"]:
+            violations.append(f"{label}: {entry['max_statements']} statements in one call (budget {limits['max_statements']})")
+        worst = max((query["max_per_invocation"] for query in entry["queries"].values()), default=0)
+        if "max_repeats" in limits and worst > limits["max_repeats"]:
+            violations.append(f"{label}: one statement repeated {worst} times in one call (budget {limits['max_repeats']})")
+    return violations
+
+def budget_from_report(report):
+    """A budget that fails if any operation gets worse than in this report."""
+    return {
+        label: {
+            "max_statements": entry["max_statements"],
+            "max_repeats": max((query["max_per_invocation"] for query in entry["queries"].values()), default=0)
+        }
+        for label, entry in report.items() if entry["invocations"]
+    }
+
+query_audit = QueryAudit()
@@ -0,0 +1,375 @@
+"""
+Offline Discord simulation for load testing.
+
+SimulatedBot is a real commands.Bot whose REST client and interaction webhook
+adapter are replaced with in-memory fakes, so cogs run unchanged without a
+network connection. Guilds, channels and members are built from gateway
+payloads and fed to the bot's ConnectionState. Messages, reactions and
+button clicks go through the same parse_* handlers a gateway event would.
+
+Every event the bot schedules while handling a delivered event is tracked,
+so `await deliver_*()` returns when the bot has finished reacting to it.
+"""
+import re
+import json
+import time
+import asyncio
+import datetime
+import itertools
+from collections import Counter
+import discord
+from discord.ext import commands
+from discord.webhook.async_ import AsyncWebhookAdapter, async_context
+
+EPOCH = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+
+# Permissions for the @everyone role (view, send, read history, add reactions, embed links)
+EVERYONE_PERMISSIONS = str(1024 | 2048 | 65536 | 64 | 16384)
+ADMINISTRATOR_PERMISSIONS = str(8)
+
+MESSAGE_URL = re.compile(r"/channels/(\d+)/messages/(\d+)")
+
+_ids = itertools.count(1)
+
+def snowflake():
+    """Return a new unique, increasing snowflake."""
+    return discord.utils.time_snowflake(EPOCH) + next(_ids)
+
+def _timestamp():
+    return datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+def user_payload(user_id, name, bot=False):
+    return {
+        "id": str(user_id),
+        "username": name,
+        "global_name": name,
+        "discriminator": "0",
+        "avatar": None,
+        "bot": bot
+    }
+
+def member_payload(user, roles=()):
+    return {
+        "user": user,
+        "roles": [str(role) for role in roles],
+        "joined_at": EPOCH.isoformat(),
+        "deaf": False,
+        "mute": False,
+        "flags": 0
+    }
+
+class FakeHTTP(discord.http.HTTPClient):
+    """HTTPClient that answers every REST call from memory.
+
+    Sent messages are stored and echoed back through MESSAGE_CREATE so they
+    land in the bot's message cache like they would on Discord.
+    """
+
+    def __init__(self, bot, latency=0.0):
+        super().__init__(bot.loop if bot.loop is not discord.utils.MISSING else None)
+        self.bot = bot
+        self.latency = latency
+        self.messages = {}  # Message ID -> payload
+        self.calls = Counter()  # Route key -> count
+        self.sent = Counter()  # Channel ID -> messages sent
+
+    async def request(self, route, *, files=None, form=None, **kwargs):
+        self.calls[route.key] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self.respond(route, files=files, form=form, **kwargs)
+
+    def _payload(self, form, kwargs):
+        if "json" in kwargs:
+            return kwargs["json"] or {}
+        for field in form or ():
+            if field.get("name") == "payload_json":
+                return json.loads(field["value"])
+        return {}
+
+    def respond(self, route, files=None, form=None, **kwargs):
+        method, path = route.method, route.path
+        state = self.bot._connection
+
+        if path == "/channels/{channel_id}/messages" and method == "POST":
+            body = self._payload(form, kwargs)
+            payload = self.bot.message_payload(
+                int(route.channel_id), self.bot.user_data, body.get("content") or "",
+                embeds=body.get("embeds") or [], components=body.get("components") or []
+            )
+            self.messages[int(payload["id"])] = payload
+            self.sent[int(route.channel_id)] += 1
+            # The gateway echoes the bot's own messages back
+            state.parse_message_create(dict(payload))
+            return payload
+
+        match = MESSAGE_URL.search(route.url)
+        if match and path == "/channels/{channel_id}/messages/{message_id}":
+            message_id = int(match.group(2))
+            if method == "PATCH":
+                payload = dict(self.messages.get(message_id) or self.bot.message_payload(int(match.group(1)), self.bot.user_data, ""))
+                payload.update({key: value for key, value in self._payload(form, kwargs).items() if value is not None})
+                payload["edited_timestamp"] = _timestamp()
+                self.messages[message_id] = payload
+                return payload
+            if method == "DELETE":
+                self.messages.pop(message_id, None)
+                return None
+            if method == "GET":
+                return self.messages.get(message_id)
+
+        if path == "/users/@me/channels" and method == "POST":
+            recipient = self.bot.users_by_id.get(int(kwargs["json"]["recipient_id"]))
+            return {"id": str(snowflake()), "type": 1, "recipients": [recipient] if recipient else [], "last_message_id": None}
+        if path == "/users/{user_id}" and method == "GET":
+            return self.bot.users_by_id.get(int(route.url.rsplit("/", 1)[1]))
+        if path == "/channels/{channel_id}" and method == "GET":
+            channel = self.bot.get_channel(int(route.channel_id))
+            return self.bot.channel_payloads.get(channel.id) if channel else None
+
+        # Reactions, typing, pins and anything else need no response body
+        return None
+
+class FakeWebhookAdapter(AsyncWebhookAdapter):
+    """Interaction responses and followups answered from memory."""
+
+    def __init__(self, bot):
+        super().__init__()
+        self.bot = bot
+        self.calls = Counter()
+        self.responses = {}  # Interaction ID -> future resolved on the first response
+
+    async def request(self, route, session=None, *, payload=None, multipart=None, files=None, **kwargs):
+        self.calls[route.key] += 1
+        if self.bot.http.latency:
+            await asyncio.sleep(self.bot.http.latency)
+
+        interaction_id = route.webhook_id
+        future = self.responses.get(int(interaction_id)) if interaction_id else None
+        if future and not future.done():
+            future.set_result(time.perf_counter())
+
+        data = (payload or {}).get("data") or payload or {}
+        if route.method in ("POST", "PATCH") and "/messages" in route.path:
+            message = self.bot.message_payload(
+                self.bot.interaction_channels.get(route.webhook_token, 0), self.bot.user_data,
+                data.get("content") or "", embeds=data.get("embeds") or []
+            )
+            return message
+        return {"type": (payload or {}).get("type", 4), "resource": {}}
+
+class SimulatedBot(commands.Bot):
+    """commands.Bot wired to the fake transport. Call await prepare() before use."""
+
+    def __init__(self, *args, api_latency=0.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.api_latency = api_latency
+        self.users_by_id = {}
+        self.channel_payloads = {}
+        self.interaction_channels = {}  # Interaction token -> channel ID
+        self.event_errors = Counter()
+        self._tracked = None
+
+    async def prepare(self, user_id=None, name="Taipu"):
+        """Run the client setup that login() would do and swap in the fakes."""
+        await self._async_setup_hook()
+        self.http = FakeHTTP(self, self.api_latency)
+        self._connection.http = self.http
+        self.adapter = FakeWebhookAdapter(self)
+        async_context.set(self.adapter)
+
+        self.user_data = user_payload(user_id or snowflake(), name, bot=True)
+        self._connection.user = discord.ClientUser(state=self._connection, data=self.user_data)
+        self.users_by_id[int(self.user_data["id"])] = self.user_data
+        await self.setup_hook()
+
+    def mark_ready(self):
+        """Release wait_until_ready() waiters, as the READY event would."""
+        self._ready.set()
+
+    def _schedule_event(self, coro, event_name, *args, **kwargs):
+        task = super()._schedule_event(coro, event_name, *args, **kwargs)
+        if self._tracked is not None:
+            self._tracked.append((event_name, task))
+        return task
+
+    async def on_error(self, event_method, *args, **kwargs):
+        self.event_errors[event_method] += 1
+        await super().on_error(event_method, *args, **kwargs)
+
+    # World building
+
+    def add_guild(self, name, members, channel_names=("general",)):
+        """Create a guild from a gateway payload. members is a list of user payloads; the first owns it."""
+        guild_id = snowflake()
+        admin_role = snowflake()
+        channels = []
+        for position, channel_name in enumerate(channel_names):
+            channel = {
+                "id": str(snowflake()), "type": 0, "name": channel_name, "position": position,
+                "guild_id": str(guild_id), "permission_overwrites": [], "nsfw": False, "parent_id": None
+            }
+            channels.append(channel)
+
+        for user in members:
+            self.users_by_id[int(user["id"])] = user
+        member_payloads = [member_payload(user, roles=(admin_role,) if index == 0 else ()) for index, user in enumerate(members)]
+        member_payloads.append(member_payload(self.user_data, roles=(admin_role,)))
+
+        guild = self._connection._add_guild_from_data({
+            "id": str(guild_id),
+            "name": name,
+            "owner_id": members[0]["id"] if members else self.user_data["id"],
+            "roles": [
+                {"id": str(guild_id), "name": "@everyone", "permissions": EVERYONE_PERMISSIONS, "position": 0,
+                 "color": 0, "hoist": False, "managed": False, "mentionable": False, "flags": 0},
+                {"id": str(admin_role), "name": "Admin", "permissions": ADMINISTRATOR_PERMISSIONS, "position": 1,
+                 "color": 0, "hoist": False, "managed": False, "mentionable": False, "flags": 0}
+            ],
+            "channels": channels,
+            "members": member_payloads,
+            "member_count": len(member_payloads),
+            "emojis": [], "stickers": [], "features": [], "threads": [],
+            "unavailable": False, "large": False
+        })
+        for channel in channels:
+            self.channel_payloads[int(channel["id"])] = channel
+        return guild
+
+    def message_payload(self, channel_id, author, content, embeds=(), components=(), mentions=()):
+        channel = self.get_channel(channel_id)
+        guild_id = channel.guild.id if channel is not None and getattr(channel, "guild", None) else None
+        payload = {
+            "id": str(snowflake()),
+            "channel_id": str(channel_id),
+            "author": author,
+            "content": content,
+            "timestamp": _timestamp(),
+            "edited_timestamp": None,
+            "tts": False,
+            "mention_everyone": False,
+            "mentions": [dict(user, member=member_payload(user)) for user in mentions],
+            "mention_roles": [],
+            "attachments": [],
+            "embeds": list(embeds),
+            "components": list(components),
+            "pinned": False,
+            "type": 0,
+            "flags": 0
+        }
+        if guild_id:
+            payload["guild_id"] = str(guild_id)
+            payload["member"] = member_payload(author)
+        return payload
+
+    # Event delivery
+
+    async def _deliver(self, parse, payload):
+        """Feed one gateway event and wait for every handler it scheduled. Returns the event names."""
+        self._tracked = []
+        try:
+            parse(payload)
+            tracked = self._tracked
+        finally:
+            self._tracked = None
+        if tracked:
+            await asyncio.gather(*(task for _, task in tracked), return_exceptions=True)
+        return [name for name, _ in tracked]
+
+    async def deliver_message(self, channel, author, content, mentions=()):
+        """Simulate a user sending a message. Returns the handled event names."""
+        payload = self.message_payload(channel.id, author, content, mentions=mentions)
+        return await self._deliver(self._connection.parse_message_create, payload)
+
+    async def deliver_reaction(self, message, user, emoji="✅"):
+        """Simulate a user adding a unicode reaction to a message."""
+        payload = {
+            "user_id": user["id"],
+            "channel_id": str(message.channel.id),
+            "message_id": str(message.id),
+            "emoji": {"id": None, "name": emoji},
+            "burst": False,
+            "type": 0
+        }
+        if message.guild:
+            payload["guild_id"] = str(message.guild.id)
+            payload["member"] = member_payload(user)
+        return await self._deliver(self._connection.parse_message_reaction_add, payload)
+
+    async def deliver_click(self, message, user, custom_id, timeout=10):
+        """Simulate a button click and wait for the interaction response. Returns seconds to respond."""
+        stored = self.http.messages.get(message.id) or {}
+        interaction_id = snowflake()
+        token = f"token-{interaction_id}"
+        self.interaction_channels[token] = message.channel.id
+        future = self.loop.create_future()
+        self.adapter.responses[interaction_id] = future
+
+        payload = {
+            "id": str(interaction_id),
+            "application_id": self.user_data["id"],
+            "type": 3,
+            "token": token,
+            "version": 1,
+            "channel_id": str(message.channel.id),
+            "channel": self.channel_payloads.get(message.channel.id),
+            "message": stored or self.message_payload(message.channel.id, self.user_data, ""),
+            "data": {"custom_id": custom_id, "component_type": 2},
+            "locale": "en-US",
+            "app_permissions": "0",
+            "attachment_size_limit": 10 * 1024 * 1024,
+            "entitlements": [],
+            "authorizing_integration_owners": {},
+            "context": 0
+        }
+        if message.guild:
+            payload["guild_id"] = str(message.guild.id)
+            payload["guild_locale"] = "en-US"
+            payload["member"] = dict(member_payload(user), permissions=EVERYONE_PERMISSIONS)
+        else:
+            payload["user"] = user
+
+        started = time.perf_counter()
+        await self._deliver(self._connection.parse_interaction_create, payload)
+        try:
+            responded = await asyncio.wait_for(future, timeout)
+        finally:
+            self.adapter.responses.pop(interaction_id, None)
+            self.interaction_channels.pop(token, None)
+        return responded - started
+
+    def buttons(self, message):
+        """Custom IDs of the buttons on a message the bot sent."""
+        stored = self.http.messages.get(message.id) or {}
+        return [
+            component["custom_id"]
+            for row in stored.get("components") or []
+            for component in row.get("components", [])
+            if component.get("type") == 2 and "custom_id" in component
+        ]
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes a task that sleeps for a fixed interval."""
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.samples = []
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - expected))
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
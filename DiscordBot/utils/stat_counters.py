@@ -0,0 +1,104 @@
+"""
+Coalesced statistic counters.
+
+Spawns and claims bump plain integer counters (Server.total_spawns,
+Server.total_claims). Rather than one UPDATE and commit per event, increments
+are summed in memory per (table, row, column) and written by flush() as one
+executemany of UPDATE ... SET column = column + ? per counter, all in a single
+transaction.
+
+Counts are written at least every STAT_FLUSH_SECONDS (the spawn cog's flush
+loop) or as soon as STAT_FLUSH_MAX_PENDING increments are queued, whichever
+comes first, and once more when the spawn cog unloads on shutdown. A crash can
+lose at most that much; a failed flush requeues its counts.
+"""
+import os
+import asyncio
+import threading
+from sqlalchemy import update, func, bindparam
+
+from models.base import get_db
+from models.server import Server
+
+STAT_FLUSH_SECONDS = float(os.getenv("STAT_FLUSH_SECONDS", "10"))
+STAT_FLUSH_MAX_PENDING = int(os.getenv("STAT_FLUSH_MAX_PENDING", "200"))
+
+# Counter columns that may be bumped, per table name
+COUNTERS = {
+    "servers": (Server, ("total_spawns", "total_claims"))
+}
+
+class StatCounters:
+    """Pending counter increments, summed until the next flush."""
+
+    def __init__(self, max_pending=STAT_FLUSH_MAX_PENDING):
+        self.max_pending = max_pending
+        self._pending = {}  # (table, column) -> {row ID: amount}
+        self._queued = 0  # Increments since the last flush started
+        self._flushing = False
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    def increment(self, table, row_id, column, amount=1):
+        """Queue `amount` for one counter. Flushes in the background once too many are queued."""
+        if column not in COUNTERS.get(table, (None, ()))[1]:
+            raise ValueError(f"Invalid statistic: {table}.{column}")
+
+        with self._lock:
+            counts = self._pending.setdefault((table, column), {})
+            counts[int(row_id)] = counts.get(int(row_id), 0) + amount
+            self._queued += 1
+            due = self._queued >= self.max_pending and not self._flushing
+            if due:
+                self._flushing = True
+
+        if due:
+            try:
+                asyncio.get_running_loop().run_in_executor(None, self._flush_quietly)
+            except RuntimeError:
+                # No event loop (scripts): write straight away
+                self._flush_quietly()
+
+    def _flush_quietly(self):
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"Error flushing statistics: {e}")
+
+    def flush(self):
+        """Write every queued increment in one transaction. Returns the number of rows updated."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                self._queued = 0
+                self._flushing = False
+            if not batch:
+                return 0
+
+            db = get_db()
+            try:
+                for (table, column), counts in batch.items():
+                    model = COUNTERS[table][0]
+                    target = getattr(model, column)
+                    db.execute(
+                        update(model.__table__).where(model.__table__.c.id == bindparam("row_id")).values(
+                            {column: func.coalesce(target, 0) + bindparam("amount")}
+                        ),
+                        [{"row_id": row_id, "amount": amount} for row_id, amount in counts.items()]
+                    )
+                db.commit()
+            except Exception:
+                db.rollback()
+                with self._lock:
+                    # Requeue so the next flush retries
+                    for key, counts in batch.items():
+                        pending = self._pending.setdefault(key, {})
+                        for row_id, amount in counts.items():
+                            pending[row_id] = pending.get(row_id, 0) + amount
+                raise
+            finally:
+                db.close()
+            return sum(len(counts) for counts in batch.values())
+
+# Shared instance used by the spawn and claim cogs
+stat_counters = StatCounters()
@@ -0,0 +1,59 @@
+"""
+Bulk statistics refresh.
+
+Series statistics are denormalized onto the series table and refreshed in a
+handful of GROUP BY queries, so !series never has to walk characters or cards.
+"""
+from sqlalchemy import func
+from sqlalchemy.exc import SQLAlchemyError
+
+from models.base import get_db
+from models.series import Series
+from models.character import Character
+from models.card import Card
+
+def refresh_series_statistics():
+    """Refresh total_characters, total_cards and popularity_rank for every series.
+
+    Popularity is the number of claimed cards from the series; the most
+    claimed series gets rank 1.
+    """
+    db = get_db()
+    try:
+        # Characters and artwork per series
+        character_totals = {
+            series_id: (characters, cards)
+            for series_id, characters, cards in db.query(
+                Character.series_id,
+                func.count(Character.id),
+                func.coalesce(func.sum(Character.total_cards), 0)
+            ).group_by(Character.series_id)
+        }
+
+        # Claimed cards per series, ranked with a window function
+        claimed = func.count(Card.id)
+        popularity = db.query(
+            Character.series_id,
+            func.rank().over(order_by=claimed.desc()).label("rank")
+        ).join(
+            Card, Card.character_id == Character.id
+        ).group_by(Character.series_id).all()
+        ranks = {series_id: rank for series_id, rank in popularity}
+
+        mappings = []
+        for (series_id,) in db.query(Series.id):
+            characters, cards = character_totals.get(series_id, (0, 0))
+            mappings.append({
+                "id": series_id,
+                "total_characters": characters,
+                "total_cards": cards,
+                "popularity_rank": ranks.get(series_id)
+            })
+
+        db.bulk_update_mappings(Series, mappings)
+        db.commit()
+        return len(mappings)
+    except SQLAlchemyError as e:
+        print(f"Error refreshing series statistics: {e}")
+        db.rollback()
+        return 0
@@ -0,0 +1,109 @@
+"""
+In-memory inverted index from character ID to the users wishlisting it.
+
+The index is loaded once from the wishlists table and then kept in sync by the
+wishlist helpers in utils.db, so working out who to ping for a spawn is a dict
+lookup plus one member check per wisher instead of a database scan.
+"""
+import threading
+from sqlalchemy import select
+
+from models.base import get_db
+from models.user import User, user_wishlists
+
+# Per-user notification modes, stored in User.settings["wishlist_notify"]
+NOTIFY_MENTION = "mention"  # Ping in the spawn channel
+NOTIFY_DM = "dm"  # Send a direct message
+NOTIFY_OFF = "off"  # No notification
+
+NOTIFY_MODES = (NOTIFY_MENTION, NOTIFY_DM, NOTIFY_OFF)
+DEFAULT_NOTIFY_MODE = NOTIFY_MENTION
+NOTIFY_SETTING = "wishlist_notify"
+
+class WishlistIndex:
+    """Character -> wishing users, plus each user's notification mode."""
+
+    def __init__(self):
+        self._wishers = {}  # Character ID -> set of user IDs (int)
+        self._modes = {}  # User ID (int) -> mode, only for non-default modes
+        self._lock = threading.Lock()
+        self.loaded = False
+
+    def load(self):
+        """(Re)build the index from the wishlists table."""
+        db = get_db()
+
+        wishers = {}
+        rows = db.query(user_wishlists.c.user_id, user_wishlists.c.character_id).yield_per(10000)
+        for user_id, character_id in rows:
+            wishers.setdefault(character_id, set()).add(int(user_id))
+
+        modes = {}
+        wishing_users = select(user_wishlists.c.user_id).distinct()
+        for user_id, settings in db.query(User.id, User.settings).filter(User.id.in_(wishing_users)):
+            mode = (settings or {}).get(NOTIFY_SETTING)
+            if mode in NOTIFY_MODES and mode != DEFAULT_NOTIFY_MODE:
+                modes[int(user_id)] = mode
+
+        with self._lock:
+            self._wishers = wishers
+            self._modes = modes
+            self.loaded = True
+
+        return sum(len(users) for users in wishers.values())
+
+    def add(self, character_id, user_id):
+        """Record that a user wishlisted a character."""
+        with self._lock:
+            self._wishers.setdefault(character_id, set()).add(int(user_id))
+
+    def remove(self, character_id, user_id):
+        """Record that a user removed a character from their wishlist."""
+        with self._lock:
+            users = self._wishers.get(character_id)
+            if users is not None:
+                users.discard(int(user_id))
+                if not users:
+                    del self._wishers[character_id]
+
+    def set_mode(self, user_id, mode):
+        """Update a user's notification mode."""
+        with self._lock:
+            if mode == DEFAULT_NOTIFY_MODE:
+                self._modes.pop(int(user_id), None)
+            else:
+                self._modes[int(user_id)] = mode
+
+    def wisher_count(self, character_id):
+        """Get the number of users wishing for a character."""
+        with self._lock:
+            return len(self._wishers.get(character_id, ()))
+
+    def recipients(self, character_id, guild):
+        """Split the members of a guild who wish for a character into (mention_ids, dm_ids)."""
+        mention_ids = []
+        dm_ids = []
+
+        with self._lock:
+            users = self._wishers.get(character_id)
+            if not users:
+                return mention_ids, dm_ids
+
+            # Walk whichever side is smaller: the wishers or the guild's members
+            if guild.member_count is not None and guild.member_count < len(users):
+                candidates = [member.id for member in guild.members if member.id in users]
+            else:
+                # Only members of the spawning guild can claim
+                candidates = [user_id for user_id in users if guild.get_member(user_id) is not None]
+
+            for user_id in candidates:
+                mode = self._modes.get(user_id, DEFAULT_NOTIFY_MODE)
+                if mode == NOTIFY_MENTION:
+                    mention_ids.append(user_id)
+                elif mode == NOTIFY_DM:
+                    dm_ids.append(user_id)
+
+        return mention_ids, dm_ids
+
+# Shared instance used by utils.db and the cogs
+wishlist_index = WishlistIndex()